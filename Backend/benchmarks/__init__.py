@@ -0,0 +1 @@
+# Micro-benchmarks for the backend. Run from Backend/, e.g.: python -m benchmarks.bench_neighborhood
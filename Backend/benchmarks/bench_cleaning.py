@@ -0,0 +1,116 @@
+"""
+Benchmark + regression check for clean_post_text: the precompiled single-pass engine vs. the
+original implementation (kept below verbatim) on a synthetic corpus. Fails on any output mismatch.
+
+  python -m benchmarks.bench_cleaning --posts 5000
+"""
+
+import argparse
+import re
+import time
+
+from benchmarks.corpus import make_corpus
+from easyrent.cleaning import clean_post_text
+
+
+def legacy_clean_post_text(raw_text: str) -> str:
+    """clean_post_text before the compiled rewrite (reference for regression checks)."""
+    raw_text = raw_text.strip().replace('\u200f', '').replace('\xa0', ' ')
+
+    time_pattern = r"\d+\s*(ימים|שעות|שניה|שניות|דקות)"
+    start_keywords = [r"משותף עם: קבוצה ציבורית", time_pattern]
+    min_start = 0
+    for pattern in start_keywords:
+        match = re.search(pattern, raw_text)
+        if match:
+            min_start = max(min_start, match.end())
+    raw_text = raw_text[min_start:].lstrip(" ·\n")
+
+    end_patterns = [
+        r"\+\d[\d,\.₪ ]* · .*?TA.*?דירה עם.*?חדרי אמבטיה",
+        r"תל אביב.*?TA.*?דירה עם.*?חדרי אמבטיה",
+        r"הודעה\s*לייק\s*תגובה\s*שיתוף",
+        r"כתיבת תגובה ציבורית.*$"
+    ]
+    for pattern in end_patterns:
+        match = re.search(pattern, raw_text, re.DOTALL)
+        if match:
+            raw_text = raw_text[:match.start()]
+            break
+
+    fb_trailers = [
+        r"שלחי את התגובה הראשונה שלך.*$",
+        r"שלחו את התגובה הראשונה שלכם.*$",
+        r"כתובי תגובה.*$",
+        r"כתבו תגובה.*$",
+        r"Write a comment.*$",
+        r"Send the first reply.*$",
+        r"למידע נוסף על נכס זה.*$",
+        r"For more information about this property.*$",
+        r"WhatsApp\s*:.*$",
+        r"קבוצת .{0,40} רשת סוכנויות.*$",
+    ]
+    for pattern in fb_trailers:
+        raw_text = re.sub(pattern, "", raw_text, flags=re.IGNORECASE | re.DOTALL).strip()
+
+    lines = [ln.strip(" ·•-—\u2022") for ln in raw_text.splitlines()]
+    uniq = []
+    seen = set()
+    for ln in lines:
+        if not ln:
+            continue
+        key = re.sub(r"\s+", " ", ln)
+        if key not in seen:
+            seen.add(key)
+            uniq.append(ln)
+    raw_text = "\n".join(uniq)
+
+    raw_text = re.sub(r"[·•\.\s]+$", "", raw_text).strip()
+    return raw_text.strip()
+
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "...",
+    "דירה יפה\n\n\n· · ·",
+    "כתבו תגובה",
+    "WRITE A COMMENT below",
+    "דירה\nWhatsApp :\n050",
+    "קבוצת הנדל\"ן הגדולה רשת סוכנויות ארצית\nעוד טקסט",
+    "קבוצת אלפא כתבו תגובה רשת סוכנויות",
+    "12 שעות · משותף עם: קבוצה ציבורית\nדירה\n+5,000 ₪ · x TA\nדירה עם 2 חדרי אמבטיה",
+    "שורה\t\nשורה \nשורה",
+    "a" + "." * 5000 + "b" + " ." * 10,
+]
+
+
+def run(n_posts: int, seed: int = 42) -> dict:
+    corpus = make_corpus(n_posts, seed=seed, noise=0.7) + EDGE_CASES
+
+    t0 = time.perf_counter()
+    new = [clean_post_text(p) for p in corpus]
+    new_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    old = [legacy_clean_post_text(p) for p in corpus]
+    old_s = time.perf_counter() - t0
+
+    mismatches = [(p, o, n) for p, o, n in zip(corpus, old, new) if o != n]
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} mismatches, e.g. {mismatches[:2]!r}")
+
+    return {
+        "posts": len(corpus),
+        "legacy_posts_per_s": round(len(corpus) / old_s),
+        "compiled_posts_per_s": round(len(corpus) / new_s),
+        "speedup": round(old_s / new_s, 2),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--posts", type=int, default=5_000)
+    args = ap.parse_args()
+    for k, v in run(args.posts).items():
+        print(f"{k:>22}: {v}")
@@ -0,0 +1,71 @@
+"""
+Benchmark for fuzzy duplicate matching: lookup latency against a synthetic set of live
+listings, plus a sanity check that re-posts with address/price variations are caught.
+
+  python -m benchmarks.bench_dedup --listings 50000 --lookups 20000
+"""
+
+import argparse
+import random
+import time
+
+from easyrent.dedup import DuplicateMatcher
+from easyrent.geo.ta_gazetteer import STREET_TO_NEI_EN
+
+_PREFIXES = ["", "רחוב ", "רח' ", "שד' "]
+
+
+def _listing(rng, streets):
+    return {
+        "address": f"{rng.choice(streets)} {rng.randint(1, 200)}",
+        "rooms": rng.choice([1, 1.5, 2, 2.5, 3, 3.5, 4, 5]),
+        "price": rng.randrange(3000, 15000, 50),
+        "contactId": f"c{rng.randint(1, 20000)}",
+    }
+
+
+def _variant(rng, apt):
+    """A re-post of apt: different street prefix/spelling, slightly different price."""
+    street, house = apt["address"].rsplit(" ", 1)
+    return {
+        "address": f"{rng.choice(_PREFIXES)}{street.replace(' ', '-', rng.random() < 0.3)} {house}, תל אביב",
+        "rooms": str(apt["rooms"]),
+        "price": apt["price"] + rng.choice([-100, -50, 0, 50, 100]),
+        "contactId": apt["contactId"] if rng.random() < 0.5 else None,
+    }
+
+
+def run(listings: int, lookups: int, seed: int = 7):
+    rng = random.Random(seed)
+    streets = [s for s in STREET_TO_NEI_EN if not any(c.isdigit() for c in s)]
+    apts = {f"a{i}": _listing(rng, streets) for i in range(listings)}
+
+    t0 = time.perf_counter()
+    matcher = DuplicateMatcher()
+    for doc_id, apt in apts.items():
+        matcher.add(doc_id, apt)
+    build = time.perf_counter() - t0
+
+    ids = list(apts)
+    reposts = [(i, _variant(rng, apts[i])) for i in rng.sample(ids, min(lookups, len(ids)))]
+    fresh = [_listing(rng, streets) for _ in range(lookups)]
+
+    t0 = time.perf_counter()
+    found = sum(1 for doc_id, v in reposts if matcher.find(v) == doc_id)
+    t_reposts = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    false_hits = sum(1 for v in fresh if matcher.find(v) is not None)
+    t_fresh = time.perf_counter() - t0
+
+    print(f"{len(matcher)} listings indexed in {build:.2f}s")
+    print(f"Re-posts matched: {found}/{len(reposts)}  ({t_reposts / len(reposts) * 1e6:.1f} µs/lookup)")
+    print(f"Fresh listings matched: {false_hits}/{len(fresh)}  ({t_fresh / len(fresh) * 1e6:.1f} µs/lookup)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--listings", type=int, default=50000)
+    ap.add_argument("--lookups", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    run(args.listings, args.lookups, args.seed)
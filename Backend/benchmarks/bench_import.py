@@ -0,0 +1,68 @@
+"""
+Cold-start budget: time importing each backend entry module in a fresh interpreter
+(`python -X importtime`, median of --repeat runs) and check that no SDK is imported eagerly.
+Exits non-zero when a module is over budget or pulls in openai/firebase, so it can gate CI.
+
+  python -m benchmarks.bench_import
+  python -m benchmarks.bench_import --repeat 9 --scale 2      # slower machine: double the budgets
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Cumulative import time budget per module (ms), with headroom over a laptop measurement
+BUDGETS_MS = {
+    "easyrent.cleaning": 15,
+    "easyrent.gpt_extractor": 60,
+    "easyrent.processor": 120,
+    "main": 130,
+}
+
+# Loaded on first use only (OpenAI client, Firebase Admin, .env parsing)
+LAZY_MODULES = ("openai", "httpx", "firebase_admin", "google.cloud", "dotenv")
+
+_PROBE = "import sys, {module}; print(','.join(m for m in {lazy!r} if m in sys.modules))"
+
+
+def measure(module: str) -> tuple:
+    """(cumulative import ms, eagerly imported lazy modules) for one fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, lazy=LAZY_MODULES)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    cumulative_us = None
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative_us = int(parts[1])
+    eager = [m for m in proc.stdout.strip().split(",") if m]
+    return cumulative_us / 1000, eager
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow CI hosts)")
+    args = ap.parse_args(argv)
+
+    failed = False
+    print(f"{'module':<26}{'median ms':>10}{'budget':>8}  eager SDK imports")
+    for module, budget in BUDGETS_MS.items():
+        runs = [measure(module) for _ in range(args.repeat)]
+        median = statistics.median(ms for ms, _ in runs)
+        eager = runs[-1][1]
+        limit = budget * args.scale
+        over = median > limit or bool(eager)
+        failed |= over
+        print(f"{module:<26}{median:>10.1f}{limit:>8.0f}  {', '.join(eager) or '-'}"
+              f"{'   OVER BUDGET' if over else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Benchmark: deterministic neighborhood matching, legacy per-entry regex loop vs. the compiled
+single-pass GazetteerMatcher, on the real gazetteer grown to --entries synthetic streets.
+Outputs are compared on every legacy-timed sample (the run fails on any mismatch).
+A second pass times house-number lookups on streets split into --segments number ranges,
+checked against a linear scan of the segments.
+
+  python -m benchmarks.bench_neighborhood --entries 10000 --samples 2000 --legacy-samples 12
+"""
+
+import argparse
+import random
+import re
+import time
+
+from easyrent.geo.matcher import GazetteerMatcher
+from easyrent.geo.ta_gazetteer import (
+    AMBIGUOUS_LONG_STREETS,
+    LANDMARK_TO_NEI_EN,
+    NEIGH_SYNONYMS_HE_TO_EN,
+    STREET_TO_NEI_EN,
+)
+from easyrent.neighborhoods import NEIGHBORHOOD_EN_TO_HE
+
+HE_LETTERS = "אבגדהוזחטיכלמנסעפצקרשת"
+
+
+def _norm_he(s):
+    return re.sub(r'\s+', ' ', s or '').strip()
+
+
+def legacy_neighborhood(address, full_text, streets, landmarks, synonyms, ambiguous):
+    """The pre-matcher implementation of deterministic_neighborhood, verbatim."""
+    addr = _norm_he(address)
+    t = _norm_he(full_text)
+    for street, nei in streets.items():
+        if re.search(rf'(?:^|[\s,]){re.escape(street)}(?:[\s,]\d+)?(?:$|[\s,])', addr):
+            return nei
+    for lm, nei in landmarks.items():
+        if lm in t or lm in addr:
+            return nei
+    for he, en in synonyms.items():
+        if he in t or he in addr:
+            return en
+    for amb in ambiguous:
+        if amb in addr and not any(lm in t for lm in landmarks):
+            return None
+    return None
+
+
+def synthetic_streets(n: int, rng: random.Random) -> dict:
+    neis = sorted(NEIGHBORHOOD_EN_TO_HE)
+    out = dict(STREET_TO_NEI_EN)
+    while len(out) < n:
+        words = ["".join(rng.choice(HE_LETTERS) for _ in range(rng.randint(3, 7)))
+                 for _ in range(rng.randint(1, 2))]
+        out[" ".join(words)] = rng.choice(neis)
+    return out
+
+
+def samples(streets: dict, n: int, rng: random.Random):
+    street_keys = list(streets)
+    landmarks = list(LANDMARK_TO_NEI_EN) + list(NEIGH_SYNONYMS_HE_TO_EN)
+    filler = "דירה מהממת להשכרה קרובה לים ולתחבורה ציבורית, משופצת מהיסוד, מיזוג בכל החדרים"
+    out = []
+    for i in range(n):
+        r = i % 4
+        if r == 0:    # street hit (most common case)
+            addr = f"{rng.choice(street_keys)} {rng.randint(1, 200)}"
+            text = f"{filler} ברחוב {addr}"
+        elif r == 1:  # landmark/synonym only
+            addr = "".join(rng.choice(HE_LETTERS) for _ in range(6))
+            text = f"{filler} ליד {rng.choice(landmarks)}"
+        elif r == 2:  # ambiguous long street
+            addr = f"{rng.choice(sorted(AMBIGUOUS_LONG_STREETS))} {rng.randint(1, 200)}"
+            text = filler
+        else:         # no signal at all
+            addr = None
+            text = filler
+        out.append((addr, text))
+    return out
+
+
+def run(entries: int, n_samples: int, legacy_samples: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    streets = synthetic_streets(entries, rng)
+    data = samples(streets, n_samples, rng)
+
+    t0 = time.perf_counter()
+    matcher = GazetteerMatcher(streets, LANDMARK_TO_NEI_EN, NEIGH_SYNONYMS_HE_TO_EN, AMBIGUOUS_LONG_STREETS)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = [matcher.neighborhood(_norm_he(a), _norm_he(t)) for a, t in data]
+    new_s = time.perf_counter() - t0
+
+    # The legacy loop recompiles one regex per entry per call, so it only gets a prefix
+    legacy_data = data[:legacy_samples]
+    t0 = time.perf_counter()
+    old = [legacy_neighborhood(a, t, streets, LANDMARK_TO_NEI_EN, NEIGH_SYNONYMS_HE_TO_EN, AMBIGUOUS_LONG_STREETS)
+           for a, t in legacy_data]
+    old_s = time.perf_counter() - t0
+
+    mismatches = [(d, o, n) for d, o, n in zip(legacy_data, old, new) if o != n]
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} mismatches, e.g. {mismatches[:3]}")
+
+    return {
+        "entries": len(streets),
+        "samples": n_samples,
+        "matcher_build_ms": round(build_s * 1000, 1),
+        "legacy_us_per_call": round(old_s / len(legacy_data) * 1e6, 1),
+        "matcher_us_per_call": round(new_s / n_samples * 1e6, 1),
+        "speedup": round((old_s / len(legacy_data)) / (new_s / n_samples), 1),
+    }
+
+
+def run_segments(streets: int, segments: int, n_samples: int, seed: int = 7) -> dict:
+    """Streets cut into `segments` house-number ranges each; time segment resolution per address."""
+    rng = random.Random(seed)
+    neis = sorted(NEIGHBORHOOD_EN_TO_HE)
+    table = {}
+    while len(table) < streets:
+        name = "".join(rng.choice(HE_LETTERS) for _ in range(rng.randint(4, 8)))
+        cuts = sorted(rng.sample(range(1, 2000), segments * 2))
+        table[name] = [(lo, hi, rng.choice(neis)) for lo, hi in zip(cuts[0::2], cuts[1::2])]
+    matcher = GazetteerMatcher(table, {}, {}, ())
+    names = list(table)
+    data = [(name, rng.randint(1, 2000)) for name in (rng.choice(names) for _ in range(n_samples))]
+
+    t0 = time.perf_counter()
+    got = [matcher.neighborhood(f"{name} {number}", "") for name, number in data]
+    elapsed = time.perf_counter() - t0
+
+    expected = [next((nei for lo, hi, nei in table[name] if lo <= number <= hi), None) for name, number in data]
+    if got != expected:
+        raise SystemExit("segment lookup mismatch against the linear scan")
+    return {
+        "segment_streets": streets,
+        "segments_per_street": segments,
+        "resolved": f"{sum(g is not None for g in got)}/{n_samples}",
+        "segment_us_per_call": round(elapsed / n_samples * 1e6, 1),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--entries", type=int, default=10_000)
+    ap.add_argument("--samples", type=int, default=2_000)
+    ap.add_argument("--legacy-samples", type=int, default=12, help="legacy is slow; time it on a prefix")
+    ap.add_argument("--segments", type=int, default=200, help="house-number ranges per street (second pass)")
+    args = ap.parse_args()
+    for k, v in run(args.entries, args.samples, min(args.legacy_samples, args.samples)).items():
+        print(f"{k:>22}: {v}")
+    for k, v in run_segments(1000, args.segments, args.samples).items():
+        print(f"{k:>22}: {v}")
@@ -0,0 +1,122 @@
+"""
+Benchmark for apartment records: memory held and CPU per record for Apartment (__slots__,
+validated once) vs the dict built by merging model output into a defaults dict, for N
+extracted listings.
+Build = record from model output + source metadata; read = fingerprint + dedup fields;
+export = the Firestore document.
+
+  python -m benchmarks.bench_records --records 50000
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from easyrent.apartment import FIELDS, Apartment
+from easyrent.fingerprint import generate_fingerprint
+from easyrent.rule_extractor import extract_rule_based
+
+from .corpus import make_corpus
+
+# The dict a record used to be built on (every schema field, title defaulted)
+_DEFAULTS = {**dict.fromkeys(FIELDS), "title": "דירה למכירה", "images": []}
+_DEDUP_FIELDS = ("fingerprint", "address", "rooms", "price", "contactId")
+
+
+def _model_outputs(records: int, seed: int) -> list:
+    """Model-like results: rule extraction plus the extra keys models tend to add."""
+    rng = random.Random(seed)
+    corpus = make_corpus(min(records, 2000), seed=seed)
+    base = [extract_rule_based(p)[0] for p in corpus]
+    outputs = []
+    for n in range(records):
+        data = dict(base[n % len(base)])
+        data.update({"is_apartment": True, "category": "שכירות", "title": "דירה להשכרה", "description": ""})
+        if rng.random() < 0.3:
+            data.update({"confidence": 0.8, "notes": "price excludes arnona", "currency": "ILS"})
+        outputs.append(data)
+    return outputs
+
+
+def _metadata(n: int) -> dict:
+    return {"id": f"17102026_{n}", "images": [f"https://cdn.example/{n}.jpg"],
+            "description": "דירה מרווחת ומוארת", "contactId": f"c{n % 997}", "contactName": "bench"}
+
+
+def _build_dict(data, meta):
+    # As _save_extraction built it: defaults + model output, then the source metadata
+    record = _DEFAULTS.copy()
+    record.update(data)
+    record["id"] = meta["id"]
+    record["images"] = meta["images"]
+    record["description"] = meta["description"]
+    record["contactId"] = meta["contactId"]
+    record["contactName"] = meta["contactName"]
+    return record
+
+
+def _build_apartment(data, meta):
+    return Apartment(data, meta)
+
+
+def _export_dict(record):
+    return {**record, "indexed_at": None, "expire_at": None}
+
+
+def _export_apartment(record):
+    return record.to_firestore(indexed_at=None, expire_at=None)
+
+
+def _best(fn, rounds: int = 3) -> float:
+    """Fastest of `rounds` timings of fn(), in seconds."""
+    timings = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def _read(records):
+    for r in records:
+        generate_fingerprint(r)
+        [r.get(f) for f in _DEDUP_FIELDS]
+
+
+def _measure(name, build, export, outputs):
+    metas = [_metadata(n) for n in range(len(outputs))]
+    n = len(outputs)
+
+    gc.collect()
+    tracemalloc.start()
+    records = [build(d, m) for d, m in zip(outputs, metas)]
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t_build = _best(lambda: [build(d, m) for d, m in zip(outputs, metas)])
+    t_read = _best(lambda: _read(records))
+    t_export = _best(lambda: [export(r) for r in records])
+    fields = max(len(export(r)) for r in records)
+
+    print(f"{name:<10}{held / n:>10.0f}{t_build / n * 1e6:>11.2f}{t_read / n * 1e6:>10.2f}"
+          f"{t_export / n * 1e6:>11.2f}{fields:>8}")
+    return held
+
+
+def run(records: int, seed: int = 7):
+    outputs = _model_outputs(records, seed)
+    print(f"{records} records")
+    print(f"{'':<10}{'bytes/rec':>10}{'build µs':>11}{'read µs':>10}{'export µs':>11}{'fields':>8}")
+    held_dict = _measure("dict", _build_dict, _export_dict, outputs)
+    held_apt = _measure("Apartment", _build_apartment, _export_apartment, outputs)
+    print(f"Apartment holds {held_apt / held_dict:.0%} of the dict memory")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--records", type=int, default=50000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    run(args.records, args.seed)
@@ -0,0 +1,117 @@
+"""
+Multi-worker check for the post lease protocol: seeds a temporary SQLite storage, runs N
+`main.py work` processes against it (OpenAI stub with --latency per call, one shard each) and
+verifies that every post got exactly one final outcome, nothing is left leased, and leases of a dead
+worker are reclaimed. Prints throughput per worker count; fails on any protocol violation.
+The OpenAI rate limiter gets a budget no run can exhaust, so scaling measures the workers rather
+than each process's starting bucket.
+
+  python -m benchmarks.bench_workers --posts 300 --workers 1 2 4 --latency 0.2
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from easyrent.storage.sqlite import SQLiteStorage
+
+from .seed_storage import seed
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+CLAIMABLE = ("new", "error")
+# Per-process limiter budget far above what the stub is asked for: the limiter never throttles
+UNTHROTTLED = str(10 ** 9)
+
+
+def _start_stub(port: int, latency: float):
+    spec = importlib.util.spec_from_file_location("openai_stub_server", BACKEND_DIR / "tools" / "openai_stub_server.py")
+    stub = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(stub)
+    return stub.serve(port, latency)
+
+
+def _claimable(storage) -> int:
+    return sum(storage.count("posts", s) for s in CLAIMABLE)
+
+
+def _run_workers(db_path: Path, workers: int, port: int, tmp: Path) -> float:
+    env = {**os.environ, "EASYRENT_STORAGE": "sqlite", "EASYRENT_SQLITE_PATH": str(db_path),
+           "OPENAI_BASE_URL": f"http://127.0.0.1:{port}/v1", "OPENAI_API_KEY": "stub",
+           "EASYRENT_EXTRACTION_CACHE": "0", "EASYRENT_RULE_FASTPATH": "0",
+           "EASYRENT_REPORT_DIR": str(tmp / "reports"),
+           "EASYRENT_OPENAI_RPM": UNTHROTTLED, "EASYRENT_OPENAI_TPM": UNTHROTTLED}
+    t0 = time.perf_counter()
+    procs = [
+        subprocess.Popen([sys.executable, "main.py", "work", "--worker-id", f"w{i}", "--shard", f"{i}/{workers}"],
+                         cwd=BACKEND_DIR,
+                         env={**env, "EASYRENT_PROM_TEXTFILE": str(tmp / f"w{i}.prom")},
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        for i in range(workers)
+    ]
+    for p in procs:
+        _, err = p.communicate()
+        if p.returncode:
+            raise SystemExit(f"worker failed ({p.returncode}):\n{err.decode(errors='replace')[-2000:]}")
+    return time.perf_counter() - t0
+
+
+def _reports(tmp: Path) -> list:
+    return [json.loads(p.read_text(encoding="utf-8")) for p in sorted((tmp / "reports").glob("*.json"))]
+
+
+def check(posts: int, workers: int, port: int) -> dict:
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        storage = SQLiteStorage(tmp / "posts.sqlite3")
+        seed(storage, posts, apartments=0, old=0.0)
+        expected = _claimable(storage)
+
+        elapsed = _run_workers(tmp / "posts.sqlite3", workers, port, tmp)
+        reports = _reports(tmp)
+        outcomes = sum(sum(r["outcomes"].values()) for r in reports)
+        conflicts = sum(r["counters"].get("lease_conflicts", 0) for r in reports)
+        leftover = _claimable(storage) + storage.count("posts", "processing")
+        if outcomes != expected or leftover:
+            raise SystemExit(f"{workers} workers: {outcomes} outcomes for {expected} posts, {leftover} left over")
+
+        # A worker that died mid-post leaves expired leases, which the next run must reclaim;
+        # a live lease must not be taken over
+        ids = storage.list_ids("posts")[:6]
+        storage.commit([("update", "posts", post_id, {"status": "new"}) for post_id in ids])
+        dead, live = ids[:5], ids[5]
+        if not all(storage.claim_post(post_id, "dead-worker", 0, CLAIMABLE) for post_id in dead):
+            raise SystemExit("could not lease fresh posts")
+        if not storage.claim_post(live, "live-worker", 600, CLAIMABLE) or storage.claim_post(live, "other", 600, CLAIMABLE):
+            raise SystemExit("a live lease was taken over")
+        time.sleep(0.01)
+        _run_workers(tmp / "posts.sqlite3", 1, port, tmp)
+        if storage.count("posts", "processing") != 1 or _claimable(storage):
+            raise SystemExit("expired leases were not reclaimed (or a live one was)")
+        storage.close()
+
+    return {"workers": workers, "posts": expected, "seconds": round(elapsed, 2),
+            "posts_per_s": round(expected / elapsed, 2), "lease_conflicts": conflicts}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--posts", type=int, default=300)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--latency", type=float, default=0.2, help="stub seconds per chat completion")
+    ap.add_argument("--port", type=int, default=8097)
+    args = ap.parse_args()
+
+    _start_stub(args.port, args.latency)
+    base = None
+    for n in args.workers:
+        res = check(args.posts, n, args.port)
+        base = base or res["posts_per_s"] / n
+        print(f"{n} worker(s): {res['posts']} posts in {res['seconds']}s = {res['posts_per_s']} posts/s "
+              f"(x{res['posts_per_s'] / base:.2f} of one worker), {res['lease_conflicts']} lease conflicts")
+    print("Lease protocol OK: one outcome per post, nothing left leased, expired leases reclaimed.")
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic Facebook-style Hebrew rental posts for benchmarks and regression checks.
+Deterministic for a given seed. Knobs:
+- length:  number of free-text body lines (besides the structured ones)
+- noise:   0..1 probability of each kind of FB boilerplate (headers, widgets, trailers, duplicates)
+- gazetteer_hits: 0..1 probability that the address uses a gazetteer street/landmark
+"""
+
+import random
+import re
+
+from easyrent.geo.ta_gazetteer import LANDMARK_TO_NEI_EN, STREET_TO_NEI_EN
+
+UNKNOWN_STREETS = ["הנרקיס", "האלון", "השקד", "הזית", "התאנה", "הדקל", "הרימון", "הגפן"]
+ADJECTIVES = ["מהממת", "מרווחת", "משופצת", "שקטה", "מוארת", "יוקרתית", "חמודה", "מטופחת"]
+FILLER = [
+    "דירה {adj} להשכרה, קרובה לים ולתחבורה ציבורית",
+    "מטבח חדש ומאובזר, מיזוג בכל החדרים",
+    "הבניין שקט ומטופח, שכנים נחמדים",
+    "מתאימה לזוג או ליחיד, אפשרות לטווח ארוך",
+    "5 דקות הליכה מהשוק ומבתי קפה",
+    "ריהוט חלקי נשאר בדירה, אפשר לתאם",
+    "חלונות גדולים, הרבה אור טבעי ונוף פתוח",
+    "The apartment is {adj_en}, close to the beach and public transport",
+]
+TIME_HEADERS = ["{n} שעות", "{n} דקות", "{n} ימים"]
+TRAILERS = [
+    "הודעה לייק תגובה שיתוף",
+    "כתיבת תגובה ציבורית…",
+    "שלחו את התגובה הראשונה שלכם",
+    "כתבו תגובה…",
+    "Write a comment…",
+    "למידע נוסף על נכס זה לחצו כאן",
+    "WhatsApp: https://wa.me/9725{phone}",
+    "קבוצת אלפא רשת סוכנויות נדל\"ן",
+]
+WIDGET = "+{price} ₪ · תל אביב TA\nדירה עם {rooms} חדרי שינה ו-1 חדרי אמבטיה"
+
+
+# "אבן גבירול 170+" / "רוקח (קטע נמל)" → bare street name
+_QUALIFIER_RE = re.compile(r"\s*\(.*?\)|\s+\d+(?:-\d+)?\+?$")
+
+
+def _street(rng: random.Random, gazetteer_hits: float) -> str:
+    if rng.random() < gazetteer_hits:
+        return _QUALIFIER_RE.sub("", rng.choice(list(STREET_TO_NEI_EN)))
+    return rng.choice(UNKNOWN_STREETS)
+
+
+def make_post(rng: random.Random, length: int = 4, noise: float = 0.5, gazetteer_hits: float = 0.5) -> str:
+    rooms = rng.choice([1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5])
+    price = rng.randrange(3500, 16000, 50)
+    street = _street(rng, gazetteer_hits)
+    number = rng.randint(1, 180)
+    phone = f"05{rng.randint(0, 9)}{rng.randint(1000000, 9999999)}"
+
+    lines = []
+    if rng.random() < noise:
+        lines.append("משותף עם: קבוצה ציבורית")
+    if rng.random() < noise:
+        lines.append(rng.choice(TIME_HEADERS).format(n=rng.randint(1, 23)) + " · ")
+
+    structured = [
+        f"להשכרה דירת {rooms:g} חדרים ברחוב {street} {number}",
+        f"מחיר: {price:,} ₪ לחודש",
+        f"קומה {rng.randint(0, 12)} {'עם מעלית' if rng.random() < 0.5 else 'ללא מעלית'}, {rng.randint(35, 140)} מ\"ר",
+        f"לפרטים: {phone[:3]}-{phone[3:]}",
+    ]
+    if rng.random() < gazetteer_hits:
+        structured.append(f"ממש ליד {rng.choice(list(LANDMARK_TO_NEI_EN))}")
+    body = [rng.choice(FILLER).format(adj=rng.choice(ADJECTIVES), adj_en="lovely") for _ in range(length)]
+    mixed = structured + body
+    rng.shuffle(mixed)
+    lines.extend(mixed)
+
+    if rng.random() < noise:  # duplicated block (FB "see translation")
+        lines.extend(rng.sample(mixed, k=min(2, len(mixed))))
+    if rng.random() < noise:
+        lines.append(WIDGET.format(price=f"{price:,}", rooms=int(rooms)))
+    if rng.random() < noise:
+        lines.append(rng.choice(TRAILERS).format(phone=phone[2:]))
+        lines.append("אהבתי · הגב · שתף")
+
+    text = "\n".join(lines)
+    if rng.random() < noise:
+        text = text.replace(" ", "\xa0", rng.randint(1, 3)) + "\u200f"
+    if rng.random() < noise * 0.5:
+        text += " · · ..."
+    return text
+
+
+def make_corpus(n: int, seed: int = 42, length: int = 4, noise: float = 0.5, gazetteer_hits: float = 0.5):
+    rng = random.Random(seed)
+    return [make_post(rng, length=length, noise=noise, gazetteer_hits=gazetteer_hits) for _ in range(n)]
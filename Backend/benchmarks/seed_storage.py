@@ -0,0 +1,94 @@
+"""
+Fill a local SQLite storage with synthetic posts (and optionally apartments), so the full
+main.py pipeline can run offline at realistic sizes.
+
+  python -m benchmarks.seed_storage --posts 20000 --apartments 50000 --old 0.3
+  EASYRENT_STORAGE=sqlite OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=stub python main.py
+
+With --rate, new posts are instead trickled in one at a time (posts/second) to feed
+`python main.py daemon`, the way the scraper would.
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from easyrent.config import SQLITE_STORAGE_PATH
+from easyrent.fingerprint import generate_fingerprint
+from easyrent.storage.sqlite import SQLiteStorage
+
+from .corpus import make_post
+
+_STATUSES = ["new"] * 8 + ["error", "skipped", "duplicate", "processed"]
+_CHUNK = 500
+
+
+def _post_id(rng, when: datetime, n: int) -> str:
+    return f"{when:%d%m%Y}_{n}_{rng.randint(100000, 999999)}"
+
+
+def _post_doc(rng, post_id: str, status: str, when: datetime) -> dict:
+    return {"id": post_id, "text": make_post(rng), "status": status, "created_at": when.isoformat(),
+            "contactName": f"user{rng.randint(1, 5000)}", "contactId": f"c{rng.randint(1, 5000)}"}
+
+
+def trickle(storage, posts: int, rate: float, seed_: int = 11):
+    """Write `posts` new posts at `rate` posts/second, stamped with created_at=now."""
+    rng = random.Random(seed_)
+    for n in range(posts):
+        now = datetime.now(timezone.utc)
+        post_id = _post_id(rng, now, n)
+        storage.commit([("set", "posts", post_id, _post_doc(rng, post_id, "new", now))])
+        time.sleep(1 / rate)
+    print(f"Trickled {posts} posts into {storage.path}")
+
+
+def seed(storage, posts: int, apartments: int, old: float, seed_: int = 11):
+    rng = random.Random(seed_)
+    now = datetime.now(timezone.utc)
+    ops = []
+
+    def _queue(op):
+        ops.append(op)
+        if len(ops) >= _CHUNK:
+            storage.commit(ops)
+            ops.clear()
+
+    t0 = time.perf_counter()
+    for n in range(posts):
+        when = now - timedelta(days=rng.randint(30, 90) if rng.random() < old else rng.randint(0, 10))
+        post_id = _post_id(rng, when, n)
+        doc = _post_doc(rng, post_id, rng.choice(_STATUSES), when)
+        if rng.random() < 0.5:
+            doc["indexed_at"] = when
+        _queue(("set", "posts", post_id, doc))
+
+    for n in range(apartments):
+        when = now - timedelta(days=rng.randint(30, 90) if rng.random() < old else rng.randint(0, 10))
+        apt = {"address": f"רחוב {rng.randint(1, 400)} {rng.randint(1, 180)}",
+               "rooms": rng.choice([1, 2, 2.5, 3, 3.5, 4, 5]),
+               "price": rng.randrange(3500, 16000, 50), "contactId": f"c{rng.randint(1, 5000)}",
+               "indexed_at": when}
+        apt["fingerprint"] = generate_fingerprint(apt)
+        _queue(("set", "apartments", _post_id(rng, when, n), apt))
+
+    if ops:
+        storage.commit(ops)
+    print(f"Seeded {posts} posts and {apartments} apartments into {storage.path} "
+          f"in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--path", default=str(SQLITE_STORAGE_PATH))
+    ap.add_argument("--posts", type=int, default=20000)
+    ap.add_argument("--apartments", type=int, default=50000)
+    ap.add_argument("--old", type=float, default=0.3, help="share of docs past the retention window")
+    ap.add_argument("--seed", type=int, default=11)
+    ap.add_argument("--rate", type=float, help="trickle --posts new posts at this many per second instead")
+    args = ap.parse_args()
+    if args.rate:
+        trickle(SQLiteStorage(args.path), args.posts, args.rate, args.seed)
+    else:
+        seed(SQLiteStorage(args.path), args.posts, args.apartments, args.old, args.seed)
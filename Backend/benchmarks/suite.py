@@ -0,0 +1,183 @@
+"""
+Micro-benchmark suite for the per-post (non-LLM) hot path, on the synthetic corpus.
+Each case is timed `--repeat` times; results (µs/op, median and best) are written as JSON and can
+be compared against a saved baseline, failing when a case got slower than --threshold.
+
+  python -m benchmarks.suite --save                      # record benchmarks/results/baseline.json
+  python -m benchmarks.suite --compare                   # re-run and flag regressions vs. the baseline
+  python -m benchmarks.suite --posts 5000 --noise 0.8 --gazetteer-hits 0.2 --only clean_post_text
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.corpus import make_corpus
+from easyrent.cleaning import clean_post_text
+from easyrent.fingerprint import generate_fingerprint
+from easyrent.fingerprint_index import FingerprintIndex
+from easyrent.gpt_extractor import _apply_guardrails, deterministic_neighborhood
+from easyrent.llm_input import prepare_post_text
+from easyrent.parsing import parse_gpt_output_safe
+from easyrent.processor import _normalize_rooms_value, _passes_guards, _save_extraction
+from easyrent.rule_extractor import extract_rule_based
+from easyrent.storage import Storage
+from easyrent.write_buffer import WriteBuffer
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+
+_ROOMS_VALUES = [3, "3", "3.5", "3,5", "שלושה וחצי", "2 וחצי", None, "", "4 חד'", 2.5]
+
+
+class _NullStorage(Storage):
+    """Accepts every write and stores nothing, so the pipeline is timed without I/O."""
+
+    name = "null"
+
+    def commit(self, ops):
+        pass
+
+
+def _fake_model_output(post: str, rng: random.Random) -> str:
+    """A model-like JSON answer for post (rule extraction + noise the sanitizer has to handle)."""
+    data, _ = extract_rule_based(post)
+    data.update({"is_apartment": True, "category": "שכירות", "title": "דירה להשכרה", "description": ""})
+    if isinstance(data.get("rooms"), float) and rng.random() < 0.3:
+        data["rooms"] = f"{data['rooms']:g}"
+    raw = json.dumps(data, ensure_ascii=False, default=str)
+    if rng.random() < 0.5:
+        raw = "\u200f" + raw.replace(', "', ',\u00a0"') + "\ufeff"
+    return raw
+
+
+def build_inputs(posts: int, seed: int, length: int, noise: float, gazetteer_hits: float) -> dict:
+    rng = random.Random(seed)
+    corpus = make_corpus(posts, seed=seed, length=length, noise=noise, gazetteer_hits=gazetteer_hits)
+    cleaned = [clean_post_text(p) for p in corpus]
+    extracted = [extract_rule_based(p)[0] for p in cleaned]
+    raw_outputs = [_fake_model_output(p, rng) for p in cleaned]
+    return {
+        "corpus": corpus,
+        "cleaned": cleaned,
+        "addresses": [(d.get("address"), p) for d, p in zip(extracted, cleaned)],
+        "rooms": [(rng.choice(_ROOMS_VALUES), p) for p in cleaned],
+        "apartments": [{"address": d.get("address"), "rooms": d.get("rooms"), "price": d.get("price")}
+                       for d in extracted],
+        "raw_outputs": raw_outputs,
+        "posts": [{"id": f"{n % 28 + 1:02d}102026_{n}", "text": p, "contactName": "bench",
+                   "contactId": f"c{n % 997}"} for n, p in enumerate(corpus)],
+    }
+
+
+def _pipeline(posts, raw_outputs):
+    """guards → parse model output → guardrails → normalize/dedup/save (writes dropped)."""
+    fp_index = FingerprintIndex()
+    writer = WriteBuffer(_NullStorage(), max_ops=500, max_delay=3600)
+    for post, raw in zip(posts, raw_outputs):
+        if _passes_guards(post, writer):
+            text = post["text"].strip()
+            _save_extraction(post, _apply_guardrails(parse_gpt_output_safe(raw), text), fp_index, writer)
+    writer.close()
+
+
+CASES = {
+    "clean_post_text": lambda i: [clean_post_text(p) for p in i["corpus"]],
+    "prepare_post_text": lambda i: [prepare_post_text(p) for p in i["corpus"]],
+    "parse_gpt_output_safe": lambda i: [parse_gpt_output_safe(r) for r in i["raw_outputs"]],
+    "deterministic_neighborhood": lambda i: [deterministic_neighborhood(a, t) for a, t in i["addresses"]],
+    "normalize_rooms_value": lambda i: [_normalize_rooms_value(r, t) for r, t in i["rooms"]],
+    "generate_fingerprint": lambda i: [generate_fingerprint(a) for a in i["apartments"]],
+    "process_post_non_llm": lambda i: _pipeline(i["posts"], i["raw_outputs"]),
+}
+
+
+def run(inputs: dict, repeat: int, only=None) -> dict:
+    n = len(inputs["corpus"])
+    results = {}
+    for name, case in CASES.items():
+        if only and name not in only:
+            continue
+        timings = []
+        for attempt in range(repeat + 1):  # the first round only warms up caches
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                case(inputs)
+                if attempt:
+                    timings.append((time.perf_counter() - t0) / n * 1e6)
+        results[name] = {"us_per_op": round(statistics.median(timings), 2),
+                         "best_us_per_op": round(min(timings), 2), "ops": n}
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Names of cases whose median is more than `threshold` slower than the baseline."""
+    regressions = []
+    print(f"{'case':<28}{'baseline µs':>12}{'now µs':>10}{'change':>9}")
+    for name, res in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:<28}{'-':>12}{res['us_per_op']:>10.2f}{'new':>9}")
+            continue
+        change = res["us_per_op"] / base["us_per_op"] - 1 if base["us_per_op"] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<28}{base['us_per_op']:>12.2f}{res['us_per_op']:>10.2f}{change:>+9.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--posts", type=int, default=2000)
+    ap.add_argument("--length", type=int, default=4, help="free-text body lines per post")
+    ap.add_argument("--noise", type=float, default=0.5, help="FB boilerplate probability (0..1)")
+    ap.add_argument("--gazetteer-hits", type=float, default=0.5, help="gazetteer address probability (0..1)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", nargs="*", choices=sorted(CASES))
+    ap.add_argument("--output", type=Path, help="write this run's results as JSON")
+    ap.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, type=Path, help="save results as the baseline")
+    ap.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, type=Path, help="compare against a baseline")
+    ap.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    args = ap.parse_args(argv)
+
+    params = {k: getattr(args, k) for k in ("posts", "length", "noise", "gazetteer_hits", "seed", "repeat")}
+    inputs = build_inputs(args.posts, args.seed, args.length, args.noise, args.gazetteer_hits)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+        "results": run(inputs, args.repeat, args.only),
+    }
+
+    for path in filter(None, (args.output, args.save)):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Results written to {path}")
+
+    if not args.compare:
+        for name, res in report["results"].items():
+            print(f"{name:>28}: {res['us_per_op']:.2f} µs/op (best {res['best_us_per_op']:.2f})")
+        return 0
+
+    baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+    if baseline.get("params") != params:
+        print(f"Warning: baseline was recorded with different parameters: {baseline.get('params')}")
+    regressions = compare(report["results"], baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
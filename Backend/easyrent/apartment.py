@@ -0,0 +1,203 @@
+"""
+The apartment document written to 'apartments', as a typed record.
+
+Apartment has a fixed schema and stores its fields in __slots__ (no per-record hash table), so
+tens of thousands of records take under a third of the memory of the equivalent dicts. Its
+constructor is the single place extraction output is validated: keys outside the schema are
+dropped instead of being stored in Firestore and downloaded by the frontend, and numeric/flag
+fields the model returned as strings are coerced (price "4,500 ₪" → 4500, rooms "3 וחצי" → 3.5,
+"yes" → True). Values the model already typed are kept as they are, so fingerprints of existing
+apartments don't change.
+"""
+
+import re
+from typing import Optional
+
+DEFAULT_TITLE = "דירה למכירה"
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+# "4,500" / "4.500" (Israeli notation) / "1,250,000": a separator followed by exactly three digits
+_THOUSANDS_RE = re.compile(r"(?<=\d)[.,](?=\d{3}(?!\d))")
+_TRUE = {"true", "yes", "y", "1", "כן", "יש"}
+_FALSE = {"false", "no", "n", "0", "לא", "אין"}
+_GROUND_FLOORS = {"קרקע", "קומת קרקע", "ground"}
+
+
+# ---------- Coercion of string values ----------
+
+def _number(value: str):
+    """Positive int/float from a string like "4,500 ₪", "4.500" or "3.5"; None if there is none."""
+    m = _NUMBER_RE.search(_THOUSANDS_RE.sub("", value))
+    if not m:
+        return None
+    s = m.group(0)
+    number = float(s) if "." in s else int(s)
+    return number if number > 0 else None
+
+
+def coerce_rooms(value) -> Optional[float]:
+    """Rooms as a float, half rooms included: 3, "3.5", "3,5", "2 וחצי", "חדר וחצי", "4 חד'"."""
+    if value is None or value.__class__ is float:
+        return value
+    if isinstance(value, str):
+        s = value.strip().replace(",", ".")
+        s = re.sub(r'^(\d+)\s*ו\s*חצי$', lambda m: f"{m.group(1)}.5", s)
+        s = re.sub(r'^חדר\s*ו\s*חצי$', "1.5", s)
+        s = re.sub(r"[^0-9.]", "", s)
+        try:
+            return float(s) if s else None
+        except ValueError:
+            return None
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _floor(value: str):
+    """Floor number (0 = ground); free text the frontend can still show is kept as-is."""
+    s = value.strip()
+    if s.lstrip("-").isdigit():
+        return int(s)
+    if s in _GROUND_FLOORS:
+        return 0
+    return s or None
+
+
+def _flag(value: str) -> Optional[bool]:
+    s = value.strip().lower()
+    if s in _TRUE:
+        return True
+    if s in _FALSE:
+        return False
+    return None
+
+
+_COERCE = {
+    "price": _number, "size": _number, "rooms": coerce_rooms, "floor": _floor,
+    "pets_allowed": _flag, "has_broker": _flag, "has_balcony": _flag, "has_safe_room": _flag,
+    "has_parking": _flag, "has_elevator": _flag, "has_garden": _flag,
+}
+
+
+class Apartment:
+    """
+    One apartment listing, built from extraction output plus source metadata:
+
+        apt = Apartment(data, {"id": post_id, "images": post.get("images", [])})
+
+    Missing fields are None (title: DEFAULT_TITLE). Attributes may be reassigned afterwards with
+    already-typed values. get()/[] mirror dict access, so fingerprinting and the dedup index take
+    an Apartment or a plain dict alike.
+    """
+
+    __slots__ = (
+        "id", "title", "description", "price", "rooms", "size", "neighborhood", "address", "floor",
+        "property_type", "pets_allowed", "has_broker", "has_balcony", "has_safe_room", "has_parking",
+        "has_elevator", "has_garden", "available_from", "facebook_url", "category", "rental_scope",
+        "phone_number", "images", "contactId", "contactName", "upload_date", "fingerprint",
+    )
+
+    def __init__(self, data: dict, fields: Optional[dict] = None):
+        """
+        `data` is an extraction result (keys outside the schema, like is_apartment, are ignored);
+        `fields` are source metadata and processor values, set as given.
+        """
+        if fields:
+            data = {**data, **fields}
+        get = data.get
+        self.id = get("id")
+        self.title = get("title", DEFAULT_TITLE)
+        self.description = get("description")
+        self.price = get("price")
+        self.rooms = get("rooms")
+        self.size = get("size")
+        self.neighborhood = get("neighborhood")
+        self.address = get("address")
+        self.floor = get("floor")
+        self.property_type = get("property_type")
+        self.pets_allowed = get("pets_allowed")
+        self.has_broker = get("has_broker")
+        self.has_balcony = get("has_balcony")
+        self.has_safe_room = get("has_safe_room")
+        self.has_parking = get("has_parking")
+        self.has_elevator = get("has_elevator")
+        self.has_garden = get("has_garden")
+        self.available_from = get("available_from")
+        self.facebook_url = get("facebook_url")
+        self.category = get("category")
+        self.rental_scope = get("rental_scope")
+        self.phone_number = get("phone_number")
+        self.images = get("images")
+        self.contactId = get("contactId")
+        self.contactName = get("contactName")
+        self.upload_date = get("upload_date")
+        self.fingerprint = get("fingerprint")
+        if (self.price.__class__ is str or self.size.__class__ is str or self.rooms.__class__ is str
+                or self.floor.__class__ is str or self.pets_allowed.__class__ is str
+                or self.has_broker.__class__ is str or self.has_balcony.__class__ is str
+                or self.has_safe_room.__class__ is str or self.has_parking.__class__ is str
+                or self.has_elevator.__class__ is str or self.has_garden.__class__ is str):
+            self._coerce()
+
+    def _coerce(self):
+        for name, coerce in _COERCE.items():
+            value = getattr(self, name)
+            if value.__class__ is str:
+                setattr(self, name, coerce(value))
+
+    def get(self, name: str, default=None):
+        return getattr(self, name) if name in _FIELD_SET else default
+
+    def __getitem__(self, name: str):
+        if name not in _FIELD_SET:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def to_firestore(self, **extra) -> dict:
+        """
+        The document to write, plus `extra` fields (timestamps): every schema field, None included,
+        since the frontend expects them all.
+        """
+        doc = _EMPTY_DOC.copy()
+        doc["id"] = self.id
+        doc["title"] = self.title
+        doc["description"] = self.description
+        doc["price"] = self.price
+        doc["rooms"] = self.rooms
+        doc["size"] = self.size
+        doc["neighborhood"] = self.neighborhood
+        doc["address"] = self.address
+        doc["floor"] = self.floor
+        doc["property_type"] = self.property_type
+        doc["pets_allowed"] = self.pets_allowed
+        doc["has_broker"] = self.has_broker
+        doc["has_balcony"] = self.has_balcony
+        doc["has_safe_room"] = self.has_safe_room
+        doc["has_parking"] = self.has_parking
+        doc["has_elevator"] = self.has_elevator
+        doc["has_garden"] = self.has_garden
+        doc["available_from"] = self.available_from
+        doc["facebook_url"] = self.facebook_url
+        doc["category"] = self.category
+        doc["rental_scope"] = self.rental_scope
+        doc["phone_number"] = self.phone_number
+        doc["images"] = self.images
+        doc["contactId"] = self.contactId
+        doc["contactName"] = self.contactName
+        doc["upload_date"] = self.upload_date
+        doc["fingerprint"] = self.fingerprint
+        if extra:
+            doc.update(extra)
+        return doc
+
+    def __repr__(self) -> str:
+        return f"Apartment(id={self.id!r}, address={self.address!r}, rooms={self.rooms!r}, price={self.price!r})"
+
+
+FIELDS = Apartment.__slots__
+_FIELD_SET = frozenset(FIELDS)
+# Copied by to_firestore(): a dict already sized for every field, so the stores never resize it
+_EMPTY_DOC = dict.fromkeys(FIELDS)
@@ -0,0 +1,111 @@
+"""
+OpenAI Batch-API support for nightly backfills.
+- write_batch_file: one chat-completion request per post (custom_id = post id) as JSONL.
+- submit_batch_file / get_batch: upload the file and create/poll the batch job.
+- download_batch_output / read_batch_output: fetch the output JSONL and map post id → model text
+  (and → error code for requests that failed).
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from .config import BATCH_JOBS_DIR, OPENAI_MODEL
+from .gpt_extractor import build_request_body, get_client
+from .metrics import METRICS
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+# Batch states that end a job without completing it; whatever finished is still in its files
+BATCH_FAILED_STATUSES = ("failed", "expired", "cancelled")
+# Per-request error codes of requests the API never ran (the batch ended first)
+UNRUN_REQUEST_ERRORS = ("batch_expired", "batch_cancelled")
+
+
+def new_batch_file_path() -> Path:
+    BATCH_JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    return BATCH_JOBS_DIR / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+
+def write_batch_file(posts: dict, path) -> int:
+    """Write {post_id: post_text} as Batch-API request lines. Returns the number of lines written."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for post_id, text in posts.items():
+            line = {
+                "custom_id": str(post_id),
+                "method": "POST",
+                "url": CHAT_COMPLETIONS_ENDPOINT,
+                "body": build_request_body(text),
+            }
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def submit_batch_file(path) -> str:
+    """Upload a job file and create the batch. Returns the batch id."""
+    with open(path, "rb") as f:
+        uploaded = get_client().files.create(file=f, purpose="batch")
+    batch = get_client().batches.create(
+        input_file_id=uploaded.id,
+        endpoint=CHAT_COMPLETIONS_ENDPOINT,
+        completion_window="24h",
+    )
+    return batch.id
+
+
+def get_batch(batch_id: str):
+    return get_client().batches.retrieve(batch_id)
+
+
+def download_batch_output(batch_id: str) -> Optional[Path]:
+    """
+    Save the output (and error) JSONL of a finished batch next to the job files. A batch that
+    failed, expired or was cancelled is finished too: its files hold the requests that did
+    complete (possibly none). Returns the output path, or None while the batch is still running.
+    """
+    batch = get_batch(batch_id)
+    if batch.status != "completed" and batch.status not in BATCH_FAILED_STATUSES:
+        print(f"Batch {batch_id} is '{batch.status}' – nothing to download yet.")
+        return None
+    if batch.status != "completed":
+        errors = getattr(batch.errors, "data", None) or []
+        reasons = "; ".join(f"{e.code}: {e.message}" for e in errors) or "no details"
+        print(f"Batch {batch_id} {batch.status} ({reasons}) – applying what completed.")
+
+    BATCH_JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    out_path = BATCH_JOBS_DIR / f"{batch_id}_output.jsonl"
+    with open(out_path, "w", encoding="utf-8") as f:
+        if batch.output_file_id:
+            f.write(get_client().files.content(batch.output_file_id).text)
+        if batch.error_file_id:
+            f.write(get_client().files.content(batch.error_file_id).text)
+    return out_path
+
+
+def read_batch_output(path) -> tuple:
+    """
+    Parse a Batch-API output file. Returns ({post_id: model text or None (unusable answer)},
+    {post_id: error code} for requests that failed); posts in neither were never answered.
+    Token usage of every answered request is recorded (at batch pricing).
+    """
+    results, errors = {}, {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            response = row.get("response") or {}
+            if row.get("error") or response.get("status_code") != 200:
+                error = row.get("error") or (response.get("body") or {}).get("error") or {}
+                errors[row.get("custom_id")] = error.get("code") or f"http_{response.get('status_code')}"
+                continue
+            body = response.get("body") or {}
+            METRICS.record_response_usage(body.get("model") or OPENAI_MODEL, body.get("usage"), batch=True)
+            try:
+                results[row.get("custom_id")] = body["choices"][0]["message"]["content"].strip()
+            except (KeyError, IndexError, TypeError, AttributeError):
+                results[row.get("custom_id")] = None
+    return results, errors
@@ -0,0 +1,88 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED, FIRST_COMPLETED
+
+from .config import DELETE_WORKERS, FIRESTORE_DELETE_BATCH, SCAN_PAGE_SIZE
+
+
+def paged(query, order_field: str = "__name__", page_size: int = SCAN_PAGE_SIZE, start_after=None):
+    """
+    Stream a query page by page with cursors (never re-reading from the start),
+    so pages stay valid while earlier results are being deleted.
+    start_after: cursor to begin past (a snapshot or {order_field: value}).
+    """
+    query = query.order_by(order_field).limit(page_size)
+    last = start_after
+    while True:
+        page = list((query.start_after(last) if last is not None else query).stream())
+        yield from page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+
+
+class ParallelDeleter:
+    """
+    Deletes document references in batches of batch_size, with up to `workers` batch commits
+    in flight. With dry_run=True nothing is deleted and only counts are kept.
+    Use as a context manager: leaving the block waits for every pending commit.
+    """
+
+    def __init__(self, db, workers: int = DELETE_WORKERS, batch_size: int = FIRESTORE_DELETE_BATCH,
+                 dry_run: bool = False):
+        self._db = db
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.deleted = 0
+        self._refs = []
+        self._pool = None
+        self._in_flight = set()
+        self._t0 = time.perf_counter()
+
+    def __enter__(self):
+        if not self.dry_run:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="easyrent-delete")
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+        if self._pool is not None:
+            self._drain(ALL_COMPLETED)
+            self._pool.shutdown()
+        return False
+
+    def delete(self, ref):
+        self._refs.append(ref)
+        if len(self._refs) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        refs, self._refs = self._refs, []
+        if not refs:
+            return
+        if self.dry_run:
+            self.deleted += len(refs)
+            return
+        if len(self._in_flight) >= self.workers:
+            self._drain()
+        self._in_flight.add(self._pool.submit(self._commit, refs))
+
+    def _commit(self, refs) -> int:
+        batch = self._db.batch()
+        for ref in refs:
+            batch.delete(ref)
+        batch.commit()
+        return len(refs)
+
+    def _drain(self, return_when=FIRST_COMPLETED):
+        done, self._in_flight = wait(self._in_flight, return_when=return_when)
+        for fut in done:
+            self.deleted += fut.result()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def rate(self) -> float:
+        """Deletes per second so far."""
+        return self.deleted / self.elapsed if self.elapsed > 0 else 0.0
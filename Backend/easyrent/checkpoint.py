@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+from .config import PROCESS_CHECKPOINT_EVERY
+
+
+class RunCheckpoint:
+    """
+    Persisted progress of a processing run over id-ordered posts: run id + the last post id
+    such that it and every post before it are finished (a low watermark, so posts completing
+    out of order under concurrency never move it past unfinished ones).
+    A run that dies leaves the file behind and the next run with the same scope resumes past
+    last_id under the same run id; a run that finishes removes it.
+    """
+
+    def __init__(self, path, scope: str, run_id: Optional[str] = None, last_id: Optional[str] = None,
+                 every: int = PROCESS_CHECKPOINT_EVERY):
+        self.path = Path(path)
+        self.scope = scope
+        self.every = max(1, every)
+        self.resumed = run_id is not None
+        self.run_id = run_id or f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.last_id = last_id
+        self._started = deque()
+        self._done = set()
+        self._since_save = 0
+        self._held = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, scope: str) -> "RunCheckpoint":
+        """Resume the checkpoint at path if it belongs to the same scope, else start a new run."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return cls(path, scope)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable checkpoint {path}: {e}")
+            return cls(path, scope)
+        if state.get("scope") != scope:
+            print(f"Checkpoint {path} is for '{state.get('scope')}', not '{scope}' — starting over.")
+            return cls(path, scope)
+        cp = cls(path, scope, run_id=state.get("run_id"), last_id=state.get("last_id"))
+        print(f"Resuming run {cp.run_id} after post {cp.last_id}.")
+        return cp
+
+    # ---------- Progress ----------
+
+    def start(self, post_id: str):
+        with self._lock:
+            self._started.append(post_id)
+
+    def done(self, post_id: str) -> bool:
+        """Mark post_id finished. Returns True once every `every` completions (time to save)."""
+        with self._lock:
+            self._done.add(post_id)
+            while self._started and self._started[0] in self._done:
+                self.last_id = self._started.popleft()
+                self._done.discard(self.last_id)
+            self._since_save += 1
+            return self._since_save >= self.every
+
+    def hold(self):
+        """
+        Writes of finished posts were lost: stop saving (and don't clear at the end), so the next
+        run resumes from the last checkpoint whose writes all landed. Posts finished since then
+        are skipped by their status.
+        """
+        with self._lock:
+            if not self._held:
+                print(f"Checkpoint of run {self.run_id} held after lost writes.")
+            self._held = True
+
+    # ---------- Persistence ----------
+
+    def save(self):
+        with self._lock:
+            if self._held:
+                return
+            state = {"scope": self.scope, "run_id": self.run_id, "last_id": self.last_id,
+                     "saved_at": time.time()}
+            self._since_save = 0
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        """The run finished: the next one starts from the beginning."""
+        if self._held:
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -1,5 +1,46 @@
 import re
 
+# ---------- Patterns (compiled once) ----------
+
+_TIME_PATTERN = r"\d+\s*(ימים|שעות|שניה|שניות|דקות)"
+# Post body starts after the last of these headers
+_START_RES = (
+    re.compile(r"משותף עם: קבוצה ציבורית"),
+    re.compile(_TIME_PATTERN),
+)
+
+# FB listing widget / reactions bar: cut at the first pattern (in this order) that matches
+_END_RES = (
+    re.compile(r"\+\d[\d,\.₪ ]* · .*?TA.*?דירה עם.*?חדרי אמבטיה", re.DOTALL),
+    re.compile(r"תל אביב.*?TA.*?דירה עם.*?חדרי אמבטיה", re.DOTALL),
+    re.compile(r"הודעה\s*לייק\s*תגובה\s*שיתוף", re.DOTALL),
+    re.compile(r"כתיבת תגובה ציבורית.*$", re.DOTALL),
+)
+
+# FB "write a comment" prompts & marketing footers: everything from the earliest one is dropped
+_FB_TRAILERS = (
+    r"שלחי את התגובה הראשונה שלך",
+    r"שלחו את התגובה הראשונה שלכם",
+    r"כתובי תגובה",
+    r"כתבו תגובה",
+    r"Write a comment",
+    r"Send the first reply",
+    r"למידע נוסף על נכס זה",
+    r"For more information about this property",
+    r"WhatsApp\s*:",
+)
+# Agency signatures; the gap may not run over another trailer (which would have cut first)
+_AGENCY_TRAILER = r"קבוצת (?:(?!" + "|".join(_FB_TRAILERS) + r").){0,40} רשת סוכנויות"
+_TRAILERS_RE = re.compile(
+    "(?:" + "|".join(_FB_TRAILERS + (_AGENCY_TRAILER,)) + ").*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+_WS_RE = re.compile(r"\s+")
+_LINE_STRIP = " ·•-—\u2022"
+_TRAILING_JUNK = "·•."
+
+
 def clean_post_text(raw_text: str) -> str:
     """
     Remove FB boilerplate (timestamps, reactions UI, shared-with hints),
@@ -7,57 +48,41 @@ def clean_post_text(raw_text: str) -> str:
     """
     raw_text = raw_text.strip().replace('\u200f', '').replace('\xa0', ' ')
 
-    time_pattern = r"\d+\s*(ימים|שעות|שניה|שניות|דקות)"
-    start_keywords = [r"משותף עם: קבוצה ציבורית", time_pattern]
     min_start = 0
-    for pattern in start_keywords:
-        match = re.search(pattern, raw_text)
+    for pattern in _START_RES:
+        match = pattern.search(raw_text)
         if match:
             min_start = max(min_start, match.end())
     raw_text = raw_text[min_start:].lstrip(" ·\n")
 
-    end_patterns = [
-        r"\+\d[\d,\.₪ ]* · .*?TA.*?דירה עם.*?חדרי אמבטיה",
-        r"תל אביב.*?TA.*?דירה עם.*?חדרי אמבטיה",
-        r"הודעה\s*לייק\s*תגובה\s*שיתוף",
-        r"כתיבת תגובה ציבורית.*$"
-    ]
-    for pattern in end_patterns:
-        match = re.search(pattern, raw_text, re.DOTALL)
+    for pattern in _END_RES:
+        match = pattern.search(raw_text)
         if match:
             raw_text = raw_text[:match.start()]
             break
-    
-    # --- NEW: strip FB "write a comment" prompts & marketing footers ---
-    fb_trailers = [
-        r"שלחי את התגובה הראשונה שלך.*$",
-        r"שלחו את התגובה הראשונה שלכם.*$",
-        r"כתובי תגובה.*$",
-        r"כתבו תגובה.*$",
-        r"Write a comment.*$",
-        r"Send the first reply.*$",
-        r"למידע נוסף על נכס זה.*$",
-        r"For more information about this property.*$",
-        r"WhatsApp\s*:.*$",
-        r"קבוצת .{0,40} רשת סוכנויות.*$",   # חתימות סוכנויות כלליות
-    ]
-    for pattern in fb_trailers:
-        raw_text = re.sub(pattern, "", raw_text, flags=re.IGNORECASE | re.DOTALL).strip()
-
-    # --- NEW: collapse duplicate lines/blocks (e.g., repeated translation) ---
-    lines = [ln.strip(" ·•-—\u2022") for ln in raw_text.splitlines()]
+
+    # --- strip FB "write a comment" prompts & marketing footers (single pass) ---
+    match = _TRAILERS_RE.search(raw_text)
+    if match:
+        raw_text = raw_text[:match.start()]
+    raw_text = raw_text.strip()
+
+    # --- collapse duplicate lines/blocks (e.g., repeated translation) in one sweep ---
     uniq = []
     seen = set()
-    for ln in lines:
+    for ln in raw_text.splitlines():
+        ln = ln.strip(_LINE_STRIP)
         if not ln:
             continue
-        key = re.sub(r"\s+", " ", ln)
+        key = _WS_RE.sub(" ", ln)
         if key not in seen:
             seen.add(key)
             uniq.append(ln)
     raw_text = "\n".join(uniq)
 
-    # --- NEW: trim trailing dots/bullets ---
-    raw_text = re.sub(r"[·•\.\s]+$", "", raw_text).strip()
-    
-    return raw_text.strip()
+    # --- trim trailing dots/bullets (linear scan; a `[...]+$` regex is quadratic on long runs) ---
+    end = len(raw_text)
+    while end and (raw_text[end - 1] in _TRAILING_JUNK or raw_text[end - 1].isspace()):
+        end -= 1
+
+    return raw_text[:end].strip()
@@ -1,28 +1,23 @@
-from google.cloud.firestore_v1 import FieldFilter
-from .firebase import db
-from .config import FIRESTORE_DELETE_BATCH
+import time
+from .metrics import METRICS
+from .storage import get_storage
 
-def delete_posts_by_status(statuses, batch_size=FIRESTORE_DELETE_BATCH):
+def delete_posts_by_status(statuses, dry_run=False):
     """
     Delete documents from 'posts' where status is in statuses.
-    Runs in batches to respect Firestore limits.
+    On Firestore only references (plus status) are streamed, with a cursor over one query,
+    and deleted in parallel batches.
+    Deleted docs stop matching the query, so re-running after an interruption picks up
+    where it stopped.
     """
-    total_deleted = 0
-    while True:
-        q = db.collection("posts").where(
-            filter=FieldFilter("status", "in", statuses)
-        ).limit(batch_size)
+    statuses = list(statuses)
+    t0 = time.perf_counter()
+    with METRICS.stage("cleanup"):
+        deleted = get_storage().delete_where("posts", "status", "in", statuses, dry_run=dry_run)
+    METRICS.count("cleaned.posts", deleted)
+    elapsed = time.perf_counter() - t0
 
-        docs = list(q.stream())
-        if not docs:
-            break
-
-        batch = db.batch()
-        for doc in docs:
-            batch.delete(doc.reference)
-        batch.commit()
-
-        total_deleted += len(docs)
-        print(f"Deleted {len(docs)} posts this batch...")
-
-    print(f"Done. Deleted {total_deleted} posts with statuses: {statuses}")
+    verb = "Would delete" if dry_run else "Deleted"
+    print(f"Done. {verb} {deleted} posts with statuses: {statuses} "
+          f"in {elapsed:.2f}s ({deleted / elapsed if elapsed > 0 else 0:.0f} deletes/s)")
+    return deleted
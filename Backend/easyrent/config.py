@@ -1,26 +1,136 @@
 # easyrent/config.py
 import os
+import socket
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Load environment variables from .env (OPENAI_API_KEY, etc.)
-load_dotenv()
+
+def _load_dotenv():
+    # Load environment variables from .env (OPENAI_API_KEY, etc.), searched upwards from this
+    # package like load_dotenv() does; python-dotenv is only imported when there is a file to read.
+    here = Path(__file__).resolve().parent
+    for d in (here, *here.parents):
+        if (d / ".env").is_file():
+            from dotenv import load_dotenv
+            load_dotenv(d / ".env")
+            return
+
+
+_load_dotenv()
 
 # Project base dir (repo root = parent of this file's parent)
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # OpenAI settings
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None   # e.g. http://127.0.0.1:8089/v1 for the local stub
 
 OPENAI_MODEL = "gpt-4o-mini"
 OPENAI_TEMPERATURE = 0.1
 OPENAI_MAX_TOKENS = 3000
 
+# USD per 1M tokens (input, output) for cost estimates; Batch-API requests are billed at BATCH_DISCOUNT
+OPENAI_PRICES_PER_1M = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+OPENAI_BATCH_DISCOUNT = 0.5
+
+# Client-side pacing: account limits for OPENAI_MODEL (refined from x-ratelimit-* response headers)
+# and in-process retries for 429/5xx/timeouts, with exponential backoff + jitter
+OPENAI_RPM = int(os.getenv("EASYRENT_OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("EASYRENT_OPENAI_TPM", "200000"))
+OPENAI_MAX_ATTEMPTS = int(os.getenv("EASYRENT_OPENAI_ATTEMPTS", "5"))
+OPENAI_BACKOFF_BASE = 1.0           # seconds before the first retry (doubles per attempt)
+OPENAI_BACKOFF_CAP = 60.0
+
+# Backfills: posts per multi-post request, and where Batch-API job files are written
+EXTRACTION_BATCH_SIZE = 8
+OPENAI_BATCH_MAX_TOKENS = 12000
+BATCH_JOBS_DIR = BASE_DIR / "batch_jobs"
+
 # Firestore / housekeeping settings
 FIRESTORE_DELETE_BATCH = 500        # batch size for deletions
 PRUNE_DAYS = 100                     # days threshold for pruning old docs ,
                                     # we change this to 100 only for our mentor to checking
                                     # in the original repo it is 14 days
-# Local JSONL log file for problematic posts
+RETENTION_DAYS = 14                 # written as expire_at at index time (same window main.py prunes with)
+DELETE_WORKERS = int(os.getenv("EASYRENT_DELETE_WORKERS", "4"))    # delete batches committed in parallel
+SCAN_PAGE_SIZE = 1000               # docs per cursor page when scanning for deletions
+# Storage backend: "firestore" (production) or "sqlite" (local file, for offline runs and load tests)
+STORAGE_BACKEND = os.getenv("EASYRENT_STORAGE", "firestore")
+SQLITE_STORAGE_PATH = Path(os.getenv("EASYRENT_SQLITE_PATH", str(BASE_DIR / "easyrent.sqlite3")))
+
+# Local JSONL log file for problematic posts (buffered; gzip-rotated past ERROR_LOG_MAX_BYTES)
 ERROR_LOG_PATH = BASE_DIR / "error_log.jsonl"
 ERROR_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+ERROR_LOG_MAX_BYTES = 5 * 1024 * 1024
+ERROR_LOG_KEEP = 10                 # rotated .jsonl.gz files kept
+ERROR_LOG_FLUSH_EVERY = 50          # buffered entries before an append
+
+# Failed posts are retried with exponential backoff (attempts + next_attempt_at on the post);
+# after POST_MAX_ATTEMPTS failures they are parked as "dead_letter" and no longer sent to the LLM
+POST_MAX_ATTEMPTS = int(os.getenv("EASYRENT_POST_ATTEMPTS", "5"))
+POST_RETRY_BASE = 15 * 60           # seconds before the first retry (doubles per failure)
+POST_RETRY_CAP = 24 * 3600
+
+# Posts are read in id-ordered pages; progress is checkpointed so an interrupted run resumes
+POSTS_PAGE_SIZE = 200
+PROCESS_CHECKPOINT_PATH = BASE_DIR / "process_checkpoint.json"
+PROCESS_CHECKPOINT_EVERY = 50          # completed posts between checkpoint saves
+
+# Post processing concurrency (1 = sequential, original behavior)
+PROCESS_CONCURRENCY = int(os.getenv("EASYRENT_CONCURRENCY", "1"))   # parallel workers (GPT + Firestore)
+PROCESS_QUEUE_DEPTH = int(os.getenv("EASYRENT_QUEUE_DEPTH", "16"))  # max posts pulled ahead of completion
+
+# Multiple workers on one posts collection: each post is leased ("processing") before extraction.
+# `main.py work` always uses leases; EASYRENT_LEASES=1 turns them on for the regular run too.
+PROCESS_LEASES_ENABLED = os.getenv("EASYRENT_LEASES", "0") == "1"
+WORKER_ID = os.getenv("EASYRENT_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+LEASE_SECONDS = float(os.getenv("EASYRENT_LEASE_SECONDS", "300"))
+# "k/n" (e.g. "0/4"): the worker first takes the posts whose id hashes to shard k of n, then helps
+# with whatever is left. Give each of n workers its own k so they don't race for the same leases.
+WORKER_SHARD = os.getenv("EASYRENT_WORKER_SHARD", "")
+
+# Daemon mode (`main.py daemon`): new posts are micro-batched as they arrive
+DAEMON_BATCH_SIZE = int(os.getenv("EASYRENT_DAEMON_BATCH", "16"))
+DAEMON_MAX_WAIT = float(os.getenv("EASYRENT_DAEMON_WAIT", "2.0"))        # seconds from first queued post
+DAEMON_POLL_INTERVAL = float(os.getenv("EASYRENT_DAEMON_POLL", "5.0"))   # polling fallback (local backend)
+DAEMON_RETRY_INTERVAL = float(os.getenv("EASYRENT_DAEMON_RETRY", "60"))  # query due error posts (s)
+DAEMON_INDEX_REFRESH = 3600                                               # reload fingerprint index (s)
+
+# On-disk cache of LLM extraction results (keyed on post text + model + prompt version)
+EXTRACTION_CACHE_ENABLED = os.getenv("EASYRENT_EXTRACTION_CACHE", "1") != "0"
+EXTRACTION_CACHE_PATH = BASE_DIR / "extraction_cache.sqlite3"
+EXTRACTION_CACHE_MAX_ENTRIES = 50_000
+EXTRACTION_CACHE_MAX_AGE_DAYS = 30
+
+# Extraction prompt: "relevant" injects only gazetteer entries mentioned in the post, "full" injects all
+PROMPT_GAZETTEER_MODE = os.getenv("EASYRENT_PROMPT_MODE", "relevant")
+
+# LLM input: the post is cleaned of FB boilerplate/UI before extraction, and posts over this many
+# tokens are truncated, keeping price/address/contact lines (0 = no limit)
+EXTRACTION_INPUT_MAX_TOKENS = int(os.getenv("EASYRENT_INPUT_MAX_TOKENS", "600"))
+
+# Rule-based fast path: skip the LLM when all required fields are confidently extracted by regex
+RULE_FASTPATH_ENABLED = os.getenv("EASYRENT_RULE_FASTPATH", "1") != "0"
+RULE_FASTPATH_REQUIRED = ("price", "rooms", "address", "neighborhood", "phone_number")
+RULE_FASTPATH_MIN_CONFIDENCE = 0.8
+
+# Fingerprint index: optional on-disk snapshot for warm starts (ids are still reconciled each run)
+FINGERPRINT_SNAPSHOT_ENABLED = os.getenv("EASYRENT_FP_SNAPSHOT", "0") == "1"
+FINGERPRINT_SNAPSHOT_PATH = BASE_DIR / "fingerprint_index.json"
+
+# Fuzzy duplicate matching (same street + rooms; scored on house number, price and contact)
+DEDUP_FUZZY_ENABLED = os.getenv("EASYRENT_FUZZY_DEDUP", "1") != "0"
+DEDUP_MATCH_THRESHOLD = 0.6
+DEDUP_PRICE_ABS_TOL = 300        # ₪
+DEDUP_PRICE_REL_TOL = 0.05
+
+# Processor writes are buffered into batched commits (EASYRENT_WRITE_BATCH=1 writes through)
+WRITE_BUFFER_MAX_OPS = int(os.getenv("EASYRENT_WRITE_BATCH", "100"))
+WRITE_BUFFER_MAX_DELAY = float(os.getenv("EASYRENT_WRITE_DELAY", "2.0"))  # seconds
+WRITE_BUFFER_RETRIES = 3
+
+# Run report: JSON per run + Prometheus textfile (node_exporter textfile collector format)
+RUN_REPORT_DIR = Path(os.getenv("EASYRENT_REPORT_DIR", str(BASE_DIR / "run_reports")))
+METRICS_TEXTFILE_PATH = Path(os.getenv("EASYRENT_PROM_TEXTFILE", str(BASE_DIR / "easyrent.prom")))
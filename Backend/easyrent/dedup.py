@@ -0,0 +1,133 @@
+"""
+Fuzzy duplicate matching for apartments.
+
+The exact fingerprint misses re-posts whose address is spelled differently
+("רחוב אבן גבירול 12" vs "אבן-גבירול 12") or whose price moved a little.
+Listings are blocked by (normalized street, rooms), so a lookup only scores the handful of
+apartments on the same street with the same room count.
+"""
+
+import re
+from typing import Optional
+
+from .config import DEDUP_MATCH_THRESHOLD, DEDUP_PRICE_ABS_TOL, DEDUP_PRICE_REL_TOL
+
+# Street-type prefixes that don't identify the street
+_PREFIX_RE = re.compile(r'^(?:(?:רחוב|רח[\'׳]|שדרות|שד[\'׳]|שד\.)\s*)+')
+_PUNCT_RE = re.compile(r'["״\'׳`.,()]')
+_DASH_RE = re.compile(r'[-־–]')
+_WS_RE = re.compile(r'\s+')
+_HOUSE_RE = re.compile(r'\d+')
+_DIGITS_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# Score weights; conflicting house numbers or out-of-tolerance prices never match
+_W_HOUSE = 0.4
+_W_PRICE = 0.35
+_W_CONTACT = 0.25
+
+
+def split_address(address) -> tuple:
+    """'רחוב אבן-גבירול 12, תל אביב' → ('אבן גבירול', '12'). House number may be None."""
+    if not isinstance(address, str):
+        return None, None
+    s = _PREFIX_RE.sub('', _DASH_RE.sub(' ', address.strip()))
+    m = _HOUSE_RE.search(s)
+    # Anything after the number (or after a comma, e.g. the city) isn't part of the street
+    street = s[:m.start()] if m else s.split(',')[0]
+    street = _WS_RE.sub(' ', _PUNCT_RE.sub('', street)).strip()
+    return (street or None), (m.group(0) if m else None)
+
+
+def _rooms_key(rooms) -> Optional[float]:
+    try:
+        return round(float(rooms) * 2) / 2
+    except (TypeError, ValueError):
+        return None
+
+
+def _price_value(price) -> Optional[int]:
+    if isinstance(price, (int, float)):
+        return int(price) if price > 0 else None
+    if isinstance(price, str):
+        m = _DIGITS_RE.search(price.replace(',', ''))
+        return int(float(m.group(0))) if m else None
+    return None
+
+
+class DuplicateMatcher:
+    """
+    Blocking index of live listings: (street, rooms) → [(doc_id, house, price, contactId)].
+    Not thread-safe on its own; FingerprintIndex serializes access.
+    """
+
+    def __init__(self, threshold: float = DEDUP_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._blocks = {}
+        self._block_of = {}
+
+    @staticmethod
+    def record(data: dict) -> Optional[tuple]:
+        """Blocking key + scoring fields of an apartment, or None if it can't be blocked."""
+        street, house = split_address(data.get("address"))
+        rooms = _rooms_key(data.get("rooms"))
+        if not street or rooms is None:
+            return None
+        return (street, rooms), house, _price_value(data.get("price")), data.get("contactId")
+
+    def add(self, doc_id: str, data: dict):
+        rec = self.record(data)
+        if rec is None:
+            return
+        self.remove(doc_id)
+        key, house, price, contact = rec
+        self._blocks.setdefault(key, []).append((doc_id, house, price, contact))
+        self._block_of[doc_id] = key
+
+    def remove(self, doc_id: str):
+        key = self._block_of.pop(doc_id, None)
+        if key is None:
+            return
+        block = [c for c in self._blocks.get(key, ()) if c[0] != doc_id]
+        if block:
+            self._blocks[key] = block
+        else:
+            self._blocks.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._block_of)
+
+    @staticmethod
+    def score(house, price, contact, cand) -> float:
+        """Similarity in [0, 1] between a listing and a same-block candidate (0 on conflict)."""
+        _, c_house, c_price, c_contact = cand
+        total = 0.0
+
+        if house and c_house:
+            if house != c_house:
+                return 0.0
+            total += _W_HOUSE
+
+        if price and c_price:
+            tol = max(DEDUP_PRICE_ABS_TOL, DEDUP_PRICE_REL_TOL * max(price, c_price))
+            diff = abs(price - c_price)
+            if diff > tol:
+                return 0.0
+            total += _W_PRICE * (1 - 0.5 * diff / tol)
+
+        if contact and contact == c_contact:
+            total += _W_CONTACT
+
+        return total
+
+    def find(self, data: dict) -> Optional[str]:
+        """Id of the best-scoring existing apartment above the threshold, or None."""
+        rec = self.record(data)
+        if rec is None:
+            return None
+        key, house, price, contact = rec
+        best_id, best = None, self.threshold
+        for cand in self._blocks.get(key, ()):
+            s = self.score(house, price, contact, cand)
+            if s >= best:
+                best_id, best = cand[0], s
+        return best_id
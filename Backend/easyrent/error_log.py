@@ -0,0 +1,127 @@
+import atexit
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .config import ERROR_LOG_FLUSH_EVERY, ERROR_LOG_KEEP, ERROR_LOG_MAX_BYTES, ERROR_LOG_PATH
+
+
+class ErrorLog:
+    """
+    Failed posts, for review and `main.py replay-errors`, as JSON lines:
+    {"id", "error", "text", "attempts", "count", "first_seen", "last_seen"}.
+
+    Entries are buffered in memory keyed by (post id, error class), so a post failing the same way
+    twice in a run is one line with count=2, and appended every `flush_every` entries (and at exit).
+    When the file passes max_bytes it is compacted to one line per (post id, error class), counts
+    summed, then gzip-compressed to <stem>.<UTC time><suffix>.gz and a new file started; only the
+    newest `keep` compressed files are kept.
+    """
+
+    def __init__(self, path=ERROR_LOG_PATH, max_bytes: int = ERROR_LOG_MAX_BYTES, keep: int = ERROR_LOG_KEEP,
+                 flush_every: int = ERROR_LOG_FLUSH_EVERY):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.flush_every = max(1, flush_every)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stats = {"recorded": 0, "written": 0, "rotations": 0}
+
+    def record(self, post_id: str, error: str, text: str, attempts: Optional[int] = None):
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self._lock:
+            self._stats["recorded"] += 1
+            entry = self._pending.get((post_id, error))
+            if entry is None:
+                self._pending[(post_id, error)] = {"id": post_id, "error": error, "text": text,
+                                                   "attempts": attempts, "count": 1,
+                                                   "first_seen": now, "last_seen": now}
+            else:
+                entry.update(count=entry["count"] + 1, last_seen=now, attempts=attempts)
+            if len(self._pending) < self.flush_every:
+                return
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in self._pending.values())
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self._stats["written"] += len(self._pending)
+            self._pending.clear()
+            if self.path.stat().st_size >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        target = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}.gz")
+        with open(self.path, encoding="utf-8") as src:
+            entries = _merge(src)
+        with gzip.open(target, "wt", encoding="utf-8") as dst:
+            dst.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+        os.remove(self.path)
+        self._stats["rotations"] += 1
+        for old in self.rotated_files()[:-self.keep or None]:
+            old.unlink(missing_ok=True)
+
+    def rotated_files(self) -> list:
+        """Compressed logs, oldest first (the timestamp in the name sorts chronologically)."""
+        return sorted(self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}.gz"))
+
+    def _lines(self) -> Iterator[str]:
+        for path in self.rotated_files():
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                yield from f
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                yield from f
+
+    def entries(self) -> list:
+        """Every logged failure, rotated files included, merged per (post id, error class)."""
+        return _merge(self._lines())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending)}
+
+
+def _merge(lines) -> list:
+    """Log lines merged per (post id, error class): counts summed, first_seen of the oldest line."""
+    merged = {}
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(entry, dict) or not entry.get("id"):
+            continue
+        entry.setdefault("error", "unknown")  # lines written before errors were classified
+        key = (entry["id"], entry["error"])
+        seen = merged.get(key)
+        if seen is not None:
+            entry["count"] = (seen.get("count") or 1) + (entry.get("count") or 1)
+            entry["first_seen"] = seen.get("first_seen") or entry.get("first_seen")
+        merged[key] = entry
+    return list(merged.values())
+
+
+_log: Optional[ErrorLog] = None
+_log_lock = threading.Lock()
+
+
+def get_error_log() -> ErrorLog:
+    """Process-wide error log; whatever is still buffered is written at interpreter exit."""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = ErrorLog()
+                atexit.register(_log.flush)
+    return _log
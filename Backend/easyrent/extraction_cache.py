@@ -0,0 +1,136 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+from .config import (
+    EXTRACTION_CACHE_ENABLED,
+    EXTRACTION_CACHE_MAX_AGE_DAYS,
+    EXTRACTION_CACHE_MAX_ENTRIES,
+    EXTRACTION_CACHE_PATH,
+)
+
+_INVISIBLES_RE = re.compile(r"[\u200c-\u200f\ufeff\u202a-\u202e\u2066-\u2069]")
+_WS_RE = re.compile(r"\s+")
+
+# Run eviction once every N writes (cheap enough to not matter, rare enough to not show up)
+_EVICT_EVERY = 200
+
+
+def normalize_post_text(text: str) -> str:
+    """NFC + strip invisibles + collapse whitespace, so re-posts of the same text hash equally."""
+    t = unicodedata.normalize("NFC", text or "")
+    t = _INVISIBLES_RE.sub("", t).replace("\xa0", " ")
+    return _WS_RE.sub(" ", t).strip()
+
+
+class ExtractionCache:
+    """
+    Content-addressed on-disk cache of parsed LLM extraction results (SQLite).
+    Key = sha256(model + prompt version + normalized post text).
+    Entries expire after max_age_days; the least recently used are evicted above max_entries.
+    """
+
+    def __init__(self, path, max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES,
+                 max_age_days: float = EXTRACTION_CACHE_MAX_AGE_DAYS):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.max_age_s = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            " key TEXT PRIMARY KEY,"
+            " result TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_last_used ON extractions(last_used)")
+
+    @staticmethod
+    def make_key(post_text: str, model: str, prompt_version: str) -> str:
+        raw = f"{model}\x1f{prompt_version}\x1f{normalize_post_text(post_text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_s:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: dict):
+        now = time.time()
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, result, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            self.stores += 1
+            if self.stores % _EVICT_EVERY == 0:
+                self._evict_locked(now)
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones above max_entries."""
+        with self._lock:
+            self._evict_locked(time.time())
+
+    def _evict_locked(self, now: float):
+        cur = self._conn.execute("DELETE FROM extractions WHERE created_at < ?", (now - self.max_age_s,))
+        removed = cur.rowcount
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()
+        if count > self.max_entries:
+            cur = self._conn.execute(
+                "DELETE FROM extractions WHERE key IN ("
+                " SELECT key FROM extractions ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            removed += cur.rowcount
+        self.evictions += removed
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Process-wide cache instance (None when disabled via EASYRENT_EXTRACTION_CACHE=0)."""
+    global _cache
+    if not EXTRACTION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache(EXTRACTION_CACHE_PATH)
+    return _cache
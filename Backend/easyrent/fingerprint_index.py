@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from .config import DEDUP_FUZZY_ENABLED
+from .dedup import DuplicateMatcher
+
+# Apartment fields kept in memory (exact fingerprint + fuzzy matching fields)
+_FIELDS = ["fingerprint", "address", "rooms", "price", "contactId"]
+
+
+class FingerprintIndex:
+    """
+    In-memory duplicate index over live apartments, loaded once per run.
+    Exact fingerprint lookups are O(1) and fuzzy matches (dedup.DuplicateMatcher) only scan a
+    (street, rooms) block, with no I/O. claim() is atomic so two posts of the same apartment
+    processed in the same run (even concurrently) can't both be saved.
+    """
+
+    def __init__(self, entries: Optional[dict] = None, fuzzy: bool = DEDUP_FUZZY_ENABLED):
+        self._by_fp = {}
+        self._by_id = {}
+        self._matcher = DuplicateMatcher() if fuzzy else None
+        self._lock = threading.Lock()
+        for doc_id, fields in (entries or {}).items():
+            self._add(doc_id, fields)
+
+    def _add(self, doc_id: str, fields: dict):
+        fields = {k: fields.get(k) for k in _FIELDS}
+        if fields["fingerprint"]:
+            self._by_fp[fields["fingerprint"]] = doc_id
+        self._by_id[doc_id] = fields
+        if self._matcher is not None:
+            self._matcher.add(doc_id, fields)
+
+    # ---------- Loading ----------
+
+    @classmethod
+    def load(cls, storage, snapshot_path=None) -> "FingerprintIndex":
+        """
+        Build the index from 'apartments'.
+        Cold start: one projection query (fingerprint + matching fields only).
+        Warm start (snapshot_path exists): keys-only listing of apartment ids; snapshot entries of
+        deleted apartments are dropped and only ids missing from the snapshot are fetched.
+        """
+        t0 = time.perf_counter()
+        snapshot = cls._read_snapshot(snapshot_path) if snapshot_path else None
+
+        if snapshot is None:
+            index = cls()
+            for doc_id, fields in storage.get_fields("apartments", _FIELDS):
+                index._add(doc_id, fields)
+            mode = "cold"
+        else:
+            live_ids = storage.list_ids("apartments")
+            index = cls({doc_id: snapshot[doc_id] for doc_id in live_ids if doc_id in snapshot})
+            missing = [doc_id for doc_id in live_ids if doc_id not in snapshot]
+            for doc_id, fields in storage.get_fields("apartments", _FIELDS, ids=missing):
+                index._add(doc_id, fields)
+            mode = f"warm, {len(missing)} fetched"
+
+        print(f"Fingerprint index: {len(index)} apartments loaded ({mode}) "
+              f"in {time.perf_counter() - t0:.2f}s")
+        return index
+
+    @staticmethod
+    def _read_snapshot(path) -> Optional[dict]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f).get("entries") or {}
+            # Entries from older snapshots (bare fingerprints) are simply re-fetched
+            return {doc_id: v for doc_id, v in entries.items() if isinstance(v, dict)}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable fingerprint snapshot {path}: {e}")
+            return None
+
+    def save_snapshot(self, path):
+        """Persist {apartment id: indexed fields} atomically for the next run's warm start."""
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with self._lock:
+            payload = {"saved_at": time.time(), "entries": dict(self._by_id)}
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+
+    # ---------- Lookups ----------
+
+    def __contains__(self, fp) -> bool:
+        return fp in self._by_fp
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def claim(self, doc_id: str, data: dict) -> Optional[str]:
+        """
+        Atomically register apartment data under doc_id.
+        Returns the id of the existing apartment it duplicates (exact fingerprint first, then
+        fuzzy match) without registering it, or None once claimed.
+        """
+        with self._lock:
+            existing = self._by_fp.get(data.get("fingerprint"))
+            if existing is None and self._matcher is not None:
+                existing = self._matcher.find(data)
+            if existing is not None:
+                return existing
+            self._add(doc_id, data)
+            return None
+
+    def release(self, doc_id: str):
+        """Undo a claim whose apartment was not saved after all."""
+        with self._lock:
+            fields = self._by_id.pop(doc_id, None)
+            if fields is None:
+                return
+            if self._by_fp.get(fields["fingerprint"]) == doc_id:
+                del self._by_fp[fields["fingerprint"]]
+            if self._matcher is not None:
+                self._matcher.remove(doc_id)
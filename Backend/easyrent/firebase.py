@@ -1,9 +1,31 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+import threading
 from pathlib import Path
 
-# Initialize Firebase Admin and Firestore client once.
+# Firebase Admin and the Firestore client are initialized once, on first use: the SDK import and
+# credential load are slow and need serviceAccountKey.json, which most code paths never touch.
 BASE_DIR = Path(__file__).resolve().parent.parent
-cred = credentials.Certificate(str(BASE_DIR / "serviceAccountKey.json"))
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+
+_db = None
+_lock = threading.Lock()
+
+
+def get_db():
+    """The shared Firestore client (initializes Firebase Admin on the first call)."""
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                import firebase_admin
+                from firebase_admin import credentials, firestore
+
+                cred = credentials.Certificate(str(BASE_DIR / "serviceAccountKey.json"))
+                firebase_admin.initialize_app(cred)
+                _db = firestore.client()
+    return _db
+
+
+def __getattr__(name):
+    # Keeps `from easyrent.firebase import db` working
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+matcher.py
+Single-pass multi-pattern matcher over the gazetteer (Aho–Corasick automaton).
+All street / landmark / synonym / ambiguous-street keys are compiled once; one scan of
+a text returns every hit, instead of one regex (or substring scan) per gazetteer entry.
+Streets with house-number segments resolve the number after the name by binary search.
+"""
+
+import math
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Iterable, Optional
+
+STREET, LANDMARK, SYNONYM, AMBIGUOUS = "street", "landmark", "synonym", "ambiguous"
+
+
+class AhoCorasick:
+    """Classic Aho–Corasick automaton over str keys. Build once, then scan any number of texts."""
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys = []
+        self._goto = [{}]      # state -> {char: next_state}
+        self._fail = [0]
+        self._out = [[]]       # state -> [key index, ...] (including outputs reachable via fail links)
+        for key in keys:
+            if key:
+                self._add(key)
+        self._build_links()
+
+    def _add(self, key: str):
+        state = 0
+        for ch in key:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(len(self.keys))
+        self.keys.append(key)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str):
+        """Yield (start, end, key_index) for every (possibly overlapping) occurrence in text."""
+        goto, fail, out, keys = self._goto, self._fail, self._out, self.keys
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for k in out[state]:
+                yield i + 1 - len(keys[k]), i + 1, k
+
+
+class StreetSegments:
+    """
+    Neighborhoods along one street: sorted, non-overlapping house-number intervals (binary search)
+    plus an optional whole-street neighborhood used when the number is missing or outside them.
+    """
+
+    __slots__ = ("street", "whole", "_starts", "_spans")
+
+    def __init__(self, street: str, value):
+        self.street = street
+        self.whole = value if isinstance(value, str) else None
+        spans = []
+        for lo, hi, nei in ([] if isinstance(value, str) else value):
+            if lo is None and hi is None:
+                self.whole = nei
+            else:
+                spans.append((lo or 0, math.inf if hi is None else hi, nei))
+        spans.sort()
+        for (_, prev_hi, _), (lo, _, _) in zip(spans, spans[1:]):
+            if lo <= prev_hi:
+                raise ValueError(f"Overlapping house-number segments for {street!r}: {spans}")
+        self._starts = [lo for lo, _, _ in spans]
+        self._spans = spans
+
+    def lookup(self, number: Optional[int]) -> Optional[str]:
+        if number is not None and self._spans:
+            i = bisect_right(self._starts, number) - 1
+            if i >= 0 and number <= self._spans[i][1]:
+                return self._spans[i][2]
+        return self.whole
+
+
+_HOUSE_NO_RE = re.compile(r"[\s,]*(\d{1,4})(?!\d)")
+
+
+def _house_number(text: str, pos: int) -> Optional[int]:
+    """House number right after a street name ending at pos ("אבן גבירול 182א" → 182)."""
+    m = _HOUSE_NO_RE.match(text, pos)
+    return int(m.group(1)) if m else None
+
+
+def _is_boundary(ch: str) -> bool:
+    # Same separators as the original regex: start/end, whitespace (\s) or comma
+    return ch.isspace() or ch == ","
+
+
+class GazetteerMatcher:
+    """
+    Compiled gazetteer. Each key maps to its (kind, position in source table, neighborhood) entries;
+    the table position reproduces the original dict-iteration precedence within a kind.
+    streets: {name: neighborhood} or the structured {name: neighborhood | [(from, to, neighborhood)]}
+    (ta_gazetteer.STREET_SEGMENTS); street entries carry a StreetSegments instead of a neighborhood.
+    """
+
+    def __init__(self, streets: dict, landmarks: dict, synonyms: dict, ambiguous: Iterable[str]):
+        entries = {}
+        for kind, items in (
+            (STREET, ((name, StreetSegments(name, value)) for name, value in streets.items())),
+            (LANDMARK, landmarks.items()),
+            (SYNONYM, synonyms.items()),
+            (AMBIGUOUS, ((a, None) for a in sorted(ambiguous))),
+        ):
+            for order, (key, nei) in enumerate(items):
+                entries.setdefault(key, []).append((kind, order, nei))
+        self._automaton = AhoCorasick(entries)
+        self._entries = [entries[k] for k in self._automaton.keys]
+
+    def hits(self, text: str, kinds=(STREET, LANDMARK, SYNONYM, AMBIGUOUS), bounded_streets: bool = False):
+        """
+        All gazetteer hits in text as (kind, order, neighborhood, start, end) (StreetSegments for streets).
+        bounded_streets=True keeps only street hits delimited by start/end, whitespace or comma.
+        """
+        found = []
+        for start, end, k in self._automaton.finditer(text):
+            for kind, order, nei in self._entries[k]:
+                if kind not in kinds:
+                    continue
+                if kind == STREET and bounded_streets:
+                    if start > 0 and not _is_boundary(text[start - 1]):
+                        continue
+                    if end < len(text) and not _is_boundary(text[end]):
+                        continue
+                found.append((kind, order, nei, start, end))
+        return found
+
+    def neighborhood(self, addr: str, text: str) -> Optional[str]:
+        """
+        Deterministic neighborhood with the original precedence:
+        Street (in address) > Landmark > Explicit Hebrew neighborhood; ambiguous streets never decide.
+        addr/text must already be whitespace-normalized.
+        """
+        # 1) Street (exact name; its house number picks the segment) — strongest signal
+        for _, _, segments, _, end in sorted(self.hits(addr, kinds=(STREET,), bounded_streets=True)):
+            nei = segments.lookup(_house_number(addr, end))
+            if nei:
+                return nei
+
+        # 2) Landmark, 3) explicit Hebrew neighborhood — first entry in table order wins
+        in_text = self.hits(text, kinds=(LANDMARK, SYNONYM)) + self.hits(addr, kinds=(LANDMARK, SYNONYM))
+        for kind in (LANDMARK, SYNONYM):
+            best = min((h for h in in_text if h[0] == kind), default=None)
+            if best:
+                return best[2]
+
+        # 4) Ambiguous long streets without disambiguation → do not infer
+        return None
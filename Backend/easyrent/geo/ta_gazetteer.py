@@ -2,7 +2,7 @@
 """
 ta_gazetteer.py
 Gazetteer (seed) for Tel Aviv–Yafo neighborhoods:
-- Deterministic street -> neighborhood
+- Deterministic street -> neighborhood (whole street or house-number segments)
 - Landmark -> neighborhood
 - Ambiguous "long streets" list (never decide without disambiguation)
 - Hebrew synonyms -> canonical EN
@@ -11,6 +11,8 @@ All keys are Hebrew unless noted.
 Canonical neighborhoods MUST match your NEIGHBORHOOD_EN_TO_HE keys.
 """
 
+from typing import Optional, Union
+
 # ======= Ambiguous long streets (never infer neighborhood from these alone) =======
 AMBIGUOUS_LONG_STREETS: set[str] = {
     "בן יהודה", "דיזנגוף", "אבן גבירול", "אלנבי", "הרצל", "יפת",
@@ -82,9 +84,15 @@ NEIGH_SYNONYMS_HE_TO_EN: dict[str, str] = {
     "צהלון": "Tzahal On",
 }
 
-# ======= Streets -> Canonical EN neighborhood (anchor streets; exact match or with number) =======
+# ======= Streets -> Canonical EN neighborhood (anchor streets) =======
+# Structured: street name -> neighborhood for the whole street, or a list of house-number segments
+# (from, to, neighborhood); to=None means "and up". An address resolves by the number that follows
+# the street name (see geo.matcher.StreetSegments); numbers outside every segment don't decide.
+# Qualified names ("רוקח (קטע נמל)", "יהודה המכבי (קטע מזרחי)") are literal-only aliases: their
+# house-number bounds aren't verified, so "יהודה המכבי 40" still falls through to the ambiguous
+# bare street (None). Move one under its bare street name as a number segment once its bounds are known.
 # חשוב: אלו עוגנים בטוחים יחסית. הרחיבי בהדרגה.
-STREET_TO_NEI_EN: dict[str, str] = {
+STREET_SEGMENTS: dict[str, Union[str, list[tuple[Optional[int], Optional[int], str]]]] = {
     # --- יפו / Jaffa ---
     "יהודה הימית": "Tzahal On",
     "אבו נבוט": "Tzahal On",
@@ -95,7 +103,7 @@ STREET_TO_NEI_EN: dict[str, str] = {
     "רזיאל": "Jaffa D",
     "נחום גולדמן": "Jaffa D",
     "אילת": "Jaffa D",
-    "יפת 241": "Givat Aliya",   # דוגמת קצה דרומי
+    "יפת": [(241, 241, "Givat Aliya")],   # דוגמת קצה דרומי
     "עלי עלייה": "Givat Aliya",
     "יפה נוף": "Yafe Nof (Jaffa)",
     "יפו העתיקה": "Old Jaffa",  # אם מופיע כשם רחוב/כיכר
@@ -104,7 +112,7 @@ STREET_TO_NEI_EN: dict[str, str] = {
     "ויטל": "Florentin",
     "פרנקל": "Florentin",
     "בר יוחאי": "Florentin",
-    "הרצל 90": "Florentin",     # עוגן באזור פלורנטין (כתווך)
+    "הרצל": [(90, 90, "Florentin")],     # עוגן באזור פלורנטין (כתווך)
     "קויניגסברג": "Florentin",
     "חבשוש": "Florentin",
     # --- כרם התימנים / נחלת בנימין / לב העיר ---
@@ -156,11 +164,11 @@ STREET_TO_NEI_EN: dict[str, str] = {
     "תל ברוך": "Tel Baruch",
     # --- פארק צמרת / בבלי / צמרת ---
     "יצחק שדה": "Park Tzameret",   # גבולי; השאירי אם מתאים לך
-    "אבן גבירול 170+": "Park Tzameret",  # עוגן צפוני מאוד
+    "אבן גבירול": [(170, None, "Park Tzameret")],  # עוגן צפוני מאוד
     "בבלי": "Shikun Bavli",
     "ברודסקי (בבלי)": "Shikun Bavli",
     # --- מונטיפיורי / אזור התעשייה הישן ---
-    "דרך מנחם בגין 80-132": "Montefiore",
+    "דרך מנחם בגין": [(80, 132, "Montefiore")],
     "תובל": "Montefiore",
     "המלאכה": "Montefiore",
     "פלוגת הכותל": "Montefiore",
@@ -173,11 +181,11 @@ STREET_TO_NEI_EN: dict[str, str] = {
     "הגליל": "Yad Eliyahu",
     "לה גארדיה": "Yad Eliyahu",
     "מבצע קדש": "Yad Eliyahu",
-    "המסגר 60+": "HaKirya",
+    "המסגר": [(60, None, "HaKirya")],
     "שאול המלך": "HaKirya",
     "מרמורק": "HaKirya",
-    "חשמונאים 90+": "HaKirya",
-    "דרך ההגנה 70+": "Kfar Shalem",
+    "חשמונאים": [(90, None, "HaKirya")],
+    "דרך ההגנה": [(70, None, "Kfar Shalem")],
     "שלום שבזי (שכ׳)": "Kfar Shalem",
     "הלח״י": "Shapira",
     "מסילת וולפסון": "Shapira",
@@ -188,8 +196,25 @@ STREET_TO_NEI_EN: dict[str, str] = {
     "הפנחס": "Kiryat Shalom",
     "מעפילי אגוז (דרומי)": "Kiryat Shalom",
     "אבו כביר": "Abu Kabir",
-    "דרך בן-צבי 90+": "Neve Ofer",
+    "דרך בן-צבי": [(90, None, "Neve Ofer")],
     "מררכז באבו-כביר": "Abu Kabir",
     "מתחם נגה": "Tzahal On",
     "נגה": "Tzahal On",
 }
+
+
+def segment_key(street: str, lo: Optional[int], hi: Optional[int]) -> str:
+    """Readable key for a street segment: "אבן גבירול 170+", "דרך מנחם בגין 80-132", "יפת 241"."""
+    if lo is None and hi is None:
+        return street
+    if hi is None:
+        return f"{street} {lo}+"
+    return f"{street} {lo}" if lo == hi else f"{street} {lo}-{hi}"
+
+
+# Flat view (one line per segment) for the LLM prompt and anything matching keys literally
+STREET_TO_NEI_EN: dict[str, str] = {
+    segment_key(street, lo, hi): nei
+    for street, value in STREET_SEGMENTS.items()
+    for lo, hi, nei in ([(None, None, value)] if isinstance(value, str) else value)
+}
@@ -1,15 +1,29 @@
 # -*- coding: utf-8 -*-
 """
 Extractor for EasyRent: robust neighborhood detection for Tel Aviv–Yafo.
-- Builds a strict prompt with canonical neighborhoods.
+- Builds a strict prompt with canonical neighborhoods (see prompt_builder).
 - Injects street/landmark maps into the prompt (readable to the LLM).
 - Applies deterministic post-processing guardrails to fix/override the model.
 """
 
 from datetime import datetime
-from openai import OpenAI
-from .config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS
+from .config import (
+    EXTRACTION_BATCH_SIZE,
+    EXTRACTION_INPUT_MAX_TOKENS,
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_BATCH_MAX_TOKENS,
+    OPENAI_MAX_TOKENS,
+    OPENAI_MODEL,
+    OPENAI_TEMPERATURE,
+    PROMPT_GAZETTEER_MODE,
+)
 from .parsing import parse_gpt_output_safe
+from .metrics import METRICS
+from .rate_limiter import call_with_retries, get_rate_limiter
+from .extraction_cache import ExtractionCache, get_extraction_cache
+from .prompt_builder import build_batch_prompt, build_prompt
+from .llm_input import INPUT_PREP_VERSION, prepare_post_text
 from .neighborhoods import NEIGHBORHOOD_EN_TO_HE  # canonical EN->HE mapping (single source of truth)
 
 # Gazetteer seed (anchor data for deterministic neighborhood decisions)
@@ -17,18 +31,29 @@ from easyrent.geo.ta_gazetteer import (
     AMBIGUOUS_LONG_STREETS,
     LANDMARK_TO_NEI_EN,
     NEIGH_SYNONYMS_HE_TO_EN,
-    STREET_TO_NEI_EN,
+    STREET_SEGMENTS,
 )
+from easyrent.geo.matcher import GazetteerMatcher
 
 import re
+from functools import lru_cache
 from typing import Optional
 
 
 # ---------- Deterministic helpers ----------
 
+_WS_RE = re.compile(r'\s+')
+
+
 def _norm_he(s: Optional[str]) -> str:
     """Normalize Hebrew-ish text: collapse whitespace and strip."""
-    return re.sub(r'\s+', ' ', s or '').strip()
+    return _WS_RE.sub(' ', s or '').strip()
+
+
+@lru_cache(maxsize=1)
+def _gazetteer_matcher() -> GazetteerMatcher:
+    """Gazetteer compiled once per process into a single-pass matcher."""
+    return GazetteerMatcher(STREET_SEGMENTS, LANDMARK_TO_NEI_EN, NEIGH_SYNONYMS_HE_TO_EN, AMBIGUOUS_LONG_STREETS)
 
 
 def deterministic_neighborhood(address: Optional[str], full_text: Optional[str]) -> Optional[str]:
@@ -37,261 +62,183 @@ def deterministic_neighborhood(address: Optional[str], full_text: Optional[str])
     Precedence: Street > Landmark > Explicit Hebrew neighborhood > (Ambiguous street? return None).
     Returns a canonical EN neighborhood (key in NEIGHBORHOOD_EN_TO_HE) or None.
     """
-    addr = _norm_he(address)
-    t = _norm_he(full_text)
+    return _gazetteer_matcher().neighborhood(_norm_he(address), _norm_he(full_text))
 
-    # 1) Street (exact name, optionally followed by a number) — strongest signal
-    for street, nei in STREET_TO_NEI_EN.items():
-        # Matches: start|space|comma + street + (optional number) + end|space|comma
-        if re.search(rf'(?:^|[\s,]){re.escape(street)}(?:[\s,]\d+)?(?:$|[\s,])', addr):
-            return nei
 
-    # 2) Landmark (strong, but weaker than a concrete street address)
-    for lm, nei in LANDMARK_TO_NEI_EN.items():
-        if lm in t or lm in addr:
-            return nei
+# ---------- OpenAI client ----------
 
-    # 3) Explicit Hebrew neighborhood tokens in text/address
-    for he, en in NEIGH_SYNONYMS_HE_TO_EN.items():
-        if he in t or he in addr:
-            return en
+@lru_cache(maxsize=1)
+def get_client():
+    """
+    OpenAI client, created on first use: importing the SDK and building its HTTP client is most of
+    this package's import time, and helpers that never call the API shouldn't need a key.
+    base_url lets the whole extraction path run against a local stub server (tools/openai_stub_server.py).
+    """
+    from openai import OpenAI
+    # Retries are ours (rate_limiter.call_with_retries), so the SDK's own are off
+    return OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
 
-    # 4) Ambiguous long streets without disambiguation → do not infer
-    for amb in AMBIGUOUS_LONG_STREETS:
-        if amb in addr and not any(lm in t for lm in LANDMARK_TO_NEI_EN):
-            return None
 
-    return None
+def _chat_completion(prompt: str, prompt_tokens: int, max_tokens: int = OPENAI_MAX_TOKENS):
+    """
+    One chat completion, paced by the shared rate limiter and retried on transient errors.
+    Reserves prompt + max_tokens against the TPM budget (as the API counts it) and settles on usage.
+    """
+    limiter = get_rate_limiter()
+    reserved = prompt_tokens + max_tokens
+    with METRICS.stage("extract"):
+        raw = call_with_retries(
+            lambda: get_client().chat.completions.with_raw_response.create(**chat_request_body(prompt, max_tokens)),
+            tokens=reserved, limiter=limiter,
+        )
+    limiter.update_from_headers(raw.headers)
+    resp = raw.parse()
+    limiter.settle(reserved, resp.usage.total_tokens if resp.usage else reserved)
+    METRICS.record_response_usage(OPENAI_MODEL, resp.usage)
+    return resp
 
+# Bump whenever the prompt below changes meaningfully: cached extractions are keyed on it.
+PROMPT_VERSION = "2026.1"
 
-# ---------- OpenAI client ----------
+SYSTEM_MESSAGE = "Return ONLY a valid JSON. No explanations, no markdown."
+
+
+def _apply_guardrails(result: dict, post_text: str) -> dict:
+    """Deterministic override + canonical check on a parsed model result."""
+    # 1) Deterministic override from street/landmark/synonym rules
+    override = deterministic_neighborhood(result.get("address"), post_text)
+    if override:
+        result["neighborhood"] = override
+
+    # 2) If the model returned a non-canonical neighborhood, null it out
+    if result.get("neighborhood") not in NEIGHBORHOOD_EN_TO_HE:
+        result["neighborhood"] = None
+
+    return result
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+
+def _cache_key(post_text: str) -> str:
+    # Keyed on the raw post; what the model saw depends on the input prep version and token budget
+    version = f"{PROMPT_VERSION}:{PROMPT_GAZETTEER_MODE}:{INPUT_PREP_VERSION}:{EXTRACTION_INPUT_MAX_TOKENS}"
+    return ExtractionCache.make_key(post_text, OPENAI_MODEL, version)
+
+
+def cached_extraction(post_text: str) -> Optional[dict]:
+    """Guarded result from the extraction cache, or None on a miss (never calls the API)."""
+    cache = get_extraction_cache()
+    if not cache:
+        return None
+    cached = cache.get(_cache_key(post_text))
+    return _apply_guardrails(cached, post_text) if cached is not None else None
+
+
+def finalize_result(result: Optional[dict], post_text: str) -> Optional[dict]:
+    """
+    Cache a parsed model result for post_text and apply the guardrails.
+    Shared by the single, multi-post and Batch-API paths. Returns None for unusable results.
+    """
+    if not isinstance(result, dict):
+        return None
+
+    # Cache the raw model result; guardrails are cheap and re-applied on every hit
+    cache = get_extraction_cache()
+    if cache:
+        cache.put(_cache_key(post_text), dict(result))
+
+    # ---- Post-processing guardrails (deterministic override + canonical check) ----
+    return _apply_guardrails(result, post_text)
+
+
+def chat_request_body(prompt: str, max_tokens: int = OPENAI_MAX_TOKENS) -> dict:
+    """Chat-completion request body (also used verbatim in Batch-API job files)."""
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": OPENAI_TEMPERATURE,
+        "max_tokens": max_tokens,
+    }
+
+
+def build_request_body(post_text: str) -> dict:
+    """Request body for extracting a single post (no API call)."""
+    prompt, _ = build_prompt(_llm_input(post_text), datetime.now().year)
+    return chat_request_body(prompt)
 
 
 # ---------- Main extraction ----------
 
+def _llm_input(post_text: str) -> str:
+    """The cleaned, budgeted text the model sees (cache keys and guardrails keep the raw post)."""
+    text, report = prepare_post_text(post_text)
+    print(f" Input: {report['raw_tokens']} → {report['tokens']} tokens "
+          f"(saved {report['raw_tokens'] - report['tokens']}{', truncated' if report['truncated'] else ''})")
+    return text
+
+
 def extract_apartment_data(post_text: str):
     """
     Call the LLM with a strict prompt to extract structured apartment data.
     Neighborhood must be one of the canonical English names (or null if uncertain).
     The canonical list is injected dynamically from NEIGHBORHOOD_EN_TO_HE (single source of truth).
+    Parsed results are cached on disk, so a repeated post never hits the API twice.
     """
-    current_year = datetime.now().year
-
-    # A) Canonical EN neighborhood list (shown to the model, must match your NEIGHBORHOOD_EN_TO_HE keys)
-    canonical_list = "- " + "\n- ".join(sorted(NEIGHBORHOOD_EN_TO_HE.keys()))
-
-    # B) Gazetteer blocks injected into the prompt (human-readable to the model)
-    street_map_block   = "\n".join([f"- {k} → {v}" for k, v in STREET_TO_NEI_EN.items()])
-    landmark_map_block = "\n".join([f"- {k} → {v}" for k, v in LANDMARK_TO_NEI_EN.items()])
-    ambiguous_block    = "- " + "\n- ".join(sorted(AMBIGUOUS_LONG_STREETS))
-
-    # C) Prompt (strict). Note the doubled {{ }} inside f-string for literal JSON braces.
-    prompt = f"""
-You are a data extraction assistant specializing in Israeli real estate posts on Facebook.
-
-TASK: Extract data from this Facebook post about apartments for rent in Tel Aviv.
-
-CRITICAL INSTRUCTIONS:
-1) Most Facebook posts ARE apartment listings unless they're clearly just brief comments.
-2) For the "neighborhood" field, you MUST return either:
-   - EXACTLY one canonical Tel Aviv neighborhood name (from the list below; strict spelling), OR
-   - null if you are not 100% certain. Never invent or approximate.
-3) Dates: Only if the post explicitly states a start date, return it in YYYY-MM-DD.
-   - If date has no year, use the CURRENT YEAR ({current_year}).
-   - If there is NO explicit date, set "available_from": null (never guess).
-4) Address:
-   - KEEP THE STREET NAME IN HEBREW (name + number if available).
-   - Strip marketing adjectives (e.g., 'יוקרתי', 'מדהים', 'מושלם', 'מטופח', ...).
-   - Extract even if preceded by 'ברחוב', 'באזור', etc.
-5) If the post mixes listing + comments, focus ONLY on the listing details.
-6) Fields title, description, and address are in Hebrew.
-
-NEIGHBORHOOD DETERMINATION (STRICT):
-A) EXPLICIT MENTIONS (highest priority)
-   - If the text explicitly says "בשכונת ___" / "שכונת ___" / "באזור ___" about a Tel Aviv neighborhood,
-     map it EXACTLY to a canonical English name from the list below.
-   - If there is no clear 1:1 match to the canonical list → neighborhood = null.
-   - Examples:
-     "בשכונת נווה צדק" → "Neve Tzedek"
-     "שכונת פלורנטין" → "Florentin"
-     "באזור הצפון הישן" → "The Old North"
-
-B) LANDMARK/STREET MAPPING (use ONLY if there is NO explicit neighborhood)
-   JAFFA & SOUTH (landmarks → canonical EN):
-   - "שוק הפשפשים" / "Flea Market" / "מגדל השעון" / "Clock Tower" → "Jaffa D"
-   - "שוק לוינסקי" / "Levinsky Market" / "רחוב לוינסקי" → "Florentin"
-
-   JAFFA NEIGHBORHOODS (explicit cues → canonical EN):
-   - "יפו א" / "שכונת דקר" → "Jaffa A"
-   - "גבעת אנדרומדה" → "Givat Andromeda"
-   - "גבעת עלייה" → "Givat Aliya"
-   - "יפה נוף" → "Yafe Nof (Jaffa)"
-   - "יפו ג" → "Jaffa G"
-   - "יפו ד" → "Jaffa D"
-   - "יפו העתיקה" / "העיר העתיקה" → "Old Jaffa"
-   - "מנשייה" / "מנשייה (יפו)" → "Manshiya (Jaffa)"
-   - "נווה שלום" → "Neve Shalom"
-   - "סכנת א-תורכי" → "Sakanat Al-Turki"
-   - "פרדס דכה" → "Pardes Daka"
-   - "צהלון" → "Tzahal On"
-   - "שיכוני חיסכון" → "Shikuney Chisachon"
-
-   CENTER:
-   - "שוק הכרמל" / "Carmel Market" → "Kerem HaTeimanim"
-   - "נחלת בנימין" (המדרחוב) → "Nachalat Binyamin"
-   - "שדרות רוטשילד" / "רוטשילד" / "גן החשמל" / "הבימה" / "דיזנגוף סנטר" → "Lev Tel Aviv (City Center)"
-
-   OLD NORTH vs CITY CENTER (disambiguation):
-   - If mentions "אבן גבירול" together with "ז'בוטינסקי" OR "בן-גוריון" OR "ארלוזורוב" (north of Dizengoff)
-     OR mentions beaches/landmarks "גורדון" / "פרישמן" / "הילטון" / "נורדאו" in a northern context
-     → "The Old North".
-   - If mentions "דיזנגוף סנטר", "כיכר רבין", "בוגרשוב" without clear northern cues
-     → "Lev Tel Aviv (City Center)".
-
-   FAR NORTH:
-   - "נמל תל אביב" / "Reading" / "רידינג" → "Kochav HaTzafon"
-   - "חוף תל ברוך" → "Tel Baruch"
-
-   OTHER:
-   - "עזריאלי" / "שרונה" / "תחנת השלום" → "HaKirya"
-   - "שוק התקווה" → "HaTikva"
-   - "רמת החייל" / "אסותא רמת החייל" → "Ramat HaHayal"
-
-C) VALIDATION & AMBIGUITY
-   - Use ONLY names from the canonical list below (strict spelling).
-   - Do NOT output "Lev Ha'Ir", "Center", "City Center" unless exactly "Lev Tel Aviv (City Center)".
-   - If multiple areas are mentioned and they conflict, prefer EXPLICIT neighborhood text (A).
-   - If still uncertain after A–B, set "neighborhood": null.
-   - Do NOT infer from long multi-neighborhood streets (e.g., "בן יהודה") without a disambiguating landmark.
-
-OUT-OF-SCOPE CITIES (MANDATORY RULE):
-- If the listing is clearly outside Tel Aviv–Yafo (e.g., בת-ים, חולון, גבעתיים, רמת-גן, or any other city),
-  you MUST treat it as not relevant.
-- In such cases, return ONLY: {{"is_apartment": false}}
-- Do NOT set "is_apartment": true and neighborhood=null for these cases.
-- We only want apartments in Tel Aviv–Yafo itself.
-
-
-NEIGHBORHOOD RULES (STRICT ADD-ON):
-- If the address contains a Hebrew street that exactly matches the injected STREET→NEIGHBORHOOD map,
-  you MUST return that canonical neighborhood.
-- If the text contains a known landmark from the injected LANDMARK→NEIGHBORHOOD map, you MUST return that neighborhood.
-- Streets in AMBIGUOUS_LONG_STREETS must NOT determine a neighborhood unless a disambiguating landmark is present.
-- Prefer STREET/LANDMARK matches over old Jaffa block labels (A/G/D) unless the post explicitly says "יפו ד/ג/א".
-- If uncertain after applying the above, set "neighborhood": null (never guess).
-- If both a STREET rule and a LANDMARK rule match, prefer the STREET result.
-
-
-INJECTED STREET MAP (Heb → Canonical EN; exact match only):
-{street_map_block}
-
-INJECTED LANDMARK MAP (Heb → Canonical EN):
-{landmark_map_block}
-
-AMBIGUOUS LONG STREETS (never infer without landmark):
-{ambiguous_block}
-
-CATEGORY (MANDATORY):
-- Return a Hebrew value in "category" with EXACTLY one of:
-  "שכירות", "מכירה", "סאבלט", "החלפה"
-- STRICT SUBLET RULE: Only set "סאבלט" if the post explicitly contains one of:
-  "סאבלט", "תת-השכרה", "השכרה זמנית", "sublet". Otherwise prefer "שכירות".
-- If unclear, default to "שכירות".
-
-RENTAL SCOPE (MANDATORY):
-- "דירה שלמה" or "שותפים" (If "מכירה" → "דירה שלמה").
-
-PHONE NUMBER (MANDATORY):
-- Detect Israeli numbers (050/052/054… and +972 variants).
-- Normalize to digits only (e.g., "0521234567"). If none → null.
-
-MANDATORY FALLBACK & NORMALIZATION RULES:
-- If the post says "סטודיו", set "rooms": 1 (never null).
-- If the post describes "יחידת דיור" or "גלריה" as a single unit → rooms=1.
-- If the text contains the word "נדל״ן" or a company name → "has_broker": true.
-- Normalize property_type strictly:
-  * "דירת גן" → "apartment" and set "has_garden": true
-  * "סטודיו" → "apartment" (rooms=1)
-  * "פנטהאוז" → "penthouse"
-  * "דופלקס" → "duplex"
-- If no explicit price → "price": null.
-- If no explicit address but a neighborhood is given → copy the neighborhood into "address".
-- If no explicit available_from → "available_from": null.
-- Always include ALL fields, with null where information is missing.
-
-OUTPUT JSON (complete object, no markdown):
-{{
-  "is_apartment": true,
-  "category": "<שכירות|מכירה|סאבלט>",
-  "phone_number": "<digits only or null>",
-  "rental_scope": "<דירה שלמה|שותפים>",
-  "title": "<Hebrew>",
-  "description": "",
-  "price": <number or null>,
-  "rooms": <number or null>,
-  "size": <number or null>,
-  "neighborhood": "<canonical English or null>",
-  "address": "<Hebrew street only>",
-  "floor": <number or null>,
-  "property_type": "<English>",
-  "pets_allowed": <boolean or null>,
-  "has_broker": <boolean or null>,
-  "has_balcony": <boolean or null>,
-  "has_safe_room": <boolean or null>,
-  "has_parking": <boolean or null>,
-  "has_elevator": <boolean or null>,
-  "available_from": "<YYYY-MM-DD or null>",
-  "facebook_url": "<url or null>"
-}}
-
-COMMENT/QUESTION POSTS (no listing details):
-Return ONLY: {{"is_apartment": false}}
-
-FORMAT RULES:
-- Return ONLY a valid JSON object (no markdown).
-- Include ALL fields; unknown → null.
-- For "available_from": if not explicit → null (never guess).
-- Remove currency symbols/commas from numbers.
-- Use standard JSON quotes; if you need quotes inside Hebrew text, prefer U+05F4 (״) but DO NOT break JSON.
-- "rooms" may be integer or .5 (e.g., 2.5). Never round.
-
-STANDARD TEL AVIV NEIGHBORHOODS (canonical; use ONLY these):
-{canonical_list}
-
-TEXT TO ANALYZE:
-{post_text}
-"""
+    cached = cached_extraction(post_text)
+    if cached is not None:
+        print(" Extraction cache hit.")
+        return cached
+
+    prompt, report = build_prompt(_llm_input(post_text), datetime.now().year)
+    print(f" Prompt: {report['prompt_tokens']} tokens ({report['mode']} mode, "
+          f"saved {report['saved_tokens']} vs full gazetteer)")
 
     try:
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "Return ONLY a valid JSON. No explanations, no markdown."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=OPENAI_TEMPERATURE,
-            max_tokens=OPENAI_MAX_TOKENS
-        )
+        resp = _chat_completion(prompt, report["prompt_tokens"])
         result_text = resp.choices[0].message.content.strip()
         print(" FULL GPT OUTPUT:")
         print(result_text)
 
-        # ---- Post-processing guardrails (deterministic override + canonical check) ----
-        result = parse_gpt_output_safe(result_text)
-
-        # 1) Deterministic override from street/landmark/synonym rules
-        override = deterministic_neighborhood(result.get("address"), post_text)
-        if override:
-            result["neighborhood"] = override
-
-        # 2) If the model returned a non-canonical neighborhood, null it out
-        if result.get("neighborhood") not in NEIGHBORHOOD_EN_TO_HE:
-            result["neighborhood"] = None
-
-        return result
+        with METRICS.stage("parse"):
+            return finalize_result(parse_gpt_output_safe(result_text), post_text)
 
     except Exception as e:
         print(f"API Error: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def extract_apartment_data_batch(posts: dict, batch_size: int = EXTRACTION_BATCH_SIZE) -> dict:
+    """
+    Extract several posts per chat completion (for backfills, where latency doesn't matter).
+    posts: {post_id: post_text}. Returns {post_id: result or None}; cached posts never hit the API.
+    """
+    results = {}
+    pending = {}
+    for post_id, text in posts.items():
+        cached = cached_extraction(text)
+        if cached is not None:
+            results[post_id] = cached
+        else:
+            pending[post_id] = text
+
+    ids = list(pending)
+    for start in range(0, len(ids), max(1, batch_size)):
+        chunk = {pid: pending[pid] for pid in ids[start:start + batch_size]}
+        prompt, report = build_batch_prompt({pid: _llm_input(t) for pid, t in chunk.items()}, datetime.now().year)
+        print(f" Batch of {len(chunk)} posts: {report['prompt_tokens']} prompt tokens")
+
+        parsed = None
+        try:
+            resp = _chat_completion(prompt, report["prompt_tokens"], max_tokens=OPENAI_BATCH_MAX_TOKENS)
+            with METRICS.stage("parse"):
+                parsed = parse_gpt_output_safe(resp.choices[0].message.content.strip())
+        except Exception as e:
+            print(f"API Error: {e}")
+
+        if not isinstance(parsed, dict):
+            parsed = {}
+        for pid, text in chunk.items():
+            results[pid] = finalize_result(parsed.get(str(pid)), text)
+
+    return results
@@ -0,0 +1,160 @@
+"""
+Post text as sent to the LLM: cleaned, then fitted to a token budget.
+- clean_post_text() drops FB headers, listing widgets, reactions bars, comment prompts and
+  repeated lines; on top of that, leftover UI lines ("See translation", reaction/comment counts,
+  "Like · Reply") are removed, and so is an auto-translated copy that follows a translation marker.
+  Price/address/contact lines that only appeared in the cut parts (the widget price, a WhatsApp
+  link in the footer) are appended back, so the model sees every fact the raw post had.
+- Posts still over EXTRACTION_INPUT_MAX_TOKENS are cut line by line (long paragraphs by sentence):
+  price, address and contact lines are kept first, other lines fill the remaining budget in their
+  original order.
+Token savings are counted per run in INPUT_STATS (read it with input_stats()).
+"""
+
+import re
+import threading
+
+from .cleaning import clean_post_text
+from .config import EXTRACTION_INPUT_MAX_TOKENS
+from .tokens import count_tokens
+
+# ---------- Patterns (compiled once) ----------
+
+# Whole lines of FB UI left over after clean_post_text
+_UI_LINE_RE = re.compile(
+    r"^(?:"
+    r"(?:אהבתי|לייק|הגב|השב|תגובה|שתף|שיתוף|Like|Reply|Comment|Share)(?:\s*·\s*\S+)*"
+    r"|\d+\s*(?:תגובות|שיתופים|לייקים|comments?|shares?|likes?)(?:\s*·.*)?"
+    r"|(?:כל תגובות הרגש|All reactions):?.*"
+    r"|(?:ראה|ראו|הצגת|הצג את ה)\s*(?:תרגום|המקור)|See (?:translation|original)"
+    r"|\d+\s*(?:ש|ד|י|h|m|d|w)"  # relative timestamps ("3 ש", "5d")
+    r")$",
+    re.IGNORECASE,
+)
+
+# An auto-translated copy of the post follows these; everything after one is dropped
+_TRANSLATION_MARKER_RE = re.compile(
+    r"^(?:(?:הצגת המקור|See original)\s*·\s*)?(?:דרג(?:ו|י)? את התרגום|דירוג התרגום|Rate this translation)$",
+    re.IGNORECASE,
+)
+# Long paragraphs are cut at sentence ends rather than dropped whole
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;])\s+")
+
+# Lines that must survive truncation: price | address | contact
+_KEY_LINE_RE = re.compile(
+    r"₪|ש\"ח|ש״ח|\bשח\b|שקל|מחיר|שכ\"ד|שכ״ד|שכר דירה|\d{1,2},\d{3}|\b\d{4,5}\b|\bnis\b|per month"
+    r"|רחוב|ברח['׳]|רח['׳]|שדרות|שד['׳]|כתובת|בפינת|שכונ|street|\bst\."
+    r"|(?<!\d)(?:\+?972|0)5\d[-\s]?\d{3}[-\s]?\d{4}(?!\d)|לפרטים|טלפון|נייד|להתקשר|וואטסאפ|ווטסאפ|whatsapp"
+    r"|בפרטי|@",
+    re.IGNORECASE,
+)
+
+_HSPACE_RE = re.compile(r"[^\S\n]+")  # runs of whitespace other than newlines (incl. \xa0)
+_DIGIT_SEP_RE = re.compile(r"(?<=\d)[,.\-\s](?=\d)")
+_LONG_NUMBER_RE = re.compile(r"\d{4,}")
+_LINE_STRIP = " ·•-—\u2022…"
+
+# Bump whenever cleaning/truncation changes the text the model sees: cached extractions are keyed on it
+INPUT_PREP_VERSION = "1"
+
+_stats_lock = threading.Lock()
+INPUT_STATS = {"posts": 0, "raw_tokens": 0, "tokens": 0, "truncated": 0}
+
+
+def input_stats() -> dict:
+    """Consistent copy of INPUT_STATS (worker threads keep adding to it)."""
+    with _stats_lock:
+        return dict(INPUT_STATS)
+
+
+def _strip_ui(text: str) -> str:
+    kept = []
+    for line in text.splitlines():
+        if _TRANSLATION_MARKER_RE.match(line):
+            break
+        if not _UI_LINE_RE.match(line):
+            kept.append(line)
+    return "\n".join(kept)
+
+
+def _numbers(text: str) -> set:
+    """Prices/phones in text as digit strings ("11,050" → "11050", "054-123 4567" → "0541234567")."""
+    return set(_LONG_NUMBER_RE.findall(_DIGIT_SEP_RE.sub("", text)))
+
+
+def _recover_key_lines(raw_text: str, cleaned: str) -> str:
+    """
+    Append the raw post's key lines that cleaning cut, unless the cleaned text already has them
+    (or, for lines with prices/phones, already has those numbers).
+    """
+    present = _HSPACE_RE.sub(" ", cleaned)
+    numbers = _numbers(cleaned)
+    recovered = []
+    for line in _HSPACE_RE.sub(" ", raw_text.replace("\u200f", "")).splitlines():
+        line = line.strip(_LINE_STRIP)
+        if not line or line in present or not _KEY_LINE_RE.search(line) or _UI_LINE_RE.match(line):
+            continue
+        line_numbers = _numbers(line)
+        if line_numbers and line_numbers <= numbers:
+            continue
+        recovered.append(line)
+        present += "\n" + line
+        numbers |= line_numbers
+    return "\n".join([cleaned, *recovered]) if recovered else cleaned
+
+
+def _segments(text: str, max_tokens: int) -> list:
+    """Lines of text; a line longer than a quarter of the budget is split into sentences."""
+    out = []
+    for line in text.splitlines():
+        if count_tokens(line) > max_tokens // 4:
+            out.extend(s for s in _SENTENCE_END_RE.split(line) if s)
+        else:
+            out.append(line)
+    return out
+
+
+def truncate_to_budget(text: str, max_tokens: int) -> str:
+    """
+    Cut text to about max_tokens, segment by segment: key lines (price, address, contact) first,
+    then the other segments in their original order while they fit. The output keeps the original
+    order. If not even one segment fits, the text is cut proportionally.
+    """
+    segments = _segments(text, max_tokens)
+    costs = [count_tokens(seg) + 1 for seg in segments]  # + the newline
+    keep = [False] * len(segments)
+    budget = max_tokens
+
+    for i, seg in enumerate(segments):
+        if _KEY_LINE_RE.search(seg) and costs[i] <= budget:
+            keep[i] = True
+            budget -= costs[i]
+    for i in range(len(segments)):
+        if not keep[i] and costs[i] <= budget:
+            keep[i] = True
+            budget -= costs[i]
+
+    if budget == max_tokens:
+        return text[:len(text) * max_tokens // max(1, count_tokens(text))]
+    return "\n".join(seg for seg, k in zip(segments, keep) if k)
+
+
+def prepare_post_text(raw_text: str, max_tokens: int = EXTRACTION_INPUT_MAX_TOKENS):
+    """
+    The text to extract from. Returns (text, report) with
+    report = {"raw_tokens", "tokens", "truncated"}; a post that cleans to nothing is sent as-is.
+    """
+    raw_tokens = count_tokens(raw_text)
+    text = _recover_key_lines(raw_text, _strip_ui(clean_post_text(raw_text))).strip() or raw_text.strip()
+    tokens = count_tokens(text)
+    truncated = tokens > max_tokens > 0
+    if truncated:
+        text = truncate_to_budget(text, max_tokens)
+        tokens = count_tokens(text)
+
+    with _stats_lock:
+        INPUT_STATS["posts"] += 1
+        INPUT_STATS["raw_tokens"] += raw_tokens
+        INPUT_STATS["tokens"] += tokens
+        INPUT_STATS["truncated"] += truncated
+    return text, {"raw_tokens": raw_tokens, "tokens": tokens, "truncated": truncated}
@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .config import OPENAI_BATCH_DISCOUNT, OPENAI_PRICES_PER_1M
+
+# Latency histogram upper bounds in seconds (Prometheus "le" buckets; +Inf is implicit)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+                   300.0, 900.0, 3600.0)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float):
+        """Upper bound of the bucket holding the q-quantile (None when empty)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(LATENCY_BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total_s": round(self.sum, 4),
+            "mean_ms": round(self.sum / self.count * 1000, 2) if self.count else None,
+            "p50_le_ms": _ms(self.quantile(0.5)),
+            "p95_le_ms": _ms(self.quantile(0.95)),
+            "max_ms": round(self.max * 1000, 2),
+            "buckets": {str(b): n for b, n in zip((*LATENCY_BUCKETS, "+Inf"), self.counts)},
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class RunMetrics:
+    """
+    Per-run instrumentation: latency histograms per stage (prune, query, extract, parse, dedup,
+    write, cleanup, ...), post status outcomes, counters, and OpenAI token usage with cost
+    estimates. Thread-safe; one process-wide instance (METRICS) is shared by all modules.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._t0 = time.perf_counter()
+            self._stages = {}
+            self.outcomes = {}
+            self.counters = {}
+            self.usage = {}
+            self.sections = {}
+
+    # ---------- Recording ----------
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = _Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def timed_iter(self, stage: str, iterable):
+        """Yield from iterable, timing each fetch (e.g. query pages) under stage."""
+        it = iter(iterable)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.observe(stage, time.perf_counter() - t0)
+                return
+            self.observe(stage, time.perf_counter() - t0)
+            yield item
+
+    def outcome(self, status: str, n: int = 1):
+        """Count posts that ended the run with `status`."""
+        with self._lock:
+            self.outcomes[status] = self.outcomes.get(status, 0) + n
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_usage(self, model: str, prompt_tokens: int, completion_tokens: int, batch: bool = False):
+        """Token usage as reported by the API (response.usage)."""
+        key = f"{model}{' (batch)' if batch else ''}"
+        with self._lock:
+            u = self.usage.setdefault(key, {"model": model, "batch": batch, "requests": 0,
+                                            "prompt_tokens": 0, "completion_tokens": 0})
+            u["requests"] += 1
+            u["prompt_tokens"] += prompt_tokens or 0
+            u["completion_tokens"] += completion_tokens or 0
+
+    def record_response_usage(self, model: str, usage, batch: bool = False):
+        """record_usage from an SDK usage object or a raw usage dict (None is ignored)."""
+        if usage is None:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda k: getattr(usage, k, 0)
+        self.record_usage(model, get("prompt_tokens") or 0, get("completion_tokens") or 0, batch=batch)
+
+    def add_section(self, name: str, data: dict):
+        """Attach another component's stats (cache, writes, prompts, ...) to the report."""
+        with self._lock:
+            self.sections[name] = data
+
+    # ---------- Reporting ----------
+
+    @staticmethod
+    def _cost(u: dict):
+        # Responses name dated snapshots ("gpt-4o-mini-2024-07-18"): use the longest matching price key
+        keys = [k for k in OPENAI_PRICES_PER_1M if u["model"] == k or u["model"].startswith(k + "-")]
+        if not keys:
+            return None
+        prices = OPENAI_PRICES_PER_1M[max(keys, key=len)]
+        cost = (u["prompt_tokens"] * prices[0] + u["completion_tokens"] * prices[1]) / 1e6
+        return cost * OPENAI_BATCH_DISCOUNT if u["batch"] else cost
+
+    def report(self, command: str = "run") -> dict:
+        with self._lock:
+            usage = []
+            for u in self.usage.values():
+                cost = self._cost(u)
+                usage.append({**u, "cost_usd": None if cost is None else round(cost, 6)})
+            costs = [u["cost_usd"] for u in usage if u["cost_usd"] is not None]
+            return {
+                "command": command,
+                "started_at": self.started_at.isoformat(),
+                "wall_clock_s": round(time.perf_counter() - self._t0, 3),
+                "stages": {name: h.summary() for name, h in self._stages.items()},
+                "outcomes": dict(self.outcomes),
+                "counters": dict(self.counters),
+                "openai": {
+                    "usage": usage,
+                    "prompt_tokens": sum(u["prompt_tokens"] for u in usage),
+                    "completion_tokens": sum(u["completion_tokens"] for u in usage),
+                    "estimated_cost_usd": round(sum(costs), 6),
+                },
+                **dict(self.sections),
+            }
+
+    def prometheus(self, command: str = "run") -> str:
+        """The run as Prometheus text exposition format (for the node_exporter textfile collector)."""
+        rep = self.report(command)
+        with self._lock:
+            stages = {name: (list(h.counts), h.count, h.sum) for name, h in self._stages.items()}
+        lines = [
+            "# HELP easyrent_run_timestamp_seconds Start of the last run.",
+            "# TYPE easyrent_run_timestamp_seconds gauge",
+            f'easyrent_run_timestamp_seconds{{command="{command}"}} {self.started_at.timestamp():.0f}',
+            "# HELP easyrent_run_duration_seconds Wall-clock duration of the last run.",
+            "# TYPE easyrent_run_duration_seconds gauge",
+            f'easyrent_run_duration_seconds{{command="{command}"}} {rep["wall_clock_s"]}',
+            "# HELP easyrent_stage_duration_seconds Latency of pipeline stages in the last run.",
+            "# TYPE easyrent_stage_duration_seconds histogram",
+        ]
+        for name, (counts, count, total) in sorted(stages.items()):
+            cumulative = 0
+            for bound, n in zip((*LATENCY_BUCKETS, "+Inf"), counts):
+                cumulative += n
+                lines.append(f'easyrent_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'easyrent_stage_duration_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'easyrent_stage_duration_seconds_count{{stage="{name}"}} {count}')
+        # Counters of the run (a new run or daemon restart starts them over, seen as a counter reset)
+        lines += ["# HELP easyrent_posts_total Posts by final status in the last run.",
+                  "# TYPE easyrent_posts_total counter"]
+        lines += [f'easyrent_posts_total{{status="{s}"}} {n}' for s, n in sorted(rep["outcomes"].items())]
+        lines += ["# HELP easyrent_events_total Other counters of the last run.",
+                  "# TYPE easyrent_events_total counter"]
+        lines += [f'easyrent_events_total{{name="{s}"}} {n}' for s, n in sorted(rep["counters"].items())]
+        usage = [(f'model="{u["model"]}",batch="{str(u["batch"]).lower()}"', u) for u in rep["openai"]["usage"]]
+        lines += ["# HELP easyrent_openai_tokens OpenAI tokens used in the last run.",
+                  "# TYPE easyrent_openai_tokens gauge"]
+        for labels, u in usage:
+            lines.append(f'easyrent_openai_tokens{{{labels},kind="prompt"}} {u["prompt_tokens"]}')
+            lines.append(f'easyrent_openai_tokens{{{labels},kind="completion"}} {u["completion_tokens"]}')
+        lines += ["# HELP easyrent_openai_cost_usd Estimated OpenAI cost of the last run.",
+                  "# TYPE easyrent_openai_cost_usd gauge"]
+        lines += [f'easyrent_openai_cost_usd{{{labels}}} {u["cost_usd"]}' for labels, u in usage
+                  if u["cost_usd"] is not None]
+        return "\n".join(lines) + "\n"
+
+    def write(self, report_dir, textfile_path, command: str = "run") -> Path:
+        """Write the JSON report (one file per run) and replace the Prometheus textfile atomically."""
+        report = self.report(command)
+        report_dir = Path(report_dir)
+        report_dir.mkdir(parents=True, exist_ok=True)
+        # pid keeps reports of parallel workers apart
+        report_path = report_dir / f"run_{self.started_at:%Y%m%dT%H%M%SZ}_{command}_{os.getpid()}.json"
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        self.write_textfile(textfile_path, command)
+
+        print(f"Run report: {report_path} ({report['wall_clock_s']}s, "
+              f"~${report['openai']['estimated_cost_usd']:.4f} OpenAI, outcomes {report['outcomes']})")
+        return report_path
+
+    def write_textfile(self, textfile_path, command: str = "run"):
+        """Replace the Prometheus textfile atomically (also called periodically by the daemon)."""
+        textfile_path = Path(textfile_path)
+        textfile_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = textfile_path.with_suffix(textfile_path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus(command))
+        os.replace(tmp, textfile_path)
+
+
+METRICS = RunMetrics()
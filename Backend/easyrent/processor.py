@@ -1,53 +1,97 @@
 import re
 import time
-import json
-from google.cloud.firestore_v1 import FieldFilter
-from firebase_admin import firestore as _fs
-
-from .firebase import db
+import queue
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from .storage import SERVER_TIMESTAMP, get_storage
 from .cleaning import clean_post_text
-from .gpt_extractor import extract_apartment_data
+from .gpt_extractor import (
+    cached_extraction,
+    extract_apartment_data,
+    extract_apartment_data_batch,
+    finalize_result,
+)
+from .batch_jobs import (
+    UNRUN_REQUEST_ERRORS,
+    download_batch_output,
+    new_batch_file_path,
+    read_batch_output,
+    submit_batch_file,
+    write_batch_file,
+)
+from .parsing import parse_gpt_output_safe
+from .rule_extractor import FASTPATH_STATS, fast_path_extraction, rooms_from_text
+from .extraction_cache import get_extraction_cache
+from .prompt_builder import PROMPT_STATS
+from .llm_input import input_stats
+from .apartment import Apartment, coerce_rooms
 from .fingerprint import generate_fingerprint
+from .fingerprint_index import FingerprintIndex
+from .write_buffer import WriteBuffer
+from .checkpoint import RunCheckpoint
+from .error_log import get_error_log
+from .metrics import METRICS
+from .pruning import expire_at_from_now
 from .neighborhoods import NEIGHBORHOOD_EN_TO_HE
-from .config import ERROR_LOG_PATH
-from datetime import datetime, time as dtime
-
-# ---- Timezone setup (Windows-safe) ----
-try:
-    # Primary: stdlib zoneinfo with IANA tz database available
-    from zoneinfo import ZoneInfo
-    TZ_IL = ZoneInfo("Asia/Jerusalem")
-
-    def local_noon(y: int, m: int, d: int):
-        return datetime(y, m, d, 12, 0, tzinfo=TZ_IL)
-
-except Exception:
-    # Try loading tzdata (pip install tzdata)
+from .config import (
+    DAEMON_BATCH_SIZE,
+    DAEMON_INDEX_REFRESH,
+    DAEMON_MAX_WAIT,
+    DAEMON_POLL_INTERVAL,
+    DAEMON_RETRY_INTERVAL,
+    EXTRACTION_BATCH_SIZE,
+    FINGERPRINT_SNAPSHOT_ENABLED,
+    FINGERPRINT_SNAPSHOT_PATH,
+    LEASE_SECONDS,
+    METRICS_TEXTFILE_PATH,
+    POSTS_PAGE_SIZE,
+    POST_MAX_ATTEMPTS,
+    POST_RETRY_BASE,
+    POST_RETRY_CAP,
+    PROCESS_CHECKPOINT_PATH,
+    PROCESS_CONCURRENCY,
+    PROCESS_LEASES_ENABLED,
+    PROCESS_QUEUE_DEPTH,
+    RETENTION_DAYS,
+    RULE_FASTPATH_ENABLED,
+    WORKER_ID,
+    WORKER_SHARD,
+)
+from datetime import datetime, time as dtime, timedelta, timezone
+from typing import Optional
+
+# ---- Timezone setup (Windows-safe), resolved on first use ----
+@lru_cache(maxsize=1)
+def _tz_il():
+    """(tzinfo, localize) for Asia/Jerusalem: zoneinfo → tzdata → pytz → fixed +03:00."""
     try:
-        import tzdata  # noqa: F401
-        from zoneinfo import ZoneInfo as _ZI
-        TZ_IL = _ZI("Asia/Jerusalem")
-
-        def local_noon(y: int, m: int, d: int):
-            return datetime(y, m, d, 12, 0, tzinfo=TZ_IL)
-
+        # Primary: stdlib zoneinfo with IANA tz database available
+        from zoneinfo import ZoneInfo
+        tz = ZoneInfo("Asia/Jerusalem")
     except Exception:
-        # Fallback to pytz if available
         try:
-            import pytz
-            TZ_IL = pytz.timezone("Asia/Jerusalem")
-
-            def local_noon(y: int, m: int, d: int):
-                # pytz requires localize()
-                return TZ_IL.localize(datetime(y, m, d, 12, 0))
-
+            # Try loading tzdata (pip install tzdata)
+            import tzdata  # noqa: F401
+            from zoneinfo import ZoneInfo as _ZI
+            tz = _ZI("Asia/Jerusalem")
         except Exception:
-            # Last resort: fixed +03:00 (no DST awareness)
-            from datetime import timezone, timedelta
-            TZ_IL = timezone(timedelta(hours=3))
-
-            def local_noon(y: int, m: int, d: int):
-                return datetime(y, m, d, 12, 0, tzinfo=TZ_IL)
+            try:
+                # Fallback to pytz if available (pytz requires localize())
+                import pytz
+                tz = pytz.timezone("Asia/Jerusalem")
+                return tz, tz.localize
+            except Exception:
+                # Last resort: fixed +03:00 (no DST awareness)
+                tz = timezone(timedelta(hours=3))
+    return tz, lambda dt: dt.replace(tzinfo=tz)
+
+
+def local_noon(y: int, m: int, d: int):
+    _, localize = _tz_il()
+    return localize(datetime(y, m, d, 12, 0))
 # ---- End TZ setup ----
 
 
@@ -82,244 +126,783 @@ def upload_date_from_post_id_noon(post_id: str):
 
 def today_noon_il():
     """ Today at 12:00 in Asia/Jerusalem """
-    now_il = datetime.now(TZ_IL)
+    now_il = datetime.now(_tz_il()[0])
     return local_noon(now_il.year, now_il.month, now_il.day)
 
 
-# Default apartment structure for consistency across documents
-DEFAULT_APT = {
-    "title": "דירה למכירה",
-    "description": "",
-    "price": None,
-    "rooms": None,
-    "size": None,
-    "neighborhood": None,
-    "address": None,
-    "floor": None,
-    "property_type": None,
-    "pets_allowed": None,
-    "has_broker": None,
-    "has_balcony": None,
-    "has_safe_room": None,
-    "has_parking": None,
-    "has_elevator": None,
-    "available_from": None,
-    "facebook_url": None,
-    "category": None,
-    "rental_scope": None,
-    "phone_number": None,
-}
-
 def _normalize_rooms_value(rooms_val, source_text: str):
     """
     Normalize 'rooms' to a float and support .5 values (e.g., 2.5, 3.5).
     If None, try to infer from Hebrew text patterns found in the post.
     """
     if rooms_val is None:
-        t = source_text
         # Patterns: "4.5 חדר", "4,5 חדר", "4 וחצי", "חדר וחצי", plain integers like "3 חדרים"
-        m = re.search(r'(\d+)\s*[.,]\s*5\s*חדר', t)
-        if m:
-            return float(m.group(1)) + 0.5
-        m = re.search(r'(\d+)\s*ו\s*חצי(?:\s*חדר(?:ים)?)?', t)
-        if m:
-            return float(m.group(1)) + 0.5
-        if re.search(r'חדר\s*ו\s*חצי', t):
-            return 1.5
-        m = re.search(r'(\d+)\s*חדר(?:ים)?', t)
-        if m:
-            return float(m.group(1))
-        return None
+        return rooms_from_text(source_text)
+    return coerce_rooms(rooms_val)
 
-    if isinstance(rooms_val, str):
-        s = rooms_val.strip().replace(",", ".")
-        s = re.sub(r'^(\d+)\s*ו\s*חצי$', lambda m: f"{m.group(1)}.5", s)
-        s = re.sub(r'^חדר\s*ו\s*חצי$', "1.5", s)
-        s = re.sub(r"[^0-9.]", "", s)
-        try:
-            return float(s) if s else None
-        except ValueError:
-            return None
+def _mark(writer: WriteBuffer, post_id: str, status: str, extra: Optional[dict] = None):
+    """Queue a post status update and count the outcome for the run report."""
+    writer.update("posts", post_id, {"status": status, **(extra or {})})
+    METRICS.outcome(status)
 
-    try:
-        return float(rooms_val)
-    except Exception:
+
+def _retry_delay(attempts: int) -> float:
+    """Seconds to wait before retrying a post that has failed `attempts` times."""
+    return min(POST_RETRY_CAP, POST_RETRY_BASE * 2 ** (attempts - 1))
+
+
+def _mark_failed(writer: WriteBuffer, post: dict, reason: str, extra: Optional[dict] = None):
+    """
+    Record a failed attempt: back to "error" with next_attempt_at pushed out exponentially, or
+    "dead_letter" once POST_MAX_ATTEMPTS is reached. The error log gets the first failure and the
+    dead-letter one (retries in between are only counted on the post).
+    """
+    post_id = post.get("id")
+    attempts = int(post.get("attempts") or 0) + 1
+    fields = {"attempts": attempts, "last_error": reason, **(extra or {})}
+    if attempts == 1 or attempts >= POST_MAX_ATTEMPTS:
+        get_error_log().record(post_id, reason, (post.get("text") or "").strip(), attempts)
+    if attempts >= POST_MAX_ATTEMPTS:
+        print(f"Post {post_id} failed {attempts} times ({reason}) — moved to dead_letter.")
+        _mark(writer, post_id, "dead_letter", fields)
+        return
+    fields["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(seconds=_retry_delay(attempts))
+    _mark(writer, post_id, "error", fields)
+
+
+def _passes_guards(post: dict, writer: WriteBuffer) -> bool:
+    """
+    Cheap pre-LLM guards. Marks obviously irrelevant posts and returns False for them.
+    """
+    post_id = post.get("id")
+    post_text = (post.get("text") or "").strip()
+
+    # === NEW RULE: skip posts with no contactName ===
+    # If contactName is missing or null, we don't want to process this post.
+    if not post.get("contactName"):
+        print(f"Skipping post {post_id} – missing contactName")
+        _mark(writer, post_id, "skipped")
+        return False
+
+    # Guard: no text (marked, so the daemon's listener doesn't deliver it again)
+    if not post_text:
+        print("Skipping empty post.")
+        _mark(writer, post_id, "skipped")
+        return False
+
+    # Guard: very short comment-like messages (not real listings)
+    if len(post_text) < 50 and re.search(r"(כמה|מחיר|פרטים|אשמח|אפשר|למה|נשמע|מעניין|שיתוף|\?)", post_text):
+        print("Skipping likely comment.")
+        _mark(writer, post_id, "skipped")
+        return False
+
+    return True
+
+
+def _process_post(post: dict, fp_index: FingerprintIndex, writer: WriteBuffer, claim=None) -> bool:
+    """
+    Run the full pipeline (guards → GPT → normalize → dedup → save) for one post.
+    claim: with several workers, claim(post_id) leases the post first; if another worker holds it
+    (or already handled it) the post is skipped. Returns True if an apartment was saved.
+    """
+    if claim is not None:
+        if not claim(post["id"]):
+            METRICS.count("lease_conflicts")
+            return False
+
+    print(f"\nProcessing post {post.get('id')}...")
+
+    if not _passes_guards(post, writer):
+        return False
+
+    post_text = (post.get("text") or "").strip()
+
+    # Templated listings: rules are enough, skip GPT entirely
+    data = _fast_path(post_text)
+    if data is None:
+        # Extract data with GPT
+        data = extract_apartment_data(post_text)
+    return _save_extraction(post, data, fp_index, writer)
+
+
+def _fast_path(post_text: str):
+    """Rule-based extraction when it's confident enough to replace GPT, else None."""
+    if not RULE_FASTPATH_ENABLED:
         return None
+    with METRICS.stage("rules"):
+        data = fast_path_extraction(post_text)
+    if data is not None:
+        print("Rule-based extraction is confident — skipping GPT.")
+    return data
 
-def _save_error_log(post_id: str, post_text: str):
+
+def _save_extraction(post: dict, data, fp_index: FingerprintIndex, writer: WriteBuffer) -> bool:
     """
-    Append problematic posts to a local JSONL file for later review.
-    Each line is a valid JSON object: {"id": "...", "text": "..."}.
+    Turn an extraction result into an apartment: normalize, dedup and save, updating the post status.
+    Returns True if an apartment was saved.
     """
-    with open(ERROR_LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps({"id": post_id, "text": post_text}, ensure_ascii=False) + "\n")
+    post_id = post.get("id")
+    post_text = (post.get("text") or "").strip()
+
+    if data is None:
+        print("Skipping post due to parsing failure.")
+        _mark_failed(writer, post, "extraction_failed")
+        return False
 
-def process_posts_stream(statuses=("new", "error")) -> int:
+    claimed = False
+    try:
+        # Not an apartment listing
+        if data.get("is_apartment") is False:
+            print("Not an apartment listing.")
+            _mark(writer, post_id, "skipped")
+            return False
+
+        # Home exchange: skip
+        if data.get("category") == "החלפה":
+            print("Home exchange — skipping.")
+            _mark(writer, post_id, "skipped_exchange")
+            return False
+
+        # Typed record: string values coerced once, keys outside the apartment schema dropped
+        apt = Apartment(data, {
+            # Enrich with source metadata
+            "id": post_id,
+            "images": post.get("images", []),
+            "description": clean_post_text(post_text),
+            "contactId": post.get("contactId"),
+            "contactName": post.get("contactName"),
+            # Normalize rooms (support half-rooms)
+            "rooms": _normalize_rooms_value(data.get("rooms"), post_text),
+        })
+
+        # Ensure sensible defaults
+        if apt.category is None and data.get("is_apartment"):
+            apt.category = "שכירות"
+        if not apt.rental_scope and data.get("is_apartment"):
+            apt.rental_scope = "דירה שלמה"
+
+        # Remove address if it redundantly contains the neighborhood name (Hebrew)
+        if apt.address and apt.neighborhood:
+            heb_name = NEIGHBORHOOD_EN_TO_HE.get(apt.neighborhood)
+            if heb_name and heb_name in apt.address:
+                apt.address = None
+
+        # Convert neighborhood (EN → HE) before saving
+        if apt.neighborhood:
+            apt.neighborhood = NEIGHBORHOOD_EN_TO_HE.get(apt.neighborhood, apt.neighborhood)
+        
+        # === NEW: available_from -> Timestamp@12:00 with "immediate" fallback ===
+        af_raw = apt.available_from
+
+        # keep existing datetime as-is
+        af_dt = af_raw if isinstance(af_raw, datetime) else None
+
+        if isinstance(af_raw, str):
+            # Try parsing the given date
+            af_dt = to_noon_timestamp(af_raw)
+            if not af_dt and IMMEDIATE_RE.search(post_text):
+                # If parsing failed but text says "immediate", use upload date or today
+                af_dt = upload_date_from_post_id_noon(post_id) or today_noon_il()
+        elif not af_raw:
+            # Empty/None -> "immediate" heuristic
+            if IMMEDIATE_RE.search(post_text):
+                af_dt = upload_date_from_post_id_noon(post_id) or today_noon_il()
+
+        # only set if we actually computed something
+        if af_dt is not None:
+            apt.available_from = af_dt
+
+        # Derive upload_date from ID prefix: ddmmyyyy_XXXX → yyyy-mm-dd
+        raw_date = (post_id or "").split("_")[0]
+        if len(raw_date) == 8 and raw_date.isdigit():
+            apt.upload_date = f"{raw_date[4:]}-{raw_date[2:4]}-{raw_date[0:2]}"
+
+        # Fingerprint (used for duplicate detection)
+        apt.fingerprint = generate_fingerprint(apt)
+        if not apt.fingerprint:
+            print(f"Could not generate fingerprint for post {post_id} – skipping.")
+            _mark(writer, post_id, "incomplete")
+            return False
+
+        # Duplicate check: exact fingerprint, then fuzzy match (in-memory index of existing
+        # apartments + this run's saves)
+        with METRICS.stage("dedup"):
+            duplicate_of = fp_index.claim(post_id, apt)
+        if duplicate_of is not None:
+            print(f"Duplicate apartment (of {duplicate_of}) — skipping.")
+            _mark(writer, post_id, "duplicate")
+            return False
+        claimed = True
+
+        # Minimal completeness gate: require at least one of (address, rooms, price)
+        if not (apt.address or apt.rooms or apt.price):
+            print(f"Skipping post {post_id} – no important fields present.")
+            fp_index.release(post_id)
+            _mark(writer, post_id, "incomplete")
+            return False
+
+        # Save apartment with proper server timestamp (expire_at lets pruning use a range delete)
+        expire_at = expire_at_from_now(RETENTION_DAYS)
+        writer.set("apartments", post_id, apt.to_firestore(indexed_at=SERVER_TIMESTAMP, expire_at=expire_at))
+
+        # Mark source post as processed (also server timestamp)
+        _mark(writer, post_id, "processed", {
+            "indexed_at": SERVER_TIMESTAMP,
+            "expire_at": expire_at
+        })
+
+        print(f"Apartment saved: {post_id}")
+        saved = True
+
+    except Exception as e:
+        print(f"Error processing {post_id}: {e}")
+        if claimed:
+            fp_index.release(post_id)
+        _mark_failed(writer, post, type(e).__name__, {
+            "indexed_at": SERVER_TIMESTAMP
+        })
+        saved = False
+
+    return saved
+
+
+def process_posts_stream(statuses=("new", "error"), concurrency: int = PROCESS_CONCURRENCY,
+                         queue_depth: int = PROCESS_QUEUE_DEPTH,
+                         lease_owner: Optional[str] = WORKER_ID if PROCESS_LEASES_ENABLED else None,
+                         shard: str = WORKER_SHARD) -> int:
     """
     Stream posts with the given statuses, extract structured data via GPT,
     and upsert valid listings into 'apartments'. Returns the number of saved apartments.
+
+    With concurrency > 1, up to `concurrency` posts are processed in parallel
+    (GPT calls and Firestore I/O overlap) and at most `queue_depth` posts are
+    pulled from the stream ahead of completion.
+
+    Posts are read in id-ordered pages and progress is checkpointed, so a run that
+    crashes or is killed resumes after the last finished post instead of starting over.
+
+    With lease_owner set, several workers (processes or hosts) can run this concurrently:
+    each post is leased ("processing", owner + expiry) in a transaction before extraction,
+    posts leased by others are skipped, and leases of workers that died are reclaimed.
+    shard "k/n" makes each worker start on its own share of the posts (see _shard_first).
     """
-    posts_ref = db.collection("posts")
-    new_posts = posts_ref.where(
-        filter=FieldFilter("status", "in", list(statuses))
-    ).stream()
+    storage = get_storage()
+    claim = _lease_claimer(storage, lease_owner, statuses)
+    checkpoint = _open_checkpoint("stream", statuses, lease_owner)
+    new_posts = _shard_first(storage, statuses, checkpoint.last_id, _parse_shard(shard))
 
+    fp_index = _load_fingerprint_index(storage)
+    writer = WriteBuffer(storage, on_failed=lambda ops: _writes_lost(ops, fp_index, checkpoint))
     processed = 0
 
-    for doc in new_posts:
-        post = doc.to_dict()
-        post_id = post.get("id")
-        post_text = (post.get("text") or "").strip()
+    if concurrency <= 1:
+        with _checkpointed(checkpoint, writer):
+            for post in new_posts:
+                checkpoint.start(post["id"])
+                if _process_post(post, fp_index, writer, claim=claim):
+                    processed += 1
+                _post_finished(checkpoint, writer, post["id"])
+        _finish_run(fp_index, writer, checkpoint)
+        return processed
+
+    queue_depth = max(queue_depth, concurrency)
+    in_flight = {}
+
+    def _drain(return_when):
+        nonlocal processed
+        done, _ = wait(in_flight, return_when=return_when)
+        for fut in done:
+            post_id = in_flight.pop(fut)
+            if fut.result():
+                processed += 1
+            _post_finished(checkpoint, writer, post_id)
+
+    with _checkpointed(checkpoint, writer), \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="easyrent") as pool:
+        for post in new_posts:
+            checkpoint.start(post["id"])
+            in_flight[pool.submit(_process_post, post, fp_index, writer, claim=claim)] = post["id"]
+            if len(in_flight) >= queue_depth:
+                _drain(FIRST_COMPLETED)
+        if in_flight:
+            _drain(ALL_COMPLETED)
+
+    _finish_run(fp_index, writer, checkpoint)
+    return processed
 
-        print(f"\nProcessing post {post_id}...")
 
-        # === NEW RULE: skip posts with no contactName ===
-        # If contactName is missing or null, we don't want to process this post.
-        if not post.get("contactName"):
-            print(f"Skipping post {post_id} – missing contactName")
-            posts_ref.document(post_id).update({"status": "skipped"})
-            continue
+def process_posts_daemon(statuses=("new", "error"), batch_size: int = DAEMON_BATCH_SIZE,
+                         max_wait: float = DAEMON_MAX_WAIT, concurrency: int = PROCESS_CONCURRENCY,
+                         lease_owner: Optional[str] = WORKER_ID if PROCESS_LEASES_ENABLED else None,
+                         stop_event: Optional[threading.Event] = None) -> int:
+    """
+    Long-running ingestion: watch 'posts' for new documents (Firestore snapshot listener, or
+    polling on the local backend) and run them through the pipeline in micro-batches of up to
+    batch_size posts, or whatever arrived within max_wait seconds of the first one.
+    "error" is not watched: every DAEMON_RETRY_INTERVAL seconds the error posts whose backoff
+    has run out are queried (retry_due_by=now, as in the scheduled run) and queued, so retries
+    and dead-lettering happen without a separate `main.py run`.
+    End-to-end latency (post created_at → apartment committed) is recorded as the "end_to_end"
+    stage for first attempts and the Prometheus textfile is refreshed after every batch.
+    Runs until stop_event is set or Ctrl-C; returns the number of saved apartments.
+    """
+    storage = get_storage()
+    retry_errors = "error" in statuses
+    watched = [s for s in statuses if s != "error"]
+    stop_event = stop_event or threading.Event()
+    claim = _lease_claimer(storage, lease_owner, statuses)
+    arrivals = queue.Queue()
+    # ids queued during this index generation (the listener may deliver a post again). Every post
+    # the pipeline handles leaves "new", so one delivered again after a refresh still needs work.
+    seen = set()
+    seen_lock = threading.Lock()
+
+    def _on_posts(posts):
+        with seen_lock:
+            for post in posts:
+                if post.get("id") and post["id"] not in seen:
+                    seen.add(post["id"])
+                    arrivals.put(post)
+
+    # Error posts queued by the retry sweep and not processed yet. Not in `seen`: a post that
+    # fails again is due again after its next backoff and has to be picked up then.
+    retrying = set()
+
+    def _queue_due_errors():
+        due = [p for p in _due_posts(storage, ["error"]) if p["id"] not in retrying]
+        for post in due:
+            retrying.add(post["id"])
+            arrivals.put(post)
+        if due:
+            print(f"[daemon] {len(due)} error posts due for retry")
+
+    fp_index = _load_fingerprint_index(storage)
+    loaded_at = time.monotonic()
+    writer = WriteBuffer(storage, on_failed=lambda ops: _writes_lost(ops, fp_index))
+    saved_total = 0
+    watch = storage.watch_posts(watched, _on_posts, DAEMON_POLL_INTERVAL)
+    retry_note = f", retrying due error posts every {DAEMON_RETRY_INTERVAL:g}s" if retry_errors else ""
+    print(f"Daemon watching posts with status {watched}{retry_note} ({storage.name} storage). Ctrl-C to stop.")
+    next_retry_sweep = time.monotonic() if retry_errors else float("inf")
 
-        # Guard: no text
-        if not post_text:
-            print("Skipping empty post.")
-            continue
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="easyrent") as pool:
+            while not stop_event.is_set():
+                if time.monotonic() >= next_retry_sweep:
+                    _queue_due_errors()
+                    next_retry_sweep = time.monotonic() + DAEMON_RETRY_INTERVAL
+                batch = _next_micro_batch(arrivals, batch_size, max_wait)
+                if not batch:
+                    continue
+                if time.monotonic() - loaded_at > DAEMON_INDEX_REFRESH:
+                    writer.flush()
+                    fp_index, loaded_at = _load_fingerprint_index(storage), time.monotonic()
+                    with seen_lock:
+                        seen.intersection_update(p["id"] for p in batch)
+
+                saved = list(pool.map(lambda p: _process_post(p, fp_index, writer, claim=claim), batch))
+                writer.flush()
+                retrying.difference_update(p["id"] for p in batch)
+                committed = time.time()
+                latencies = []
+                for post, ok in zip(batch, saved):
+                    created = _created_at_ts(post)
+                    # A retry's latency is mostly backoff, not pipeline time
+                    if ok and created is not None and post.get("status") != "error":
+                        latencies.append(committed - created)
+                        METRICS.observe("end_to_end", latencies[-1])
+                saved_total += sum(saved)
+                lat = f", end-to-end {min(latencies):.1f}–{max(latencies):.1f}s" if latencies else ""
+                print(f"[daemon] batch of {len(batch)}: {sum(saved)} saved{lat} "
+                      f"({saved_total} saved since start, {arrivals.qsize()} waiting)")
+                METRICS.write_textfile(METRICS_TEXTFILE_PATH, "daemon")
+    except KeyboardInterrupt:
+        print("Stopping daemon...")
+    finally:
+        watch.stop()
+
+    _finish_run(fp_index, writer)
+    return saved_total
+
+
+def _next_micro_batch(arrivals: queue.Queue, batch_size: int, max_wait: float) -> list:
+    """Block briefly for a first post, then collect more until batch_size or max_wait."""
+    try:
+        batch = [arrivals.get(timeout=0.5)]
+    except queue.Empty:
+        return []
+    deadline = time.monotonic() + max_wait
+    while len(batch) < batch_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(arrivals.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
 
-        # Guard: very short comment-like messages (not real listings)
-        if len(post_text) < 50 and re.search(r"(כמה|מחיר|פרטים|אשמח|אפשר|למה|נשמע|מעניין|שיתוף|\?)", post_text):
-            print("Skipping likely comment.")
-            posts_ref.document(post_id).update({"status": "skipped"})
-            continue
 
-        # Extract data with GPT
-        data = extract_apartment_data(post_text)
-        if data is None:
-            print("Skipping post due to parsing failure.")
-            posts_ref.document(post_id).update({"status": "error"})
-            _save_error_log(post_id, post_text)
+def _created_at_ts(post: dict) -> Optional[float]:
+    """Epoch seconds of the scraper's created_at (ISO string or datetime), None if unknown."""
+    raw = post.get("created_at")
+    try:
+        dt = raw if isinstance(raw, datetime) else datetime.fromisoformat(str(raw).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def process_posts_backfill(statuses=("new", "error"), batch_size: int = EXTRACTION_BATCH_SIZE) -> int:
+    """
+    Like process_posts_stream, but packs batch_size posts into each GPT request.
+    Meant for backfills where per-post latency doesn't matter. Returns the number of saved apartments.
+    """
+    storage = get_storage()
+    checkpoint = _open_checkpoint("backfill", statuses)
+    new_posts = _due_posts(storage, statuses, checkpoint.last_id)
+
+    fp_index = _load_fingerprint_index(storage)
+    writer = WriteBuffer(storage, on_failed=lambda ops: _writes_lost(ops, fp_index, checkpoint))
+    processed = 0
+    pending = []
+
+    def _flush():
+        nonlocal processed
+        results = extract_apartment_data_batch(
+            {p["id"]: (p.get("text") or "").strip() for p in pending}, batch_size=batch_size
+        )
+        for p in pending:
+            print(f"\nSaving post {p['id']}...")
+            if _save_extraction(p, results.get(p["id"]), fp_index, writer):
+                processed += 1
+            _post_finished(checkpoint, writer, p["id"])
+        pending.clear()
+
+    with _checkpointed(checkpoint, writer):
+        for post in new_posts:
+            print(f"\nQueueing post {post.get('id')}...")
+            checkpoint.start(post["id"])
+            if _passes_guards(post, writer):
+                data = _fast_path((post.get("text") or "").strip())
+                if data is None:
+                    pending.append(post)
+                    if len(pending) >= batch_size:
+                        _flush()
+                    continue
+                if _save_extraction(post, data, fp_index, writer):
+                    processed += 1
+            _post_finished(checkpoint, writer, post["id"])
+        if pending:
+            _flush()
+
+    _finish_run(fp_index, writer, checkpoint)
+    return processed
+
+
+def submit_backlog_batch(statuses=("new", "error")) -> Optional[str]:
+    """
+    Offline backfill: write every eligible post into an OpenAI Batch-API job file and submit it.
+    Cache hits are saved right away. Submitted posts are marked 'batch_pending' (with the batch id)
+    so regular runs don't pay for them twice; apply_batch_results() finishes them later.
+    Returns the batch id (None if nothing needed the API).
+    """
+    storage = get_storage()
+    new_posts = _due_posts(storage, statuses)
+
+    fp_index = _load_fingerprint_index(storage)
+    writer = WriteBuffer(storage, on_failed=lambda ops: _writes_lost(ops, fp_index))
+    to_submit = {}
+
+    for post in new_posts:
+        print(f"\nQueueing post {post.get('id')}...")
+        if not _passes_guards(post, writer):
             continue
+        post_text = (post.get("text") or "").strip()
+        cached = _fast_path(post_text) or cached_extraction(post_text)
+        if cached is not None:
+            _save_extraction(post, cached, fp_index, writer)
+        else:
+            to_submit[post["id"]] = post_text
+
+    if not to_submit:
+        _finish_run(fp_index, writer)
+        print("Nothing to submit.")
+        return None
 
-        try:
-            # Not an apartment listing
-            if data.get("is_apartment") is False:
-                print("Not an apartment listing.")
-                posts_ref.document(post_id).update({"status": "skipped"})
-                continue
-
-            # Home exchange: skip
-            if data.get("category") == "החלפה":
-                print("Home exchange — skipping.")
-                posts_ref.document(post_id).update({"status": "skipped_exchange"})
-                continue
-
-            # Merge GPT output into default structure
-            full_data = DEFAULT_APT.copy()
-            full_data.update(data)
+    writer.flush()  # cache hits are saved even if the submission below fails
+    path = new_batch_file_path()
+    count = write_batch_file(to_submit, path)
+    batch_id = submit_batch_file(path)
+    for post_id in to_submit:
+        _mark(writer, post_id, "batch_pending", {"batch_id": batch_id})
+    _finish_run(fp_index, writer)
 
-            # Normalize rooms (support half-rooms)
-            full_data["rooms"] = _normalize_rooms_value(full_data.get("rooms"), post_text)
-
-            # Ensure sensible defaults
-            if full_data.get("category") is None and data.get("is_apartment"):
-                full_data["category"] = "שכירות"
-            if "phone_number" not in full_data and data.get("is_apartment"):
-                full_data["phone_number"] = None
-            if not full_data.get("rental_scope") and data.get("is_apartment"):
-                full_data["rental_scope"] = "דירה שלמה"
-
-            # Remove address if it redundantly contains the neighborhood name (Hebrew)
-            if full_data.get("address") and full_data.get("neighborhood"):
-                heb_name = NEIGHBORHOOD_EN_TO_HE.get(full_data["neighborhood"])
-                if heb_name and isinstance(full_data["address"], str) and heb_name in full_data["address"]:
-                    full_data["address"] = None
+    print(f"Submitted {count} posts as batch {batch_id} ({path.name}).")
+    return batch_id
 
-            # Enrich with source metadata
-            full_data["id"] = post_id
-            full_data["images"] = post.get("images", [])
-            full_data["description"] = clean_post_text(post_text)
-            full_data["contactId"] = post.get("contactId")
-            full_data["contactName"] = post.get("contactName")
-
-            # Convert neighborhood (EN → HE) before saving
-            if full_data.get("neighborhood"):
-                full_data["neighborhood"] = NEIGHBORHOOD_EN_TO_HE.get(
-                    full_data["neighborhood"], full_data["neighborhood"]
-                )
-            
-            # === NEW: available_from -> Timestamp@12:00 with "immediate" fallback ===
-            af_raw = full_data.get("available_from")
-
-            # keep existing datetime as-is
-            af_dt = af_raw if isinstance(af_raw, datetime) else None
-
-            if isinstance(af_raw, str) and af_raw.strip():
-                # Try parsing the given date
-                af_dt = to_noon_timestamp(af_raw.strip())
-                if not af_dt and IMMEDIATE_RE.search(post_text):
-                    # If parsing failed but text says "immediate", use upload date or today
-                    af_dt = upload_date_from_post_id_noon(post_id) or today_noon_il()
-            elif not af_raw:
-                # Empty/None -> "immediate" heuristic
-                if IMMEDIATE_RE.search(post_text):
-                    af_dt = upload_date_from_post_id_noon(post_id) or today_noon_il()
-
-            # only set if we actually computed something
-            if af_dt is not None:
-                full_data["available_from"] = af_dt
-
-            # Derive upload_date from ID prefix: ddmmyyyy_XXXX → yyyy-mm-dd
-            raw_date = (post_id or "").split("_")[0]
-            if len(raw_date) == 8 and raw_date.isdigit():
-                full_data["upload_date"] = f"{raw_date[4:]}-{raw_date[2:4]}-{raw_date[0:2]}"
-            else:
-                full_data["upload_date"] = None
-
-            # Fingerprint (used for duplicate detection)
-            fingerprint = generate_fingerprint(full_data)
-            if not fingerprint:
-                print(f"Could not generate fingerprint for post {post_id} – skipping.")
-                posts_ref.document(post_id).update({"status": "incomplete"})
-                continue
-            full_data["fingerprint"] = fingerprint
-
-            # Duplicate check by fingerprint
-            existing = db.collection("apartments").where(
-                filter=FieldFilter("fingerprint", "==", fingerprint)
-            ).get()
-            if existing:
-                print("Duplicate apartment — skipping.")
-                posts_ref.document(post_id).update({"status": "duplicate"})
-                continue
-
-            # Minimal completeness gate: require at least one of (address, rooms, price)
-            if not any(full_data.get(f) for f in ("address", "rooms", "price")):
-                print(f"Skipping post {post_id} – no important fields present.")
-                posts_ref.document(post_id).update({"status": "incomplete"})
-                continue
-
-            # Save apartment with proper server timestamp
-            db.collection("apartments").document(post_id).set({
-                **full_data,
-                "indexed_at": _fs.SERVER_TIMESTAMP
-            })
-
-            # Mark source post as processed (also server timestamp)
-            posts_ref.document(post_id).update({
-                "status": "processed",
-                "indexed_at": _fs.SERVER_TIMESTAMP
-            })
 
-            processed += 1
-            print(f"Apartment saved: {post_id}")
+def apply_batch_results(batch_id: str, output_path=None) -> Optional[int]:
+    """
+    Apply a finished Batch-API job to its 'batch_pending' posts (same normalize/dedup/save path).
+    Posts without a usable answer, or whose request failed, are marked failed (retried with
+    backoff); posts the job never ran (it failed, expired or was cancelled first) go back to
+    'new'. Returns the number of saved apartments, or None if the batch is still running.
+    """
+    path = output_path or download_batch_output(batch_id)
+    if path is None:
+        return None
+    texts, errors = read_batch_output(path)
 
-        except Exception as e:
-            print(f"Error processing {post_id}: {e}")
-            posts_ref.document(post_id).update({
-                "status": "error",
-                "indexed_at": _fs.SERVER_TIMESTAMP
-            })
+    storage = get_storage()
+    pending = METRICS.timed_iter("query", storage.stream_posts_in_batch(batch_id))
 
-        # Soft throttle to avoid resource bursts
-        time.sleep(0.5)
+    fp_index = _load_fingerprint_index(storage)
+    writer = WriteBuffer(storage, on_failed=lambda ops: _writes_lost(ops, fp_index))
+    processed = requeued = 0
+    for post in pending:
+        if post.get("status") != "batch_pending":
+            continue
+        post_id = post.get("id")
+        error = errors.get(post_id)
+        if error in UNRUN_REQUEST_ERRORS or (error is None and post_id not in texts):
+            writer.update("posts", post_id, {"status": "new", "batch_id": None})
+            requeued += 1
+            continue
+        if error is not None:
+            _mark_failed(writer, post, f"batch_{error}")
+            continue
+        post_text = (post.get("text") or "").strip()
+        print(f"\nApplying batch result for {post_id}...")
+        result_text = texts[post_id]
+        with METRICS.stage("parse"):
+            data = finalize_result(parse_gpt_output_safe(result_text), post_text) if result_text else None
+        if _save_extraction(post, data, fp_index, writer):
+            processed += 1
 
+    METRICS.count("batch_requeued", requeued)
+    if requeued:
+        print(f"{requeued} posts of batch {batch_id} were never run — back to 'new'.")
+    _finish_run(fp_index, writer)
     return processed
+
+
+# Post fields the pipeline reads, for posts re-read by id (replay)
+_POST_FIELDS = ["id", "text", "status", "contactName", "contactId", "images", "attempts", "created_at"]
+REPLAY_STATUSES = ("error", "dead_letter")
+
+
+def replay_error_log(concurrency: int = 8, error: Optional[str] = None, dry_run: bool = False,
+                     lease_owner: Optional[str] = WORKER_ID if PROCESS_LEASES_ENABLED else None) -> int:
+    """
+    Post-incident reprocessing: stream the posts in the error log (rotated files included, one
+    entry per post) back through the pipeline, `concurrency` at a time and ignoring retry backoff.
+    Only posts that are still "error"/"dead_letter" are re-read and processed; `error` limits the
+    replay to one error class. Returns the number of saved apartments.
+    """
+    storage = get_storage()
+    log = get_error_log()
+    log.flush()
+    ids = sorted({e["id"] for e in log.entries() if error is None or e["error"] == error})
+    print(f"Error log: {len(ids)} posts{f' with {error}' if error else ''}.")
+    if dry_run:
+        still_failed = sum(1 for _, f in storage.get_fields("posts", ["status"], ids=ids)
+                           if f.get("status") in REPLAY_STATUSES)
+        print(f"{still_failed} of them are still {'/'.join(REPLAY_STATUSES)} and would be replayed.")
+        return 0
+
+    claim = _lease_claimer(storage, lease_owner, REPLAY_STATUSES)
+    fp_index = _load_fingerprint_index(storage)
+    writer = WriteBuffer(storage, on_failed=lambda ops: _writes_lost(ops, fp_index))
+    saved = replayed = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="easyrent") as pool:
+        for start in range(0, len(ids), POSTS_PAGE_SIZE):
+            with METRICS.stage("query"):
+                page = storage.get_fields("posts", _POST_FIELDS, ids=ids[start:start + POSTS_PAGE_SIZE])
+                posts = [{**fields, "id": post_id} for post_id, fields in page
+                         if fields.get("status") in REPLAY_STATUSES]
+            replayed += len(posts)
+            saved += sum(pool.map(lambda p: _process_post(p, fp_index, writer, claim=claim), posts))
+            writer.flush()
+
+    _finish_run(fp_index, writer)
+    print(f"Replayed {replayed} posts, {saved} apartments saved.")
+    return saved
+
+
+def requeue_dead_letters(dry_run: bool = False) -> int:
+    """Give every "dead_letter" post a fresh set of attempts (e.g. after fixing a prompt/parser bug)."""
+    storage = get_storage()
+    writer = WriteBuffer(storage)
+    # Due now rather than None: Firestore range filters (see stream_posts) skip missing/null fields
+    now = datetime.now(timezone.utc)
+    count = 0
+    for post in storage.stream_posts(["dead_letter"]):
+        count += 1
+        if not dry_run:
+            writer.update("posts", post["id"], {"status": "error", "attempts": 0, "next_attempt_at": now})
+    writer.flush()
+    print(f"{'Would requeue' if dry_run else 'Requeued'} {count} dead-letter posts.")
+    return count
+
+
+def backfill_retry_times(dry_run: bool = False) -> int:
+    """
+    One-off after upgrading: give "error" posts written before retries were tracked a
+    next_attempt_at of now. Firestore finds due retries with a range filter, which never matches
+    a post without the field, so until then those posts would be neither retried nor dead-lettered.
+    """
+    storage = get_storage()
+    writer = WriteBuffer(storage)
+    now = datetime.now(timezone.utc)
+    count = 0
+    for post in storage.stream_posts(["error"]):
+        if post.get("next_attempt_at") is None:
+            count += 1
+            if not dry_run:
+                writer.update("posts", post["id"], {"next_attempt_at": now})
+    writer.flush()
+    print(f"{'Would set' if dry_run else 'Set'} next_attempt_at on {count} error posts.")
+    return count
+
+
+def _load_fingerprint_index(storage) -> FingerprintIndex:
+    snapshot = FINGERPRINT_SNAPSHOT_PATH if FINGERPRINT_SNAPSHOT_ENABLED else None
+    with METRICS.stage("index_load"):
+        return FingerprintIndex.load(storage, snapshot_path=snapshot)
+
+
+def _lease_claimer(storage, lease_owner: Optional[str], statuses):
+    """claim(post_id) for _process_post when leasing (reclaiming expired leases first), else None."""
+    if not lease_owner:
+        return None
+    released = storage.release_expired_leases()
+    if released:
+        print(f"Reclaimed {released} posts with expired leases.")
+    METRICS.count("leases_reclaimed", released)
+    return partial(storage.claim_post, owner=lease_owner, lease_seconds=LEASE_SECONDS, statuses=statuses)
+
+
+def _parse_shard(spec: str) -> Optional[tuple]:
+    """(k, n) from "k/n"; None for "" (no sharding)."""
+    if not spec:
+        return None
+    try:
+        k, n = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid worker shard {spec!r}: expected k/n, e.g. 0/4") from None
+    if not 0 <= k < n:
+        raise ValueError(f"Invalid worker shard {spec!r}: k must be in 0..n-1")
+    return k, n
+
+
+def _shard_of(post_id: str, shards: int) -> int:
+    # crc32 rather than hash(): string hashes are salted per process
+    return zlib.crc32(post_id.encode()) % shards
+
+
+def _due_posts(storage, statuses, after: Optional[str] = None):
+    """Posts with the given statuses in id order; the query leaves out "error" posts still backing off."""
+    return METRICS.timed_iter("query", storage.stream_posts(
+        statuses, after=after, retry_due_by=datetime.now(timezone.utc)))
+
+
+def _shard_first(storage, statuses, after: Optional[str], shard: Optional[tuple]):
+    """
+    Posts for one worker of several. Unsharded, every worker walks the same id order and all but
+    one lose each lease race; with shard (k, n) the worker first takes the posts whose id hashes
+    to k, then steals from the other shards whatever is still unclaimed (a second pass from the
+    start, so a worker that finishes early helps the slower ones).
+    """
+    if shard is None:
+        yield from _due_posts(storage, statuses, after)
+        return
+    k, n = shard
+    for post in _due_posts(storage, statuses, after):
+        if _shard_of(post["id"], n) == k:
+            yield post
+    for post in _due_posts(storage, statuses):
+        if _shard_of(post["id"], n) != k:
+            yield post
+
+
+def _open_checkpoint(mode: str, statuses, owner: Optional[str] = None) -> RunCheckpoint:
+    # Each leasing worker keeps its own checkpoint
+    path = PROCESS_CHECKPOINT_PATH
+    if owner:
+        path = path.with_name(f"{path.stem}.{owner}{path.suffix}")
+    checkpoint = RunCheckpoint.load(path, f"{mode}:{','.join(sorted(statuses))}")
+    METRICS.add_section("checkpoint", {"run_id": checkpoint.run_id, "resumed": checkpoint.resumed,
+                                       "resumed_after": checkpoint.last_id})
+    return checkpoint
+
+
+def _writes_lost(ops, fp_index: FingerprintIndex, checkpoint: Optional[RunCheckpoint] = None):
+    """
+    WriteBuffer on_failed: writes that failed even on their own. Apartments that were not saved give
+    their fingerprint back, and the checkpoint stops advancing so the next run retries those posts.
+    """
+    for kind, collection, doc_id, _ in ops:
+        if kind == "set" and collection == "apartments":
+            fp_index.release(doc_id)
+    if checkpoint is not None:
+        checkpoint.hold()
+
+
+def _post_finished(checkpoint: RunCheckpoint, writer: WriteBuffer, post_id: str):
+    """Advance the checkpoint; before saving it, flush so it never gets ahead of the status writes."""
+    if checkpoint.done(post_id):
+        writer.flush()
+        checkpoint.save()
+
+
+@contextmanager
+def _checkpointed(checkpoint: RunCheckpoint, writer: WriteBuffer):
+    """On any interruption (error, Ctrl-C), flush what was done and save the checkpoint, then re-raise."""
+    try:
+        yield
+    except BaseException:
+        writer.close()
+        checkpoint.save()
+        print(f"Run {checkpoint.run_id} interrupted — next run resumes after post {checkpoint.last_id}.")
+        raise
+
+
+def _finish_run(fp_index: FingerprintIndex, writer: WriteBuffer, checkpoint: Optional[RunCheckpoint] = None):
+    """
+    End-of-run housekeeping: flush buffered writes, persist the fingerprint snapshot
+    (if enabled) and print stats (also attached to the run report). A completed run drops its
+    checkpoint.
+    """
+    writer.close()
+    if checkpoint is not None:
+        checkpoint.clear()
+    get_error_log().flush()
+    METRICS.add_section("writes", writer.stats())
+    METRICS.add_section("error_log", get_error_log().stats())
+    if FINGERPRINT_SNAPSHOT_ENABLED:
+        fp_index.save_snapshot(FINGERPRINT_SNAPSHOT_PATH)
+    _print_run_stats()
+
+
+def _print_run_stats():
+    cache = get_extraction_cache()
+    if cache:
+        print(f"Extraction cache: {cache.stats()}")
+        METRICS.add_section("extraction_cache", cache.stats())
+    METRICS.add_section("fast_path", dict(FASTPATH_STATS))
+    METRICS.add_section("prompts", dict(PROMPT_STATS))
+    llm_input = input_stats()
+    METRICS.add_section("llm_input", llm_input)
+    if FASTPATH_STATS["llm_calls_avoided"]:
+        print(f"Rule-based fast path: {FASTPATH_STATS['llm_calls_avoided']} GPT calls avoided")
+    if PROMPT_STATS["prompts"]:
+        print(f"Prompts: {PROMPT_STATS['prompts']} built, {PROMPT_STATS['prompt_tokens']} tokens, "
+              f"{PROMPT_STATS['saved_tokens']} saved by gazetteer filtering")
+    if llm_input["posts"]:
+        saved = llm_input["raw_tokens"] - llm_input["tokens"]
+        print(f"LLM input: {llm_input['raw_tokens']} → {llm_input['tokens']} post tokens "
+              f"({saved} saved by cleaning, {llm_input['truncated']} posts truncated)")
+
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+Prompt builder for the apartment extraction call.
+- Static prompt text is assembled once per process (per year), not on every call.
+- Gazetteer blocks are injected either in full or filtered to the entries that
+  actually appear in the post ("relevant" mode), which keeps most prompts small.
+- Every build reports its token count and the tokens saved versus the full prompt.
+"""
+
+import re
+import threading
+from functools import lru_cache
+
+from .config import PROMPT_GAZETTEER_MODE
+from .neighborhoods import NEIGHBORHOOD_EN_TO_HE
+from .tokens import count_tokens
+from easyrent.geo.ta_gazetteer import (
+    AMBIGUOUS_LONG_STREETS,
+    LANDMARK_TO_NEI_EN,
+    NEIGH_SYNONYMS_HE_TO_EN,
+    STREET_TO_NEI_EN,
+)
+
+PROMPT_MODES = ("full", "relevant")
+
+# Note: doubled {{ }} are literal JSON braces (this part goes through str.format).
+_HEADER_TEMPLATE = """
+You are a data extraction assistant specializing in Israeli real estate posts on Facebook.
+
+TASK: Extract data from this Facebook post about apartments for rent in Tel Aviv.
+
+CRITICAL INSTRUCTIONS:
+1) Most Facebook posts ARE apartment listings unless they're clearly just brief comments.
+2) For the "neighborhood" field, you MUST return either:
+   - EXACTLY one canonical Tel Aviv neighborhood name (from the list below; strict spelling), OR
+   - null if you are not 100% certain. Never invent or approximate.
+3) Dates: Only if the post explicitly states a start date, return it in YYYY-MM-DD.
+   - If date has no year, use the CURRENT YEAR ({current_year}).
+   - If there is NO explicit date, set "available_from": null (never guess).
+4) Address:
+   - KEEP THE STREET NAME IN HEBREW (name + number if available).
+   - Strip marketing adjectives (e.g., 'יוקרתי', 'מדהים', 'מושלם', 'מטופח', ...).
+   - Extract even if preceded by 'ברחוב', 'באזור', etc.
+5) If the post mixes listing + comments, focus ONLY on the listing details.
+6) Fields title, description, and address are in Hebrew.
+
+NEIGHBORHOOD DETERMINATION (STRICT):
+A) EXPLICIT MENTIONS (highest priority)
+   - If the text explicitly says "בשכונת ___" / "שכונת ___" / "באזור ___" about a Tel Aviv neighborhood,
+     map it EXACTLY to a canonical English name from the list below.
+   - If there is no clear 1:1 match to the canonical list → neighborhood = null.
+   - Examples:
+     "בשכונת נווה צדק" → "Neve Tzedek"
+     "שכונת פלורנטין" → "Florentin"
+     "באזור הצפון הישן" → "The Old North"
+
+B) LANDMARK/STREET MAPPING (use ONLY if there is NO explicit neighborhood)
+   JAFFA & SOUTH (landmarks → canonical EN):
+   - "שוק הפשפשים" / "Flea Market" / "מגדל השעון" / "Clock Tower" → "Jaffa D"
+   - "שוק לוינסקי" / "Levinsky Market" / "רחוב לוינסקי" → "Florentin"
+
+   JAFFA NEIGHBORHOODS (explicit cues → canonical EN):
+   - "יפו א" / "שכונת דקר" → "Jaffa A"
+   - "גבעת אנדרומדה" → "Givat Andromeda"
+   - "גבעת עלייה" → "Givat Aliya"
+   - "יפה נוף" → "Yafe Nof (Jaffa)"
+   - "יפו ג" → "Jaffa G"
+   - "יפו ד" → "Jaffa D"
+   - "יפו העתיקה" / "העיר העתיקה" → "Old Jaffa"
+   - "מנשייה" / "מנשייה (יפו)" → "Manshiya (Jaffa)"
+   - "נווה שלום" → "Neve Shalom"
+   - "סכנת א-תורכי" → "Sakanat Al-Turki"
+   - "פרדס דכה" → "Pardes Daka"
+   - "צהלון" → "Tzahal On"
+   - "שיכוני חיסכון" → "Shikuney Chisachon"
+
+   CENTER:
+   - "שוק הכרמל" / "Carmel Market" → "Kerem HaTeimanim"
+   - "נחלת בנימין" (המדרחוב) → "Nachalat Binyamin"
+   - "שדרות רוטשילד" / "רוטשילד" / "גן החשמל" / "הבימה" / "דיזנגוף סנטר" → "Lev Tel Aviv (City Center)"
+
+   OLD NORTH vs CITY CENTER (disambiguation):
+   - If mentions "אבן גבירול" together with "ז'בוטינסקי" OR "בן-גוריון" OR "ארלוזורוב" (north of Dizengoff)
+     OR mentions beaches/landmarks "גורדון" / "פרישמן" / "הילטון" / "נורדאו" in a northern context
+     → "The Old North".
+   - If mentions "דיזנגוף סנטר", "כיכר רבין", "בוגרשוב" without clear northern cues
+     → "Lev Tel Aviv (City Center)".
+
+   FAR NORTH:
+   - "נמל תל אביב" / "Reading" / "רידינג" → "Kochav HaTzafon"
+   - "חוף תל ברוך" → "Tel Baruch"
+
+   OTHER:
+   - "עזריאלי" / "שרונה" / "תחנת השלום" → "HaKirya"
+   - "שוק התקווה" → "HaTikva"
+   - "רמת החייל" / "אסותא רמת החייל" → "Ramat HaHayal"
+
+C) VALIDATION & AMBIGUITY
+   - Use ONLY names from the canonical list below (strict spelling).
+   - Do NOT output "Lev Ha'Ir", "Center", "City Center" unless exactly "Lev Tel Aviv (City Center)".
+   - If multiple areas are mentioned and they conflict, prefer EXPLICIT neighborhood text (A).
+   - If still uncertain after A–B, set "neighborhood": null.
+   - Do NOT infer from long multi-neighborhood streets (e.g., "בן יהודה") without a disambiguating landmark.
+
+OUT-OF-SCOPE CITIES (MANDATORY RULE):
+- If the listing is clearly outside Tel Aviv–Yafo (e.g., בת-ים, חולון, גבעתיים, רמת-גן, or any other city),
+  you MUST treat it as not relevant.
+- In such cases, return ONLY: {{"is_apartment": false}}
+- Do NOT set "is_apartment": true and neighborhood=null for these cases.
+- We only want apartments in Tel Aviv–Yafo itself.
+
+
+NEIGHBORHOOD RULES (STRICT ADD-ON):
+- If the address contains a Hebrew street that exactly matches the injected STREET→NEIGHBORHOOD map,
+  you MUST return that canonical neighborhood.
+- If the text contains a known landmark from the injected LANDMARK→NEIGHBORHOOD map, you MUST return that neighborhood.
+- Streets in AMBIGUOUS_LONG_STREETS must NOT determine a neighborhood unless a disambiguating landmark is present.
+- Prefer STREET/LANDMARK matches over old Jaffa block labels (A/G/D) unless the post explicitly says "יפו ד/ג/א".
+- If uncertain after applying the above, set "neighborhood": null (never guess).
+- If both a STREET rule and a LANDMARK rule match, prefer the STREET result.
+
+
+"""
+
+_INJECTED_TEMPLATE = """INJECTED STREET MAP (Heb → Canonical EN; exact match only):
+{street_map_block}
+
+INJECTED LANDMARK MAP (Heb → Canonical EN):
+{landmark_map_block}
+
+AMBIGUOUS LONG STREETS (never infer without landmark):
+{ambiguous_block}
+
+"""
+
+_RULES_TAIL = """CATEGORY (MANDATORY):
+- Return a Hebrew value in "category" with EXACTLY one of:
+  "שכירות", "מכירה", "סאבלט", "החלפה"
+- STRICT SUBLET RULE: Only set "סאבלט" if the post explicitly contains one of:
+  "סאבלט", "תת-השכרה", "השכרה זמנית", "sublet". Otherwise prefer "שכירות".
+- If unclear, default to "שכירות".
+
+RENTAL SCOPE (MANDATORY):
+- "דירה שלמה" or "שותפים" (If "מכירה" → "דירה שלמה").
+
+PHONE NUMBER (MANDATORY):
+- Detect Israeli numbers (050/052/054… and +972 variants).
+- Normalize to digits only (e.g., "0521234567"). If none → null.
+
+MANDATORY FALLBACK & NORMALIZATION RULES:
+- If the post says "סטודיו", set "rooms": 1 (never null).
+- If the post describes "יחידת דיור" or "גלריה" as a single unit → rooms=1.
+- If the text contains the word "נדל״ן" or a company name → "has_broker": true.
+- Normalize property_type strictly:
+  * "דירת גן" → "apartment" and set "has_garden": true
+  * "סטודיו" → "apartment" (rooms=1)
+  * "פנטהאוז" → "penthouse"
+  * "דופלקס" → "duplex"
+- If no explicit price → "price": null.
+- If no explicit address but a neighborhood is given → copy the neighborhood into "address".
+- If no explicit available_from → "available_from": null.
+- Always include ALL fields, with null where information is missing.
+
+OUTPUT JSON (complete object, no markdown):
+{
+  "is_apartment": true,
+  "category": "<שכירות|מכירה|סאבלט>",
+  "phone_number": "<digits only or null>",
+  "rental_scope": "<דירה שלמה|שותפים>",
+  "title": "<Hebrew>",
+  "description": "",
+  "price": <number or null>,
+  "rooms": <number or null>,
+  "size": <number or null>,
+  "neighborhood": "<canonical English or null>",
+  "address": "<Hebrew street only>",
+  "floor": <number or null>,
+  "property_type": "<English>",
+  "pets_allowed": <boolean or null>,
+  "has_broker": <boolean or null>,
+  "has_balcony": <boolean or null>,
+  "has_safe_room": <boolean or null>,
+  "has_parking": <boolean or null>,
+  "has_elevator": <boolean or null>,
+  "available_from": "<YYYY-MM-DD or null>",
+  "facebook_url": "<url or null>"
+}
+
+COMMENT/QUESTION POSTS (no listing details):
+Return ONLY: {"is_apartment": false}
+
+FORMAT RULES:
+- Return ONLY a valid JSON object (no markdown).
+- Include ALL fields; unknown → null.
+- For "available_from": if not explicit → null (never guess).
+- Remove currency symbols/commas from numbers.
+- Use standard JSON quotes; if you need quotes inside Hebrew text, prefer U+05F4 (״) but DO NOT break JSON.
+- "rooms" may be integer or .5 (e.g., 2.5). Never round.
+
+"""
+
+_CANONICAL_TEMPLATE = """STANDARD TEL AVIV NEIGHBORHOODS (canonical; use ONLY these):
+{canonical_list}
+
+"""
+
+_TEXT_TEMPLATE = """TEXT TO ANALYZE:
+{post_text}
+"""
+
+_BATCH_TEMPLATE = """BATCH MODE (several posts in one request):
+- Each post below starts with a line "=== POST <id> ===".
+- Apply ALL the rules above to every post independently.
+- Return ONE JSON object whose keys are the post ids (as strings) and whose values are the per-post
+  JSON objects described above (including {{"is_apartment": false}} where applicable).
+- Include every post id exactly once.
+
+{posts_block}
+"""
+
+_NONE_MENTIONED = "- (none mentioned in this post)"
+
+# Qualifiers/ranges in gazetteer keys ("אבן גבירול 170+", "רוקח (קטע נמל)") → bare street name
+_STREET_QUALIFIER_RE = re.compile(r"\s*\(.*?\)|\s+\d+(?:\s*-\s*\d+)?\+?$")
+
+
+def _street_base(key: str) -> str:
+    return _STREET_QUALIFIER_RE.sub("", key).strip()
+
+
+def _map_lines(items) -> str:
+    return "\n".join([f"- {k} → {v}" for k, v in items])
+
+
+# ---------- Static parts (built once per process) ----------
+
+@lru_cache(maxsize=4)
+def _static_parts(current_year: int) -> dict:
+    """Header, rules tail and the full gazetteer/canonical blocks, with their token counts."""
+    header = _HEADER_TEMPLATE.format(current_year=current_year)
+    full_injected = _INJECTED_TEMPLATE.format(
+        street_map_block=_map_lines(STREET_TO_NEI_EN.items()),
+        landmark_map_block=_map_lines(LANDMARK_TO_NEI_EN.items()),
+        ambiguous_block="- " + "\n- ".join(sorted(AMBIGUOUS_LONG_STREETS)),
+    )
+    full_canonical = _CANONICAL_TEMPLATE.format(
+        canonical_list="- " + "\n- ".join(sorted(NEIGHBORHOOD_EN_TO_HE.keys()))
+    )
+    return {
+        "header": header,
+        "full_injected": full_injected,
+        "rules_tail": _RULES_TAIL,
+        "full_canonical": full_canonical,
+        "static_tokens": count_tokens(header) + count_tokens(_RULES_TAIL),
+        "full_injected_tokens": count_tokens(full_injected),
+        "full_canonical_tokens": count_tokens(full_canonical),
+    }
+
+
+@lru_cache(maxsize=1)
+def _relevance_tables():
+    """Lookup tables for relevant mode: (street base → entries), landmarks, synonyms, HE names."""
+    streets = {}
+    for key, nei in STREET_TO_NEI_EN.items():
+        streets.setdefault(_street_base(key), []).append((key, nei))
+    he_names = {he.replace("'", ""): en for en, he in NEIGHBORHOOD_EN_TO_HE.items()}
+    return streets, he_names
+
+
+# ---------- Relevant-mode filtering ----------
+
+def _relevant_blocks(post_text: str):
+    """Gazetteer entries (and canonical neighborhoods) actually referenced by the post."""
+    streets, he_names = _relevance_tables()
+
+    street_items = []
+    for base, entries in streets.items():
+        if base in post_text:
+            street_items.extend(entries)
+    landmark_items = [(k, v) for k, v in LANDMARK_TO_NEI_EN.items() if k in post_text]
+    ambiguous = sorted(s for s in AMBIGUOUS_LONG_STREETS if s in post_text)
+
+    hinted = {nei for _, nei in street_items} | {nei for _, nei in landmark_items}
+    hinted |= {en for he, en in NEIGH_SYNONYMS_HE_TO_EN.items() if he in post_text}
+    hinted |= {en for he, en in he_names.items() if he in post_text}
+
+    injected = _INJECTED_TEMPLATE.format(
+        street_map_block=_map_lines(street_items) or _NONE_MENTIONED,
+        landmark_map_block=_map_lines(landmark_items) or _NONE_MENTIONED,
+        ambiguous_block=("- " + "\n- ".join(ambiguous)) if ambiguous else _NONE_MENTIONED,
+    )
+    # No neighborhood signal at all → keep the full canonical list so the model can still decide
+    canonical = None
+    if hinted:
+        canonical = _CANONICAL_TEMPLATE.format(canonical_list="- " + "\n- ".join(sorted(hinted)))
+    return injected, canonical
+
+
+# ---------- Public API ----------
+
+_stats_lock = threading.Lock()
+PROMPT_STATS = {"prompts": 0, "prompt_tokens": 0, "saved_tokens": 0}
+
+
+def build_prompt(post_text: str, current_year: int, mode: str = PROMPT_GAZETTEER_MODE):
+    """
+    Build the extraction prompt for one post.
+    Returns (prompt, report) where report = {"mode", "prompt_tokens", "full_prompt_tokens", "saved_tokens"}.
+    """
+    if mode not in PROMPT_MODES:
+        raise ValueError(f"Unknown prompt mode {mode!r} (expected one of {PROMPT_MODES})")
+
+    parts = _static_parts(current_year)
+    text_block = _TEXT_TEMPLATE.format(post_text=post_text)
+    text_tokens = count_tokens(text_block)
+    full_tokens = (parts["static_tokens"] + parts["full_injected_tokens"]
+                   + parts["full_canonical_tokens"] + text_tokens)
+
+    if mode == "full":
+        injected, canonical = parts["full_injected"], parts["full_canonical"]
+        prompt_tokens = full_tokens
+    else:
+        injected, canonical = _relevant_blocks(post_text)
+        if canonical is None:
+            canonical = parts["full_canonical"]
+            canonical_tokens = parts["full_canonical_tokens"]
+        else:
+            canonical_tokens = count_tokens(canonical)
+        prompt_tokens = parts["static_tokens"] + count_tokens(injected) + canonical_tokens + text_tokens
+
+    prompt = "".join((parts["header"], injected, parts["rules_tail"], canonical, text_block))
+    report = {
+        "mode": mode,
+        "prompt_tokens": prompt_tokens,
+        "full_prompt_tokens": full_tokens,
+        "saved_tokens": full_tokens - prompt_tokens,
+    }
+    with _stats_lock:
+        PROMPT_STATS["prompts"] += 1
+        PROMPT_STATS["prompt_tokens"] += prompt_tokens
+        PROMPT_STATS["saved_tokens"] += report["saved_tokens"]
+    return prompt, report
+
+
+def build_batch_prompt(posts: dict, current_year: int, mode: str = PROMPT_GAZETTEER_MODE):
+    """
+    Build one prompt that extracts several posts ({post_id: post_text}) at once.
+    Static parts are shared; in relevant mode the gazetteer is filtered on all posts together.
+    Returns (prompt, report) like build_prompt.
+    """
+    if mode not in PROMPT_MODES:
+        raise ValueError(f"Unknown prompt mode {mode!r} (expected one of {PROMPT_MODES})")
+
+    parts = _static_parts(current_year)
+    posts_block = "\n\n".join(f"=== POST {pid} ===\n{text}" for pid, text in posts.items())
+    batch_block = _BATCH_TEMPLATE.format(posts_block=posts_block)
+
+    if mode == "full":
+        injected, canonical = parts["full_injected"], parts["full_canonical"]
+    else:
+        injected, canonical = _relevant_blocks("\n".join(posts.values()))
+        canonical = canonical or parts["full_canonical"]
+
+    prompt = "".join((parts["header"], injected, parts["rules_tail"], canonical, batch_block))
+    return prompt, {"mode": mode, "posts": len(posts), "prompt_tokens": count_tokens(prompt)}
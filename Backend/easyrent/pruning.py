@@ -1,8 +1,8 @@
 from datetime import datetime, timedelta, timezone
 import re
-from google.cloud.firestore_v1 import FieldFilter
-from .firebase import db
-from .config import FIRESTORE_DELETE_BATCH
+import time
+from .metrics import METRICS
+from .storage import get_storage
 
 def try_parse_date_from_id(doc_id: str):
     """Parse ddmmyyyy_* to a datetime (UTC)."""
@@ -15,49 +15,66 @@ def try_parse_date_from_id(doc_id: str):
     except Exception:
         return None
 
-def prune_older_than_days(collection_name: str, timestamp_field: str, days: int):
+def expire_at_from_now(days: int) -> datetime:
+    """Value for the expire_at field written at index time."""
+    return datetime.now(timezone.utc) + timedelta(days=days)
+
+def prune_expired(collection_name: str, dry_run: bool = False) -> int:
+    """
+    Delete documents whose expire_at (written at index time) has passed.
+    A single indexed range query; no scan of unexpired docs.
+    """
+    t0 = time.perf_counter()
+    with METRICS.stage("prune"):
+        deleted = get_storage().delete_where(collection_name, "expire_at", "<", datetime.now(timezone.utc),
+                                             dry_run=dry_run)
+    METRICS.count(f"pruned.{collection_name}", deleted)
+    verb = "Would prune" if dry_run else "Pruned"
+    print(f"{verb} {deleted} expired docs from '{collection_name}' in {time.perf_counter() - t0:.2f}s.")
+    return deleted
+
+def prune_older_than_days(collection_name: str, timestamp_field: str, days: int,
+                          dry_run: bool = False, id_fallback: bool = True) -> int:
     """
     Delete documents older than N days using timestamp_field.
     Fallback: If timestamp_field is missing, try parsing date from ID prefix.
+    Both passes read projections only, page with cursors through the whole result and
+    delete in parallel batches. dry_run only counts. Returns the number of (would-be) deletions.
     """
+    storage = get_storage()
     now_utc = datetime.now(timezone.utc)
     cutoff = now_utc - timedelta(days=days)
-    total_deleted = 0
-
-    # Pass 1: By timestamp field
-    q = db.collection(collection_name).where(
-        filter=FieldFilter(timestamp_field, "<", cutoff)
-    ).limit(FIRESTORE_DELETE_BATCH)
-
-    while True:
-        docs = list(q.stream())
-        if not docs:
-            break
-        batch = db.batch()
-        for doc in docs:
-            batch.delete(doc.reference)
-        batch.commit()
-        total_deleted += len(docs)
-
-    # Pass 2: Fallback by ID-embedded date
-    q_missing = db.collection(collection_name).limit(FIRESTORE_DELETE_BATCH)
-    while True:
-        docs = list(q_missing.stream())
-        if not docs:
-            break
-        to_delete = []
-        for doc in docs:
-            data = doc.to_dict()
-            if timestamp_field not in data:
-                ts_from_id = try_parse_date_from_id(doc.id)
-                if ts_from_id and ts_from_id < cutoff:
-                    to_delete.append(doc.reference)
-        if not to_delete:
-            break
-        batch = db.batch()
-        for ref in to_delete:
-            batch.delete(ref)
-        batch.commit()
-        total_deleted += len(to_delete)
-
-    print(f"Pruned {total_deleted} docs from '{collection_name}' older than {days} days (cutoff: {cutoff.isoformat()}).")
+    t0 = time.perf_counter()
+    scanned = 0
+
+    # Pass 1: By timestamp field (indexed range query)
+    with METRICS.stage("prune"):
+        by_field = storage.delete_where(collection_name, timestamp_field, "<", cutoff, dry_run=dry_run)
+
+    # Pass 2: Fallback by ID-embedded date. Firestore can't query for a missing field, so
+    # walk the whole collection (timestamp field only) instead of stopping at the first
+    # page without deletions.
+    def _undated_and_old(doc_id: str, data: dict) -> bool:
+        nonlocal scanned
+        scanned += 1
+        if timestamp_field in data:
+            return False
+        ts_from_id = try_parse_date_from_id(doc_id)
+        return bool(ts_from_id and ts_from_id < cutoff)
+
+    by_id = 0
+    if id_fallback:
+        t1 = time.perf_counter()
+        with METRICS.stage("prune"):
+            by_id = storage.delete_where(collection_name, predicate=_undated_and_old, fields=[timestamp_field],
+                                         dry_run=dry_run)
+        print(f"  ID-date fallback: scanned {scanned} docs in {time.perf_counter() - t1:.2f}s")
+
+    deleted = by_field + by_id
+    METRICS.count(f"pruned.{collection_name}", deleted)
+    elapsed = time.perf_counter() - t0
+    verb = "Would prune" if dry_run else "Pruned"
+    print(f"{verb} {deleted} docs from '{collection_name}' older than {days} days "
+          f"({by_field} by {timestamp_field}, {by_id} by ID date; cutoff: {cutoff.isoformat()}) "
+          f"in {elapsed:.2f}s ({deleted / elapsed if elapsed > 0 else 0:.0f} docs/s).")
+    return deleted
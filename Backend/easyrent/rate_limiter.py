@@ -0,0 +1,192 @@
+"""
+Client-side pacing for OpenAI calls, shared by every thread in the process:
+- two token buckets, requests/min and tokens/min, sized from the account limits in config and
+  corrected from the x-ratelimit-* headers the API returns with each response;
+- in-process retries with exponential backoff + jitter for transient errors (429, 5xx, timeouts,
+  dropped connections), honouring Retry-After, so a post isn't marked "error" over a blip.
+"""
+
+import random
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+from .config import OPENAI_BACKOFF_BASE, OPENAI_BACKOFF_CAP, OPENAI_MAX_ATTEMPTS, OPENAI_RPM, OPENAI_TPM
+from .metrics import METRICS
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNIT_S = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+# openai exception classes worth retrying (matched by name so the SDK stays a lazy import)
+_TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+_TRANSIENT_STATUS = {408, 409, 429}
+
+
+def parse_duration(value) -> Optional[float]:
+    """Seconds from a rate-limit header value ("20ms", "1s", "6m0s", "0.5"), None if missing/invalid."""
+    if value is None or value == "":
+        return None
+    parts = _DURATION_RE.findall(str(value))
+    if parts:
+        return sum(float(n) * _UNIT_S[unit] for n, unit in parts)
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class _Bucket:
+    """Token bucket refilled continuously at limit/60 per second, holding at most `limit`."""
+
+    def __init__(self, per_minute: int, now: float):
+        self.limit = max(1, per_minute)
+        self.level = float(self.limit)
+        self.stamp = now
+
+    def refill(self, now: float):
+        self.level = min(self.limit, self.level + (now - self.stamp) * self.limit / 60.0)
+        self.stamp = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` is available (requests larger than the bucket wait for a full one)."""
+        missing = min(amount, self.limit) - self.level
+        return max(0.0, missing * 60.0 / self.limit)
+
+    def sync(self, limit: Optional[int], remaining: Optional[int]):
+        if limit:
+            self.limit = limit
+        if remaining is not None:
+            # The server is authoritative when it has seen less headroom (other processes, other keys)
+            self.level = min(self.level, float(remaining))
+
+
+class RateLimiter:
+    def __init__(self, rpm: int = OPENAI_RPM, tpm: int = OPENAI_TPM, clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        now = clock()
+        self._requests = _Bucket(rpm, now)
+        self._tokens = _Bucket(tpm, now)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request and `tokens` tokens fit the budgets, then take them. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                delay = max(self._paused_until - now, self._requests.wait_for(1), self._tokens.wait_for(tokens))
+                if delay <= 0:
+                    self._requests.level -= 1
+                    self._tokens.level -= tokens
+                    return waited
+            self._sleep(delay)
+            waited += delay
+
+    def settle(self, reserved: int, used: int):
+        """Give back what a call reserved but didn't use (prompt estimate + max_tokens vs actual usage)."""
+        with self._lock:
+            self._tokens.level = min(self._tokens.limit, self._tokens.level + reserved - used)
+
+    def pause(self, seconds: float):
+        """Hold every caller for `seconds` (after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def update_from_headers(self, headers):
+        """Adopt the account's real limits/headroom from x-ratelimit-* response headers."""
+        if not headers:
+            return
+        with self._lock:
+            now = self._clock()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            self._requests.sync(_int_header(headers, "x-ratelimit-limit-requests"),
+                                _int_header(headers, "x-ratelimit-remaining-requests"))
+            self._tokens.sync(_int_header(headers, "x-ratelimit-limit-tokens"),
+                              _int_header(headers, "x-ratelimit-remaining-tokens"))
+            if _int_header(headers, "x-ratelimit-remaining-requests") == 0:
+                reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+                if reset:
+                    self._paused_until = max(self._paused_until, now + reset)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"rpm": self._requests.limit, "tpm": self._tokens.limit}
+
+
+# ---------- Retries ----------
+
+def is_transient(exc: Exception) -> bool:
+    """True for errors worth retrying: rate limits (but not an exhausted quota), 5xx, timeouts, connection drops."""
+    if getattr(exc, "code", None) == "insufficient_quota":
+        return False
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in _TRANSIENT_STATUS or status >= 500
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(exc).__mro__)
+
+
+def retry_after(exc: Exception) -> Optional[float]:
+    """Server-requested delay from Retry-After / retry-after-ms, if the error carries a response."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    ms = parse_duration(headers.get("retry-after-ms"))
+    return ms / 1000 if ms is not None else parse_duration(headers.get("retry-after"))
+
+
+def backoff_delay(attempt: int, base: float = OPENAI_BACKOFF_BASE, cap: float = OPENAI_BACKOFF_CAP) -> float:
+    """Exponential backoff with jitter for retry number `attempt` (1-based)."""
+    return min(cap, base * 2 ** (attempt - 1)) * (0.5 + random.random())
+
+
+def call_with_retries(fn: Callable, tokens: int = 0, limiter: Optional[RateLimiter] = None,
+                      max_attempts: int = OPENAI_MAX_ATTEMPTS, sleep=time.sleep):
+    """
+    Call fn() within the rate budgets, retrying transient failures up to max_attempts times.
+    The last error (or any non-transient one) is re-raised.
+    """
+    limiter = limiter or get_rate_limiter()
+    for attempt in range(1, max_attempts + 1):
+        waited = limiter.acquire(tokens)
+        if waited:
+            METRICS.observe("rate_wait", waited)
+        try:
+            return fn()
+        except Exception as e:
+            limiter.settle(tokens, 0)  # a failed call isn't billed against TPM; don't let it hold the budget
+            if attempt >= max_attempts or not is_transient(e):
+                raise
+            status = getattr(e, "status_code", None)
+            delay = min(retry_after(e) or backoff_delay(attempt), OPENAI_BACKOFF_CAP)
+            if status == 429:
+                limiter.pause(delay)
+            METRICS.count("openai_retries")
+            print(f" OpenAI {status or type(e).__name__}; retry {attempt}/{max_attempts - 1} in {delay:.1f}s")
+            sleep(delay)
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter shared by all extraction threads."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
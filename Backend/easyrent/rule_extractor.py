@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Rule-based extractor for templated listings (no LLM).
+Pulls price, rooms, size, floor, phone, address and boolean amenities out of the post with
+precompiled regexes and reports a per-field confidence in [0, 1].
+fast_path_extraction() returns a full extraction dict only when every required field is
+confident and nothing in the post needs the model's judgement (sublet/sale/partners/other city...).
+"""
+
+import re
+import threading
+from datetime import datetime
+from typing import Optional
+
+from .config import RULE_FASTPATH_MIN_CONFIDENCE, RULE_FASTPATH_REQUIRED
+from .gpt_extractor import deterministic_neighborhood
+
+# ---------- Patterns (compiled once) ----------
+
+_NUM = r"(\d{1,3}(?:[,.]\d{3})+|\d{4,5})"
+_PRICE_AFTER_RE = re.compile(_NUM + r"\s*(?:₪|ש\"ח|ש״ח|ש'ח|שח\b|שקל(?:ים)?|nis\b)", re.IGNORECASE)
+_PRICE_BEFORE_RE = re.compile(r"(?:₪|מחיר|שכ\"ד|שכ״ד|שכר דירה)\s*[:\-]?\s*" + _NUM)
+PRICE_MIN, PRICE_MAX = 1500, 60000
+
+# Same rules/order as the historical _normalize_rooms_value text inference
+_ROOMS_HALF_RE = re.compile(r'(\d+)\s*[.,]\s*5\s*חדר')
+_ROOMS_AND_HALF_RE = re.compile(r'(\d+)\s*ו\s*חצי(?:\s*חדר(?:ים)?)?')
+_ROOM_AND_HALF_RE = re.compile(r'חדר\s*ו\s*חצי')
+_ROOMS_INT_RE = re.compile(r'(\d+)\s*חדר(?:ים)?')
+_ROOMS_ANY_RE = re.compile(r'(\d+(?:\s*[.,]\s*5)?)\s*חדר')
+_STUDIO_RE = re.compile(r'סטודיו|יחידת\s*דיור')
+
+_SIZE_RE = re.compile(r"(\d{2,3})\s*(?:מ\"ר|מ״ר|מ'ר|מ׳ר|מטר(?:ים)?\b|מ\s?ר\b|sqm\b|m2\b)", re.IGNORECASE)
+SIZE_MIN, SIZE_MAX = 15, 400
+
+_FLOOR_NUM_RE = re.compile(r"קומה\s*:?\s*(\d{1,2})(?!\d)")
+_FLOOR_GROUND_RE = re.compile(r"קומת\s*(?:קרקע|כניסה)")
+_FLOOR_WORDS = {"ראשונה": 1, "שנייה": 2, "שניה": 2, "שלישית": 3, "רביעית": 4, "חמישית": 5,
+                "שישית": 6, "שביעית": 7, "שמינית": 8, "תשיעית": 9, "עשירית": 10}
+_FLOOR_WORD_RE = re.compile(r"קומה\s+(" + "|".join(_FLOOR_WORDS) + r")")
+
+_PHONE_RE = re.compile(r"(?<!\d)(?:\+?972[-\s]?|0)(5\d)[-\s]?(\d{3})[-\s]?(\d{4})(?!\d)")
+
+_ADDRESS_PREFIXED_RE = re.compile(
+    r"(?:ברחוב|רחוב|ברח['׳]|רח['׳]|בשדרות|שדרות|בשד['׳]|שד['׳])\s+"
+    r"([א-ת\"'״׳\- ]{2,30}?)\s*,?\s+(\d{1,4})(?![\d.,]*\s*(?:חדר|מ\"ר|מ״ר|₪|ש\"ח|ש״ח))"
+)
+
+_NEGATION = r"(?<![א-ת])(?:ללא|אין|בלי|לא)\s*(?:\S+\s+)?"
+_AMENITIES = {
+    "has_balcony": r"מרפסת",
+    "has_safe_room": r"ממ\"ד|ממ״ד|ממד\b|חדר\s*ביטחון",
+    "has_parking": r"חני(?:י)?ה",
+    "has_elevator": r"מעלית",
+    "pets_allowed": r"חיות\s*(?:מחמד)?|בעלי\s*חיים",
+}
+_AMENITY_RES = {
+    field: (re.compile(_NEGATION + f"(?:{pat})"), re.compile(pat))
+    for field, pat in _AMENITIES.items()
+}
+_NO_BROKER_RE = re.compile(r"(?<![א-ת])(?:ללא|בלי|אין)\s*(?:דמי\s*)?תיווך")
+_BROKER_RE = re.compile(r"תיווך|מתווך|נדל\"ן|נדל״ן|נדלן|סוכנות")
+
+_AVAILABLE_RE = re.compile(r"כניסה[^\d\n]{0,12}(\d{1,2})[./](\d{1,2})(?:[./](\d{2,4}))?")
+
+_PROPERTY_TYPES = (
+    (re.compile(r"פנטהאוז|פנטהאוס"), "penthouse"),
+    (re.compile(r"דופלקס"), "duplex"),
+)
+_GARDEN_RE = re.compile(r"דירת\s*גן")
+
+# Posts that need the model's judgement (category, scope, city, seekers) never take the fast path
+_BLOCKERS_RE = re.compile(
+    r"סאבלט|תת[-\s]?השכרה|השכרה\s*זמנית|sublet|למכירה|מכירה|החלפ|שותפ|מחפש|"
+    r"בת[-\s]?ים|חולון|גבעתיים|רמת[-\s]?גן|בני[-\s]?ברק|הרצליה|ראשון\s*לציון|פתח[-\s]?תקו",
+    re.IGNORECASE,
+)
+
+
+# ---------- Field parsers ----------
+
+def _to_int(s: str) -> int:
+    return int(re.sub(r"[,.]", "", s))
+
+
+def rooms_from_text(text: str) -> Optional[float]:
+    """Rooms from Hebrew text ("4.5 חדר", "4 וחצי", "חדר וחצי", "3 חדרים"), or None."""
+    m = _ROOMS_HALF_RE.search(text)
+    if m:
+        return float(m.group(1)) + 0.5
+    m = _ROOMS_AND_HALF_RE.search(text)
+    if m:
+        return float(m.group(1)) + 0.5
+    if _ROOM_AND_HALF_RE.search(text):
+        return 1.5
+    m = _ROOMS_INT_RE.search(text)
+    if m:
+        return float(m.group(1))
+    return None
+
+
+def _parse_price(text):
+    values = {_to_int(m.group(1)) for r in (_PRICE_AFTER_RE, _PRICE_BEFORE_RE) for m in r.finditer(text)}
+    values = {v for v in values if PRICE_MIN <= v <= PRICE_MAX}
+    if not values:
+        return None, 0.0
+    if len(values) == 1:
+        return values.pop(), 0.95
+    return min(values), 0.4  # several plausible prices (e.g. rent + arnona) → let the model decide
+
+
+def _parse_rooms(text):
+    rooms = rooms_from_text(text)
+    distinct = {float(m.group(1).replace(" ", "").replace(",", ".")) for m in _ROOMS_ANY_RE.finditer(text)}
+    if rooms is None:
+        if _STUDIO_RE.search(text):
+            return 1.0, 0.85
+        return None, 0.0
+    if len(distinct) > 1:
+        return rooms, 0.4
+    return rooms, 0.9
+
+
+def _parse_size(text):
+    values = {int(m.group(1)) for m in _SIZE_RE.finditer(text)}
+    values = {v for v in values if SIZE_MIN <= v <= SIZE_MAX}
+    if not values:
+        return None, 0.0
+    return (values.pop(), 0.9) if len(values) == 1 else (max(values), 0.4)
+
+
+def _parse_floor(text):
+    m = _FLOOR_NUM_RE.search(text)
+    if m:
+        return int(m.group(1)), 0.9
+    m = _FLOOR_WORD_RE.search(text)
+    if m:
+        return _FLOOR_WORDS[m.group(1)], 0.85
+    if _FLOOR_GROUND_RE.search(text):
+        return 0, 0.9
+    return None, 0.0
+
+
+def _parse_phone(text):
+    values = {f"0{m.group(1)}{m.group(2)}{m.group(3)}" for m in _PHONE_RE.finditer(text)}
+    if not values:
+        return None, 0.0
+    return (values.pop(), 0.95) if len(values) == 1 else (sorted(values)[0], 0.6)
+
+
+def _parse_address(text):
+    m = _ADDRESS_PREFIXED_RE.search(text)
+    if m:
+        street = m.group(1).strip(" -'\"")
+        if street:
+            return f"{street} {m.group(2)}", 0.9
+    return None, 0.0
+
+
+def _parse_flag(text, field):
+    negated_re, plain_re = _AMENITY_RES[field]
+    if negated_re.search(text):
+        return False, 0.85
+    if plain_re.search(text):
+        return True, 0.8
+    return None, 0.0
+
+
+def _parse_broker(text):
+    if _NO_BROKER_RE.search(text):
+        return False, 0.9
+    if _BROKER_RE.search(text):
+        return True, 0.8
+    return None, 0.0
+
+
+def _parse_available_from(text):
+    m = _AVAILABLE_RE.search(text)
+    if not m:
+        return None, 0.0
+    day, month = int(m.group(1)), int(m.group(2))
+    year = m.group(3)
+    year = int(year) + (2000 if year and len(year) == 2 else 0) if year else datetime.now().year
+    try:
+        return datetime(year, month, day).strftime("%Y-%m-%d"), 0.8
+    except ValueError:
+        return None, 0.0
+
+
+# ---------- Public API ----------
+
+def extract_rule_based(text: str):
+    """
+    Extract what the rules can see. Returns (data, confidence): data uses the same keys as the
+    LLM extraction; confidence maps each extracted field to a score in [0, 1].
+    """
+    text = text or ""
+    data, conf = {}, {}
+
+    for field, parser in (
+        ("price", _parse_price),
+        ("rooms", _parse_rooms),
+        ("size", _parse_size),
+        ("floor", _parse_floor),
+        ("phone_number", _parse_phone),
+        ("address", _parse_address),
+        ("has_broker", _parse_broker),
+        ("available_from", _parse_available_from),
+    ):
+        data[field], conf[field] = parser(text)
+
+    for field in _AMENITIES:
+        data[field], conf[field] = _parse_flag(text, field)
+
+    neighborhood = deterministic_neighborhood(data["address"], text)
+    data["neighborhood"] = neighborhood
+    conf["neighborhood"] = 0.9 if neighborhood else 0.0
+
+    data["property_type"] = "apartment"
+    for pattern, ptype in _PROPERTY_TYPES:
+        if pattern.search(text):
+            data["property_type"] = ptype
+            break
+    if _GARDEN_RE.search(text):
+        data["has_garden"] = True
+
+    return data, conf
+
+
+_stats_lock = threading.Lock()
+FASTPATH_STATS = {"llm_calls_avoided": 0}
+
+
+def fast_path_extraction(text: str, required=RULE_FASTPATH_REQUIRED,
+                         min_confidence: float = RULE_FASTPATH_MIN_CONFIDENCE) -> Optional[dict]:
+    """
+    Full extraction dict (same shape as extract_apartment_data) when every required field is
+    confidently extracted by rules, else None. Each hit is counted as an avoided LLM call.
+    """
+    if not text or _BLOCKERS_RE.search(text):
+        return None
+
+    data, conf = extract_rule_based(text)
+    if any(conf.get(f, 0.0) < min_confidence for f in required):
+        return None
+
+    rooms = data["rooms"]
+    street = (data.get("address") or "").rsplit(" ", 1)[0]
+    title = f"דירת {rooms:g} חדרים" if rooms else "דירה להשכרה"
+    if street:
+        title += f" ברחוב {street}"
+
+    result = {
+        "is_apartment": True,
+        "category": "שכירות",
+        "rental_scope": "דירה שלמה",
+        "title": title,
+        "description": "",
+        "facebook_url": None,
+        **data,
+    }
+    with _stats_lock:
+        FASTPATH_STATS["llm_calls_avoided"] += 1
+    return result
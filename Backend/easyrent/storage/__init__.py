@@ -0,0 +1,32 @@
+import threading
+from typing import Optional
+
+from ..config import SQLITE_STORAGE_PATH, STORAGE_BACKEND
+from .base import SERVER_TIMESTAMP, PostWatch, Storage
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def open_storage(backend: str = STORAGE_BACKEND, path=SQLITE_STORAGE_PATH) -> Storage:
+    """Build a storage backend by name ("firestore" or "sqlite")."""
+    if backend == "sqlite":
+        from .sqlite import SQLiteStorage
+        return SQLiteStorage(path)
+    if backend == "firestore":
+        from .firestore import FirestoreStorage
+        return FirestoreStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def get_storage() -> Storage:
+    """Process-wide storage instance, chosen by EASYRENT_STORAGE (default: firestore)."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = open_storage()
+    return _storage
+
+
+__all__ = ["SERVER_TIMESTAMP", "PostWatch", "Storage", "get_storage", "open_storage"]
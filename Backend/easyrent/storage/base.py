@@ -0,0 +1,153 @@
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional
+
+
+class _ServerTimestamp:
+    def __repr__(self):
+        return "SERVER_TIMESTAMP"
+
+
+# Placeholder for "commit time" in written data; each backend substitutes its own clock
+SERVER_TIMESTAMP = _ServerTimestamp()
+
+# Write ops passed to Storage.commit(): (kind, collection, doc_id, data) with kind "set" / "update" / "delete"
+WRITE_KINDS = ("set", "update", "delete")
+
+# Status and fields of a leased post (see Storage.claim_post)
+LEASE_STATUS = "processing"
+LEASE_FIELDS = ("lease_owner", "lease_expires", "lease_prev_status")
+
+
+def lease_fields(owner: str, lease_seconds: float, prev_status) -> dict:
+    return {"status": LEASE_STATUS, "lease_owner": owner, "lease_expires": time.time() + lease_seconds,
+            "lease_prev_status": prev_status}
+
+
+def can_claim(doc: Optional[dict], statuses, now: float) -> bool:
+    if doc is None:
+        return False
+    if doc.get("status") == LEASE_STATUS:
+        return (doc.get("lease_expires") or 0) < now
+    return doc.get("status") in statuses
+
+
+# Comparison operators accepted by Storage.delete_where()
+OPERATORS = {
+    "==": lambda a, b: a == b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+}
+
+
+class Storage:
+    """
+    The posts/apartments operations the pipeline needs, independent of the database.
+    Documents are plain dicts keyed by (collection, doc_id).
+    """
+
+    name = "storage"
+
+    # ---------- Reads ----------
+
+    def stream_posts(self, statuses: Iterable[str], after: Optional[str] = None,
+                     retry_due_by: Optional[datetime] = None) -> Iterator[dict]:
+        """
+        Post dicts whose status is one of statuses, in document id order, fetched in pages
+        (no long-lived stream). after: resume past this post id. retry_due_by: leave out "error"
+        posts whose next_attempt_at is later (still backing off); the query does the filtering.
+        """
+        raise NotImplementedError
+
+    def stream_posts_in_batch(self, batch_id: str) -> Iterator[dict]:
+        """Post dicts submitted under a Batch-API job."""
+        raise NotImplementedError
+
+    def list_ids(self, collection: str) -> list:
+        """All document ids of a collection (keys only)."""
+        raise NotImplementedError
+
+    def get_fields(self, collection: str, fields: list, ids: Optional[list] = None) -> Iterator[tuple]:
+        """
+        (doc_id, {field: value}) for every document (or only for ids), reading just `fields`.
+        Used for the fingerprint lookup index.
+        """
+        raise NotImplementedError
+
+    def watch_posts(self, statuses: Iterable[str], callback: Callable[[list], None],
+                    poll_interval: float = 5.0) -> "PostWatch":
+        """
+        Call callback(posts) with posts that have (or get) one of statuses, starting with the
+        current backlog. Posts may be delivered more than once. Default: poll stream_posts every
+        poll_interval seconds in a background thread. Returns a handle with stop().
+        """
+        return PollingWatch(self, statuses, callback, poll_interval)
+
+    # ---------- Writes ----------
+
+    def commit(self, ops: list):
+        """Apply write ops atomically; raises if the batch fails (nothing is applied)."""
+        raise NotImplementedError
+
+    # ---------- Leases (several workers on one posts collection) ----------
+
+    def claim_post(self, post_id: str, owner: str, lease_seconds: float, statuses: Iterable[str]) -> bool:
+        """
+        Atomically move a post whose status is in statuses (or whose lease expired) to
+        "processing", leased to owner for lease_seconds. Returns False if someone else holds it
+        or it was already handled.
+        """
+        raise NotImplementedError
+
+    def release_expired_leases(self) -> int:
+        """Put posts whose lease expired back to the status they had when claimed."""
+        raise NotImplementedError
+
+    def delete_where(self, collection: str, field: Optional[str] = None, op: Optional[str] = None,
+                     value=None, predicate: Optional[Callable[[str, dict], bool]] = None,
+                     fields: Optional[list] = None, dry_run: bool = False) -> int:
+        """
+        Delete documents where `field op value` holds and, if given, predicate(doc_id, data) is true.
+        The predicate only sees `fields` (plus `field`). Returns the number of (would-be) deletions.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PostWatch:
+    def stop(self):
+        raise NotImplementedError
+
+
+class PollingWatch(PostWatch):
+    """Storage.watch_posts fallback: re-runs the status query on an interval."""
+
+    def __init__(self, storage: Storage, statuses, callback, interval: float):
+        self._storage = storage
+        self._statuses = list(statuses)
+        self._callback = callback
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="easyrent-poll", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                posts = list(self._storage.stream_posts(self._statuses))
+                if posts:
+                    self._callback(posts)
+            except Exception as e:
+                print(f"Polling for posts failed: {e}")
+            if self._stop.wait(self._interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,168 @@
+import heapq
+import time
+
+from google.cloud.firestore_v1 import FieldFilter
+from firebase_admin import firestore as _fs
+
+from ..bulk_delete import ParallelDeleter, paged
+from ..config import POSTS_PAGE_SIZE
+from .base import LEASE_STATUS, OPERATORS, SERVER_TIMESTAMP, PostWatch, Storage, can_claim, lease_fields
+
+# Firestore get_all() accepts a bounded number of refs per call
+_GET_ALL_CHUNK = 300
+
+_RANGE_OPS = ("<", "<=", ">", ">=")
+
+
+class FirestoreStorage(Storage):
+    """Storage on the project's Firestore database (connects on construction)."""
+
+    name = "firestore"
+
+    def __init__(self, db=None):
+        if db is None:
+            from ..firebase import get_db
+            db = get_db()
+        self.db = db
+
+    # ---------- Reads ----------
+
+    def stream_posts(self, statuses, after=None, retry_due_by=None):
+        statuses = list(statuses)
+        if retry_due_by is None or "error" not in statuses:
+            for doc in self._status_pages(statuses, after):
+                yield doc.to_dict()
+            return
+        # Due "error" posts come from a range query on next_attempt_at (composite index
+        # status + next_attempt_at), sorted by id and merged into the other statuses' id order.
+        # The range filter skips posts without the field: `main.py backfill-retry-times` sets it
+        # on error posts from before retries were tracked.
+        due = self.db.collection("posts").where(filter=FieldFilter("status", "==", "error")).where(
+            filter=FieldFilter("next_attempt_at", "<=", retry_due_by))
+        errors = sorted((doc for doc in paged(due, "next_attempt_at", page_size=POSTS_PAGE_SIZE)
+                         if not after or doc.id > after), key=lambda doc: doc.id)
+        others = [s for s in statuses if s != "error"]
+        streams = [errors, self._status_pages(others, after)] if others else [errors]
+        for doc in heapq.merge(*streams, key=lambda doc: doc.id):
+            yield doc.to_dict()
+
+    def _status_pages(self, statuses, after):
+        coll = self.db.collection("posts")
+        q = coll.where(filter=FieldFilter("status", "in", statuses))
+        cursor = {"__name__": coll.document(after)} if after else None
+        yield from paged(q, "__name__", page_size=POSTS_PAGE_SIZE, start_after=cursor)
+
+    def stream_posts_in_batch(self, batch_id):
+        q = self.db.collection("posts").where(filter=FieldFilter("batch_id", "==", batch_id))
+        for doc in q.stream():
+            yield doc.to_dict()
+
+    def watch_posts(self, statuses, callback, poll_interval=5.0):
+        """Real-time snapshot listener; the first snapshot delivers the current backlog."""
+        return _SnapshotWatch(self.db, statuses, callback)
+
+    def list_ids(self, collection):
+        return [doc.id for doc in self.db.collection(collection).select([]).stream()]
+
+    def get_fields(self, collection, fields, ids=None):
+        coll = self.db.collection(collection)
+        if ids is None:
+            for doc in coll.select(fields).stream():
+                yield doc.id, doc.to_dict() or {}
+            return
+        ids = list(ids)
+        for start in range(0, len(ids), _GET_ALL_CHUNK):
+            refs = [coll.document(doc_id) for doc_id in ids[start:start + _GET_ALL_CHUNK]]
+            for doc in self.db.get_all(refs, field_paths=fields):
+                if doc.exists:
+                    yield doc.id, doc.to_dict() or {}
+
+    # ---------- Writes ----------
+
+    def commit(self, ops):
+        batch = self.db.batch()
+        for kind, collection, doc_id, data in ops:
+            ref = self.db.collection(collection).document(doc_id)
+            if kind == "delete":
+                batch.delete(ref)
+            else:
+                data = {k: _fs.SERVER_TIMESTAMP if v is SERVER_TIMESTAMP else v for k, v in data.items()}
+                getattr(batch, kind)(ref, data)
+        batch.commit()
+
+    # ---------- Leases ----------
+
+    def claim_post(self, post_id, owner, lease_seconds, statuses):
+        ref = self.db.collection("posts").document(post_id)
+        statuses = set(statuses)
+
+        @_fs.transactional
+        def _claim(transaction):
+            snap = ref.get(transaction=transaction)
+            doc = snap.to_dict() if snap.exists else None
+            if not can_claim(doc, statuses, time.time()):
+                return False
+            prev = doc.get("lease_prev_status") if doc.get("status") == LEASE_STATUS else doc.get("status")
+            transaction.update(ref, lease_fields(owner, lease_seconds, prev))
+            return True
+
+        return _claim(self.db.transaction())
+
+    def release_expired_leases(self):
+        q = self.db.collection("posts").where(filter=FieldFilter("status", "==", LEASE_STATUS))
+        released = 0
+        for doc in q.select(["status", "lease_expires", "lease_prev_status"]).stream():
+            data = doc.to_dict() or {}
+            if (data.get("lease_expires") or 0) >= time.time():
+                continue
+
+            @_fs.transactional
+            def _release(transaction, ref=doc.reference):
+                snap = ref.get(transaction=transaction)
+                cur = snap.to_dict() if snap.exists else None
+                if not cur or cur.get("status") != LEASE_STATUS or (cur.get("lease_expires") or 0) >= time.time():
+                    return False
+                transaction.update(ref, {"status": cur.get("lease_prev_status") or "new"})
+                return True
+
+            released += _release(self.db.transaction())
+        return released
+
+    def delete_where(self, collection, field=None, op=None, value=None, predicate=None, fields=None,
+                     dry_run=False):
+        """
+        Projection query paged with cursors; references go to parallel delete batches.
+        Without a field filter the whole collection is walked (e.g. docs missing a field,
+        which Firestore can't query for).
+        """
+        if op is not None and op not in OPERATORS:
+            raise ValueError(f"Unsupported operator: {op}")
+        read = list(dict.fromkeys(([field] if field else []) + list(fields or [])))
+        q = self.db.collection(collection)
+        if field is not None:
+            q = q.where(filter=FieldFilter(field, op, list(value) if op == "in" else value))
+        q = q.select(read)
+        order = field if op in _RANGE_OPS else "__name__"
+
+        with ParallelDeleter(self.db, dry_run=dry_run) as deleter:
+            for doc in paged(q, order):
+                if predicate is None or predicate(doc.id, doc.to_dict() or {}):
+                    deleter.delete(doc.reference)
+        return deleter.deleted
+
+
+class _SnapshotWatch(PostWatch):
+    def __init__(self, db, statuses, callback):
+        statuses = list(statuses)
+        q = db.collection("posts").where(filter=FieldFilter("status", "in", statuses))
+
+        def _on_snapshot(_docs, changes, _read_time):
+            posts = [c.document.to_dict() for c in changes if c.type.name in ("ADDED", "MODIFIED")]
+            posts = [p for p in posts if p and p.get("status") in statuses]
+            if posts:
+                callback(posts)
+
+        self._watch = q.on_snapshot(_on_snapshot)
+
+    def stop(self):
+        self._watch.unsubscribe()
@@ -0,0 +1,258 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .base import LEASE_STATUS, OPERATORS, SERVER_TIMESTAMP, Storage, can_claim, lease_fields
+
+COLLECTIONS = ("posts", "apartments")
+
+# Fields copied out of the JSON body into indexed columns (timestamps as epoch seconds)
+_INDEXED = ("status", "batch_id", "fingerprint")
+_TIMESTAMPS = ("indexed_at", "expire_at", "next_attempt_at")
+_COLUMNS = _INDEXED + _TIMESTAMPS
+
+# Rows read per query when streaming, and ids per IN (...) lookup
+_PAGE = 1000
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__dt__": value.isoformat()}
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _decode(obj):
+    if len(obj) == 1 and "__dt__" in obj:
+        return datetime.fromisoformat(obj["__dt__"])
+    return obj
+
+
+def _column_type(field):
+    return "REAL" if field in _TIMESTAMPS else "TEXT"
+
+
+def _column_value(field, value):
+    if field in _TIMESTAMPS:
+        return value.timestamp() if isinstance(value, datetime) else None
+    return value if isinstance(value, (str, int, float)) else None
+
+
+class SQLiteStorage(Storage):
+    """
+    Local single-file storage for offline runs and load tests.
+    Each collection is a table of JSON documents; status, batch_id, fingerprint and the
+    timestamps (retry backoff included) are also kept in indexed columns, so status queries,
+    the fingerprint lookup and range deletes don't scan JSON. Thread-safe (one connection behind a lock).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        # Several worker processes may share the file: writers wait for each other's transactions
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for coll in COLLECTIONS:
+            columns = ", ".join(f"{col} {_column_type(col)}" for col in _COLUMNS)
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {coll} (id TEXT PRIMARY KEY, {columns}, data TEXT NOT NULL)")
+            self._add_missing_columns(coll)
+            for col in _COLUMNS:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{coll}_{col} ON {coll}({col})")
+
+    def _add_missing_columns(self, table):
+        """Files created before a column was indexed get it added and filled from the JSON body."""
+        existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        for col in _COLUMNS:
+            if col in existing:
+                continue
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {_column_type(col)}")
+            if col in _TIMESTAMPS:
+                # Datetimes are stored as {"__dt__": iso}; julianday() parses the ISO string
+                self._conn.execute(
+                    f"UPDATE {table} SET {col} = (julianday(json_extract(data, '$.{col}.__dt__')) - 2440587.5) * 86400.0"
+                    f" WHERE json_extract(data, '$.{col}.__dt__') IS NOT NULL"
+                )
+            else:
+                self._conn.execute(f"UPDATE {table} SET {col} = json_extract(data, '$.{col}')")
+
+    @staticmethod
+    def _table(collection: str) -> str:
+        if collection not in COLLECTIONS:
+            raise ValueError(f"Unknown collection: {collection}")
+        return collection
+
+    def _pages(self, sql: str, params=(), after: str = ""):
+        """Run `sql` (selecting id first) in id-ordered pages; the lock is not held between pages."""
+        last = after or ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(f"{sql} AND id > ? ORDER BY id LIMIT {_PAGE}",
+                                          (*params, last)).fetchall()
+            yield from rows
+            if len(rows) < _PAGE:
+                return
+            last = rows[-1][0]
+
+    # ---------- Reads ----------
+
+    def stream_posts(self, statuses, after=None, retry_due_by=None):
+        statuses = list(statuses)
+        sql = f"SELECT id, data FROM posts WHERE status IN ({','.join('?' * len(statuses))})"
+        params = statuses
+        if retry_due_by is not None and "error" in statuses:
+            sql += " AND (status != 'error' OR next_attempt_at IS NULL OR next_attempt_at <= ?)"
+            params = [*statuses, retry_due_by.timestamp()]
+        for _, data in self._pages(sql, params, after):
+            yield json.loads(data, object_hook=_decode)
+
+    def stream_posts_in_batch(self, batch_id):
+        for _, data in self._pages("SELECT id, data FROM posts WHERE batch_id = ?", (batch_id,)):
+            yield json.loads(data, object_hook=_decode)
+
+    def list_ids(self, collection):
+        with self._lock:
+            return [r[0] for r in self._conn.execute(f"SELECT id FROM {self._table(collection)}")]
+
+    def get_fields(self, collection, fields, ids=None):
+        table = self._table(collection)
+        if ids is None:
+            rows = self._pages(f"SELECT id, data FROM {table} WHERE 1")
+        else:
+            rows = self._rows_by_id(table, list(ids))
+        for doc_id, data in rows:
+            doc = json.loads(data, object_hook=_decode)
+            yield doc_id, {f: doc[f] for f in fields if f in doc}
+
+    def _rows_by_id(self, table, ids):
+        for start in range(0, len(ids), _PAGE):
+            chunk = ids[start:start + _PAGE]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT id, data FROM {table} WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            yield from rows
+
+    # ---------- Writes ----------
+
+    def commit(self, ops):
+        now = datetime.now(timezone.utc)
+        with self._transaction():
+            for kind, collection, doc_id, data in ops:
+                self._apply(kind, self._table(collection), doc_id, data, now)
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction, locked against other threads and (BEGIN IMMEDIATE) other processes."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _get(self, table, doc_id):
+        row = self._conn.execute(f"SELECT data FROM {table} WHERE id = ?", (doc_id,)).fetchone()
+        return json.loads(row[0], object_hook=_decode) if row else None
+
+    # ---------- Leases ----------
+
+    def claim_post(self, post_id, owner, lease_seconds, statuses):
+        statuses = set(statuses)
+        with self._transaction():
+            doc = self._get("posts", post_id)
+            if not can_claim(doc, statuses, time.time()):
+                return False
+            prev = doc.get("lease_prev_status") if doc.get("status") == LEASE_STATUS else doc.get("status")
+            self._apply("update", "posts", post_id, lease_fields(owner, lease_seconds, prev), None)
+            return True
+
+    def release_expired_leases(self):
+        with self._lock:
+            ids = [r[0] for r in self._conn.execute("SELECT id FROM posts WHERE status = ?", (LEASE_STATUS,))]
+        released = 0
+        for post_id in ids:
+            with self._transaction():
+                doc = self._get("posts", post_id)
+                if doc and doc.get("status") == LEASE_STATUS and (doc.get("lease_expires") or 0) < time.time():
+                    self._apply("update", "posts", post_id, {"status": doc.get("lease_prev_status") or "new"}, None)
+                    released += 1
+        return released
+
+    def _apply(self, kind, table, doc_id, data, now):
+        if kind == "delete":
+            self._conn.execute(f"DELETE FROM {table} WHERE id = ?", (doc_id,))
+            return
+        data = {k: now if v is SERVER_TIMESTAMP else v for k, v in data.items()}
+        if kind == "update":
+            current = self._get(table, doc_id)
+            if current is None:
+                raise KeyError(f"No document to update: {table}/{doc_id}")
+            data = {**current, **data}
+        elif kind != "set":
+            raise ValueError(f"Unknown write op: {kind}")
+        marks = ", ".join("?" * (len(_COLUMNS) + 2))
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {table} (id, {', '.join(_COLUMNS)}, data) VALUES ({marks})",
+            (doc_id, *(_column_value(c, data.get(c)) for c in _COLUMNS),
+             json.dumps(data, ensure_ascii=False, default=_encode)),
+        )
+
+    def delete_where(self, collection, field=None, op=None, value=None, predicate=None, fields=None,
+                     dry_run=False):
+        """
+        Indexed fields (status, batch_id, fingerprint, timestamps) are filtered in SQL; anything
+        else, and the predicate, is evaluated on the decoded documents.
+        """
+        table = self._table(collection)
+        if op is not None and op not in OPERATORS:
+            raise ValueError(f"Unsupported operator: {op}")
+
+        where, params, py_filter = "1", (), None
+        if field in _COLUMNS:
+            values = list(value) if op == "in" else [value]
+            values = [_column_value(field, v) for v in values]
+            if op == "in":
+                where = f"{field} IN ({','.join('?' * len(values))})"
+            else:
+                where = f"{field} IS NOT NULL AND {field} {'=' if op == '==' else op} ?"
+            params = tuple(values)
+        elif field is not None:
+            py_filter = lambda doc: OPERATORS[op](doc.get(field), value)
+
+        if predicate is None and py_filter is None:
+            with self._lock:
+                if dry_run:
+                    return self._conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+                return self._conn.execute(f"DELETE FROM {table} WHERE {where}", params).rowcount
+
+        doomed = []
+        for doc_id, data in self._pages(f"SELECT id, data FROM {table} WHERE {where}", params):
+            doc = json.loads(data, object_hook=_decode)
+            if py_filter is not None and not py_filter(doc):
+                continue
+            if predicate is None or predicate(doc_id, doc):
+                doomed.append(doc_id)
+        if not dry_run:
+            for start in range(0, len(doomed), _PAGE):
+                chunk = doomed[start:start + _PAGE]
+                with self._lock:
+                    self._conn.execute(f"DELETE FROM {table} WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        return len(doomed)
+
+    def count(self, collection: str, status=None) -> int:
+        sql, params = f"SELECT COUNT(*) FROM {self._table(collection)}", ()
+        if status is not None:
+            sql, params = sql + " WHERE status = ?", (status,)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,37 @@
+"""
+Token counting for prompt budgeting/reporting.
+Uses tiktoken when it is installed (exact counts for the gpt-4o family),
+otherwise a character-based estimate that is close enough for Hebrew/English mixes.
+"""
+import math
+import threading
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        with _encoder_lock:
+            if not _encoder_loaded:
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding("o200k_base")
+                except Exception:
+                    _encoder = None  # not installed / no cached encoding offline → estimate
+                _encoder_loaded = True
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Number of model tokens in text (exact with tiktoken, estimated otherwise)."""
+    if not text:
+        return 0
+    enc = _get_encoder()
+    if enc is not None:
+        return len(enc.encode(text))
+    # Estimate: ~4 chars/token for ASCII, ~2.5 chars/token for Hebrew and other non-ASCII
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2.5)
@@ -0,0 +1,145 @@
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from .metrics import METRICS
+from .config import WRITE_BUFFER_MAX_DELAY, WRITE_BUFFER_MAX_OPS, WRITE_BUFFER_RETRIES
+
+# Firestore rejects batched writes with more than 500 operations
+_MAX_BATCH_OPS = 500
+
+
+class WriteBuffer:
+    """
+    Groups storage writes (apartment sets, post status updates) into batched commits.
+    A batch is committed when it reaches max_ops or its oldest write is max_delay seconds old
+    (checked by a background thread), and failed commits are retried with backoff.
+    A batch is all-or-nothing, so one bad write (an update to a deleted post) would sink the
+    rest: a batch that still fails after its retries is split down to the writes that fail.
+    Those are returned by flush() and passed to on_failed(ops) (also for background flushes),
+    so the caller can undo what it assumed was saved.
+    Thread-safe; close() flushes whatever is left and prints write stats.
+    """
+
+    def __init__(self, storage, max_ops: int = WRITE_BUFFER_MAX_OPS, max_delay: float = WRITE_BUFFER_MAX_DELAY,
+                 retries: int = WRITE_BUFFER_RETRIES, on_failed: Optional[Callable[[list], None]] = None):
+        self._storage = storage
+        self._on_failed = on_failed
+        self.max_ops = max(1, min(max_ops, _MAX_BATCH_OPS))
+        self.max_delay = max_delay
+        self.retries = retries
+
+        self._ops = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+
+        self.commits = 0
+        self.writes = 0
+        self.retried = 0
+        self.failed = 0
+        self.latencies = []
+
+    # ---------- Buffering ----------
+
+    def set(self, collection: str, doc_id: str, data: dict):
+        self._add(("set", collection, doc_id, data))
+
+    def update(self, collection: str, doc_id: str, data: dict):
+        self._add(("update", collection, doc_id, data))
+
+    def _add(self, op):
+        with self._lock:
+            self._ops.append(op)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._ops) >= self.max_ops
+        if full:
+            self.flush()
+        elif self._flusher is None and self.max_ops > 1:
+            self._start_flusher()
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="easyrent-writes", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.max_delay / 2):
+            with self._lock:
+                due = self._oldest is not None and time.monotonic() - self._oldest >= self.max_delay
+            if due:
+                self.flush()
+
+    # ---------- Committing ----------
+
+    def flush(self) -> list:
+        """Commit everything buffered so far (in chunks of max_ops). Returns the writes that failed."""
+        failed = []
+        with self._commit_lock:
+            with self._lock:
+                ops, self._ops, self._oldest = self._ops, [], None
+            for start in range(0, len(ops), self.max_ops):
+                failed += self._commit(ops[start:start + self.max_ops])
+        if failed and self._on_failed is not None:
+            self._on_failed(failed)
+        return failed
+
+    def _commit(self, ops) -> list:
+        for attempt in range(self.retries + 1):
+            try:
+                self._commit_once(ops)
+                return []
+            except Exception as e:
+                if attempt == self.retries:
+                    return self._isolate(ops, e)
+                self.retried += 1
+                time.sleep(min(8.0, 0.5 * 2 ** attempt) * (0.5 + random.random()))
+
+    def _commit_once(self, ops):
+        t0 = time.perf_counter()
+        self._storage.commit(ops)
+        self.latencies.append(time.perf_counter() - t0)
+        METRICS.observe("write", self.latencies[-1])
+        self.commits += 1
+        self.writes += len(ops)
+
+    def _isolate(self, ops, error) -> list:
+        """Bisect a batch that keeps failing; returns the single writes that fail on their own."""
+        if len(ops) == 1:
+            kind, collection, doc_id, _ = ops[0]
+            self.failed += 1
+            print(f"Write failed ({kind} {collection}/{doc_id}): {error}")
+            return ops
+        failed = []
+        mid = len(ops) // 2
+        for half in (ops[:mid], ops[mid:]):
+            try:
+                self._commit_once(half)
+            except Exception as e:
+                failed += self._isolate(half, e)
+        return failed
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        print(f"Storage writes: {self.stats()}")
+
+    def stats(self) -> dict:
+        lat = sorted(self.latencies)
+        pct = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 1) if lat else None
+        return {
+            "writes": self.writes,
+            "commits": self.commits,
+            "retried": self.retried,
+            "failed": self.failed,
+            "commit_ms_p50": pct(0.5),
+            "commit_ms_p95": pct(0.95),
+        }
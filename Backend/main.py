@@ -1,12 +1,31 @@
-from easyrent.firebase import db
-from easyrent.pruning import prune_older_than_days
-from easyrent.processor import process_posts_stream
+import argparse
+import signal
+import threading
+
+from easyrent.pruning import prune_expired, prune_older_than_days
+from easyrent.processor import (
+    apply_batch_results,
+    backfill_retry_times,
+    process_posts_backfill,
+    process_posts_daemon,
+    process_posts_stream,
+    replay_error_log,
+    requeue_dead_letters,
+    submit_backlog_batch,
+)
 from easyrent.cleanup import delete_posts_by_status
+from easyrent.config import METRICS_TEXTFILE_PATH, RETENTION_DAYS, RUN_REPORT_DIR, WORKER_ID, WORKER_SHARD
+from easyrent.metrics import METRICS
+
+def prune(dry_run: bool = False):
+    # Cheap range delete on expire_at first, then the indexed_at/ID-date pass for older docs
+    for collection in ("posts", "apartments"):
+        prune_expired(collection, dry_run=dry_run)
+        prune_older_than_days(collection, "indexed_at", days=RETENTION_DAYS, dry_run=dry_run)
 
 def main():
     # 1) Prune old docs
-    prune_older_than_days("posts", "indexed_at", days=14)
-    prune_older_than_days("apartments", "indexed_at", days=14)
+    prune()
 
     # 2) Process posts: new + error
     processed = process_posts_stream(statuses=["new", "error"])
@@ -15,5 +34,67 @@ def main():
     # 3) Cleanup skipped/duplicate posts from 'posts'
     delete_posts_by_status(["skipped", "duplicate"])
 
+def daemon(worker_id: str):
+    # SIGTERM (systemd/docker stop) ends the loop like Ctrl-C, so the last batch still commits
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    processed = process_posts_daemon(statuses=["new", "error"], lease_owner=worker_id, stop_event=stop)
+    print(f"\nDaemon stopped. {processed} apartments saved.")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="EasyRent posts → apartments pipeline")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("run", help="prune, process new/error posts, cleanup (default)")
+    prune_p = sub.add_parser("prune", help="only prune docs older than the retention window")
+    prune_p.add_argument("--dry-run", action="store_true", help="count what would be deleted, delete nothing")
+    cleanup_p = sub.add_parser("cleanup", help="only delete skipped/duplicate posts")
+    cleanup_p.add_argument("--dry-run", action="store_true", help="count what would be deleted, delete nothing")
+    work_p = sub.add_parser("work", help="only process new/error posts, leasing each one (safe to run many in parallel)")
+    work_p.add_argument("--worker-id", default=WORKER_ID, help="lease owner (default: EASYRENT_WORKER_ID or host-pid)")
+    work_p.add_argument("--shard", default=WORKER_SHARD, help="k/n: start on shard k of n workers, then help the others")
+    daemon_p = sub.add_parser("daemon", help="keep running: listen for new posts and process them in micro-batches")
+    daemon_p.add_argument("--worker-id", default=WORKER_ID, help="lease owner (default: EASYRENT_WORKER_ID or host-pid)")
+    requeue_p = sub.add_parser("requeue-dead", help="retry posts parked as dead_letter after too many failures")
+    requeue_p.add_argument("--dry-run", action="store_true", help="count them, change nothing")
+    retry_p = sub.add_parser("backfill-retry-times", help="one-off: make error posts without next_attempt_at due now")
+    retry_p.add_argument("--dry-run", action="store_true", help="count them, change nothing")
+    replay_p = sub.add_parser("replay-errors", help="reprocess the posts in the error log that are still failed")
+    replay_p.add_argument("--concurrency", type=int, default=8)
+    replay_p.add_argument("--error", help="only this error class (e.g. extraction_failed)")
+    replay_p.add_argument("--dry-run", action="store_true", help="count them, process nothing")
+    sub.add_parser("backfill", help="process new/error posts with multi-post GPT requests")
+    sub.add_parser("batch-submit", help="submit the new/error backlog as an OpenAI Batch-API job")
+    apply_p = sub.add_parser("batch-apply", help="apply the results of a completed Batch-API job")
+    apply_p.add_argument("batch_id")
+    apply_p.add_argument("--output", help="use a local batch output JSONL instead of downloading it")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.command == "prune":
+        prune(dry_run=args.dry_run)
+    elif args.command == "cleanup":
+        delete_posts_by_status(["skipped", "duplicate"], dry_run=args.dry_run)
+    elif args.command == "work":
+        processed = process_posts_stream(statuses=["new", "error"], lease_owner=args.worker_id, shard=args.shard)
+        print(f"\nDone! {processed} apartments saved.")
+    elif args.command == "daemon":
+        daemon(args.worker_id)
+    elif args.command == "requeue-dead":
+        requeue_dead_letters(dry_run=args.dry_run)
+    elif args.command == "backfill-retry-times":
+        backfill_retry_times(dry_run=args.dry_run)
+    elif args.command == "replay-errors":
+        replay_error_log(concurrency=args.concurrency, error=args.error, dry_run=args.dry_run)
+    elif args.command == "backfill":
+        processed = process_posts_backfill(statuses=["new", "error"])
+        print(f"\nDone! {processed} apartments saved.")
+    elif args.command == "batch-submit":
+        submit_backlog_batch(statuses=["new", "error"])
+    elif args.command == "batch-apply":
+        processed = apply_batch_results(args.batch_id, output_path=args.output)
+        if processed is not None:
+            print(f"\nDone! {processed} apartments saved.")
+    else:
+        main()
+    METRICS.write(RUN_REPORT_DIR, METRICS_TEXTFILE_PATH, command=args.command or "run")
@@ -0,0 +1,32 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Every post goes to the (stub) model: no extraction cache file, no rule fast path
+os.environ.setdefault("EASYRENT_EXTRACTION_CACHE", "0")
+os.environ.setdefault("EASYRENT_RULE_FASTPATH", "0")
+
+
+@pytest.fixture(params=["sqlite", "firestore"])
+def storage(request, tmp_path):
+    """
+    Each backend on an empty posts collection. Firestore runs against the emulator
+    (FIRESTORE_EMULATOR_HOST, e.g. `gcloud emulators firestore start`), in a project of its own.
+    """
+    if request.param == "sqlite":
+        from easyrent.storage.sqlite import SQLiteStorage
+        backend = SQLiteStorage(tmp_path / "posts.sqlite3")
+        yield backend
+        backend.close()
+        return
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        pytest.skip("FIRESTORE_EMULATOR_HOST is not set")
+    pytest.importorskip("firebase_admin")
+    from google.cloud import firestore
+
+    from easyrent.storage.firestore import FirestoreStorage
+    yield FirestoreStorage(db=firestore.Client(project=f"easyrent-test-{uuid.uuid4().hex[:8]}"))
@@ -0,0 +1,82 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from easyrent import batch_jobs, gpt_extractor, processor
+from easyrent.error_log import ErrorLog
+from easyrent.storage.sqlite import SQLiteStorage
+
+STUB = Path(__file__).resolve().parent.parent / "tools" / "openai_stub_server.py"
+POST_TEXT = "להשכרה דירת 3 חדרים ברחוב דיזנגוף 100, קומה 2, 6,500 ₪ לחודש. לפרטים 054-1234567"
+
+
+def _start_stub(batch_expire_after):
+    spec = importlib.util.spec_from_file_location("openai_stub_server", STUB)
+    stub = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(stub)
+    return stub.serve(0, batch_expire_after=batch_expire_after)
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    """The OpenAI stub, with batches that expire after answering two requests."""
+    server = _start_stub(batch_expire_after=2)
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch, stub_url):
+    """SQLite storage with four new posts; OpenAI calls go to the stub."""
+    monkeypatch.setattr(gpt_extractor, "OPENAI_BASE_URL", stub_url)
+    monkeypatch.setattr(gpt_extractor, "OPENAI_API_KEY", "stub")
+    gpt_extractor.get_client.cache_clear()
+    monkeypatch.setattr(batch_jobs, "BATCH_JOBS_DIR", tmp_path / "batch_jobs")
+    storage = SQLiteStorage(tmp_path / "posts.sqlite3")
+    storage.commit([("set", "posts", f"p{n}", {"id": f"p{n}", "status": "new", "contactName": "bench",
+                                               "text": POST_TEXT.replace("100", str(100 + n))})
+                    for n in range(4)])
+    error_log = ErrorLog(tmp_path / "error_log.jsonl")
+    monkeypatch.setattr(processor, "get_storage", lambda: storage)
+    monkeypatch.setattr(processor, "get_error_log", lambda: error_log)
+    yield storage
+    gpt_extractor.get_client.cache_clear()
+    storage.close()
+
+
+def _statuses(storage):
+    return {post_id: fields for post_id, fields in storage.get_fields("posts", ["status", "batch_id", "attempts"])}
+
+
+def test_expired_batch_requeues_unrun_posts(pipeline):
+    batch_id = processor.submit_backlog_batch(statuses=["new"])
+    assert {f["status"] for f in _statuses(pipeline).values()} == {"batch_pending"}
+
+    processor.apply_batch_results(batch_id)
+
+    posts = _statuses(pipeline)
+    answered = [f for f in posts.values() if f["status"] != "new"]
+    requeued = [f for f in posts.values() if f["status"] == "new"]
+    assert len(answered) == 2 and len(requeued) == 2
+    assert all(f["status"] in ("processed", "duplicate") for f in answered)
+    # Never run: no attempt counted, and free to join the next batch
+    assert all(f.get("batch_id") is None and not f.get("attempts") for f in requeued)
+
+
+def test_failed_requests_are_marked_failed(tmp_path, pipeline):
+    batch_id = processor.submit_backlog_batch(statuses=["new"])
+    output = tmp_path / "output.jsonl"
+    output.write_text(
+        '{"custom_id": "p0", "response": {"status_code": 400, "body": {"error": {"code": "invalid_request"}}}, "error": null}\n'
+        '{"custom_id": "p1", "response": null, "error": {"code": "batch_expired", "message": "expired"}}\n',
+        encoding="utf-8")
+
+    processor.apply_batch_results(batch_id, output_path=output)
+
+    posts = _statuses(pipeline)
+    assert posts["p0"]["status"] == "error" and posts["p0"]["attempts"] == 1
+    assert posts["p1"]["status"] == "new" and not posts["p1"].get("attempts")
+    # p2/p3 have no row at all (the batch ended before them)
+    assert posts["p2"]["status"] == posts["p3"]["status"] == "new"
+    assert [e["error"] for e in processor.get_error_log().entries()] == ["batch_invalid_request"]
@@ -0,0 +1,71 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from easyrent import processor
+
+NOW = datetime.now(timezone.utc)
+
+# id → (status, next_attempt_at); "missing" has no next_attempt_at at all (written before retries)
+POSTS = {
+    "p1-new": ("new", None),
+    "p2-due": ("error", NOW - timedelta(minutes=5)),
+    "p3-backing-off": ("error", NOW + timedelta(hours=1)),
+    "p4-missing": ("error", None),
+    "p5-dead": ("dead_letter", NOW - timedelta(days=1)),
+}
+
+
+def _seed(storage):
+    ops = []
+    for post_id, (status, due) in POSTS.items():
+        post = {"id": post_id, "text": "דירה להשכרה", "status": status}
+        if due is not None:
+            post["next_attempt_at"] = due
+        ops.append(("set", "posts", post_id, post))
+    storage.commit(ops)
+
+
+def _due_ids(storage, after=None):
+    # As the processor queries: due by the time of the run
+    due_by = datetime.now(timezone.utc)
+    return [p["id"] for p in storage.stream_posts(["new", "error"], after=after, retry_due_by=due_by)]
+
+
+def test_due_posts_after_backfill(storage, monkeypatch):
+    _seed(storage)
+    monkeypatch.setattr(processor, "get_storage", lambda: storage)
+
+    assert processor.backfill_retry_times() == 1
+    assert processor.backfill_retry_times() == 0
+    assert _due_ids(storage) == ["p1-new", "p2-due", "p4-missing"]
+
+
+def test_resume_after_id(storage, monkeypatch):
+    _seed(storage)
+    monkeypatch.setattr(processor, "get_storage", lambda: storage)
+    processor.backfill_retry_times()
+
+    assert _due_ids(storage, after="p2-due") == ["p4-missing"]
+
+
+def test_without_retry_filter_every_status_matches(storage):
+    _seed(storage)
+    ids = [p["id"] for p in storage.stream_posts(["new", "error"])]
+    assert ids == ["p1-new", "p2-due", "p3-backing-off", "p4-missing"]
+
+
+def test_daemon_retries_due_error_posts(storage, monkeypatch):
+    _seed(storage)
+    monkeypatch.setattr(processor, "get_storage", lambda: storage)
+    processor.backfill_retry_times()
+    stop = threading.Event()
+    handled = []
+
+    def _process(post, *args, **kwargs):
+        handled.append(post["id"])
+        stop.set()
+        return False
+
+    monkeypatch.setattr(processor, "_process_post", _process)
+    processor.process_posts_daemon(max_wait=0.5, lease_owner=None, stop_event=stop)
+    assert sorted(handled) == ["p1-new", "p2-due", "p4-missing"]
@@ -0,0 +1,235 @@
+"""
+Minimal local stand-in for the OpenAI endpoints the backend uses, for offline/load testing:
+  POST /v1/chat/completions      (single-post and multi-post "=== POST <id> ===" prompts)
+  POST /v1/files                 (multipart upload, purpose=batch)
+  GET  /v1/files/<id>/content
+  POST /v1/batches               (completes immediately, or expires with --batch-expire-after)
+  GET  /v1/batches/<id>
+Answers are canned: a regex pass over the post text, not a model.
+With --rpm, chat completions carry x-ratelimit-* headers and answer 429 (with Retry-After) past the
+limit; --error-rate makes that share of them fail with a 500, to exercise client-side retries.
+--batch-expire-after N answers only the first N requests of each batch and expires the job, with the
+rest in its error file (code batch_expired), as the API does when the completion window runs out.
+
+Usage:
+  python tools/openai_stub_server.py --port 8089 --latency 0.3
+  OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=stub python main.py backfill
+"""
+
+import argparse
+import collections
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PRICE_RE = re.compile(r"(\d{1,2}[,.]?\d{3})\s*(?:₪|ש״ח|ש\"ח|שח)")
+_ROOMS_RE = re.compile(r"(\d+(?:[.,]5)?)\s*חדר")
+_POST_RE = re.compile(r"^=== POST (.+?) ===$", re.MULTILINE)
+
+_files = {}
+_batches = {}
+_state_lock = threading.Lock()
+LATENCY = 0.0
+RPM = 0              # 0 = unlimited
+ERROR_RATE = 0.0
+BATCH_EXPIRE_AFTER = None   # None = batches complete
+_recent = collections.deque()   # chat completion times in the last minute (for RPM)
+
+
+def fake_extraction(text: str) -> dict:
+    price = _PRICE_RE.search(text)
+    rooms = _ROOMS_RE.search(text)
+    if not price and not rooms:
+        return {"is_apartment": False}
+    return {
+        "is_apartment": True,
+        "category": "שכירות",
+        "phone_number": None,
+        "rental_scope": "דירה שלמה",
+        "title": "דירה להשכרה",
+        "description": "",
+        "price": int(re.sub(r"[,.]", "", price.group(1))) if price else None,
+        "rooms": float(rooms.group(1).replace(",", ".")) if rooms else None,
+        "size": None,
+        "neighborhood": None,
+        "address": None,
+        "floor": None,
+        "property_type": "apartment",
+        "pets_allowed": None,
+        "has_broker": None,
+        "has_balcony": None,
+        "has_safe_room": None,
+        "has_parking": None,
+        "has_elevator": None,
+        "available_from": None,
+        "facebook_url": None,
+    }
+
+
+def chat_completion(body: dict) -> dict:
+    prompt = body["messages"][-1]["content"]
+    ids = _POST_RE.findall(prompt)
+    if ids:
+        chunks = _POST_RE.split(prompt)[1:]  # [id, text, id, text, ...]
+        answer = {pid: fake_extraction(text) for pid, text in zip(chunks[0::2], chunks[1::2])}
+    else:
+        answer = fake_extraction(prompt.rsplit("TEXT TO ANALYZE:", 1)[-1])
+    content = json.dumps(answer, ensure_ascii=False)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": len(prompt) // 3,
+            "completion_tokens": len(content) // 3,
+            "total_tokens": (len(prompt) + len(content)) // 3,
+        },
+    }
+
+
+def _new_file(content: bytes, filename: str, purpose: str) -> dict:
+    file_id = f"file-{uuid.uuid4().hex[:12]}"
+    meta = {
+        "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+        "filename": filename, "purpose": purpose, "status": "processed",
+    }
+    with _state_lock:
+        _files[file_id] = (meta, content)
+    return meta
+
+
+def run_batch(body: dict) -> dict:
+    with _state_lock:
+        _, content = _files[body["input_file_id"]]
+    out_lines, error_lines = [], []
+    for line in content.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        req = json.loads(line)
+        row = {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": req["custom_id"]}
+        if BATCH_EXPIRE_AFTER is not None and len(out_lines) >= BATCH_EXPIRE_AFTER:
+            row.update(response=None, error={"code": "batch_expired",
+                                             "message": "This request could not be executed before the completion window expired."})
+            error_lines.append(json.dumps(row, ensure_ascii=False))
+            continue
+        row.update(response={"status_code": 200, "request_id": uuid.uuid4().hex, "body": chat_completion(req["body"])},
+                   error=None)
+        out_lines.append(json.dumps(row, ensure_ascii=False))
+    out = _new_file(("\n".join(out_lines) + "\n").encode("utf-8"), "output.jsonl", "batch_output")
+    errors = _new_file(("\n".join(error_lines) + "\n").encode("utf-8"), "errors.jsonl", "batch_output") if error_lines else None
+    now = int(time.time())
+    batch = {
+        "id": f"batch_{uuid.uuid4().hex[:12]}", "object": "batch", "endpoint": body.get("endpoint"),
+        "input_file_id": body["input_file_id"], "completion_window": body.get("completion_window", "24h"),
+        "status": "expired" if errors else "completed", "output_file_id": out["id"],
+        "error_file_id": errors and errors["id"], "created_at": now,
+        ("expired_at" if errors else "completed_at"): now,
+        "request_counts": {"total": len(out_lines) + len(error_lines), "completed": len(out_lines),
+                           "failed": len(error_lines)},
+    }
+    with _state_lock:
+        _batches[batch["id"]] = batch
+    return batch
+
+
+def rate_limit_headers() -> tuple:
+    """(status, headers) for a chat completion arriving now under the --rpm sliding window."""
+    if not RPM:
+        return 200, {}
+    now = time.monotonic()
+    with _state_lock:
+        while _recent and now - _recent[0] >= 60:
+            _recent.popleft()
+        if len(_recent) >= RPM:
+            return 429, {"retry-after": f"{60 - (now - _recent[0]):.3f}"}
+        _recent.append(now)
+        remaining = RPM - len(_recent)
+    reset = 60 - (now - _recent[0])
+    return 200, {"x-ratelimit-limit-requests": str(RPM), "x-ratelimit-remaining-requests": str(remaining),
+                 "x-ratelimit-reset-requests": f"{reset:.3f}s"}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send(self, status: int, payload, raw: bool = False, headers=None):
+        data = payload if raw else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream" if raw else "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_POST(self):
+        if self.path.endswith("/chat/completions"):
+            body = json.loads(self._body())
+            status, headers = rate_limit_headers()
+            if status == 429:
+                return self._send(429, {"error": {"message": "Rate limit reached for requests",
+                                                  "type": "requests", "code": "rate_limit_exceeded"}}, headers=headers)
+            if ERROR_RATE and random.random() < ERROR_RATE:
+                return self._send(500, {"error": {"message": "stub server error", "type": "server_error"}})
+            if LATENCY:
+                time.sleep(LATENCY)
+            return self._send(200, chat_completion(body), headers=headers)
+        if self.path.endswith("/files"):
+            head = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+            msg = BytesParser(policy=HTTP).parsebytes(head + self._body())
+            fields = {part.get_param("name", header="content-disposition"): part for part in msg.iter_parts()}
+            upload = fields["file"]
+            purpose = fields["purpose"].get_content().strip() if "purpose" in fields else "batch"
+            return self._send(200, _new_file(upload.get_payload(decode=True), upload.get_filename() or "upload", purpose))
+        if self.path.endswith("/batches"):
+            return self._send(200, run_batch(json.loads(self._body())))
+        self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def do_GET(self):
+        m = re.search(r"/files/([^/]+)/content$", self.path)
+        if m and m.group(1) in _files:
+            return self._send(200, _files[m.group(1)][1], raw=True)
+        m = re.search(r"/batches/([^/]+)$", self.path)
+        if m and m.group(1) in _batches:
+            return self._send(200, _batches[m.group(1)])
+        self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve(port: int = 8089, latency: float = 0.0, rpm: int = 0, error_rate: float = 0.0,
+          batch_expire_after: int = None) -> ThreadingHTTPServer:
+    """Start the stub in a background thread (handy for scripts/benchmarks). Returns the server."""
+    global LATENCY, RPM, ERROR_RATE, BATCH_EXPIRE_AFTER
+    LATENCY, RPM, ERROR_RATE, BATCH_EXPIRE_AFTER = latency, rpm, error_rate, batch_expire_after
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds to sleep per chat completion")
+    ap.add_argument("--rpm", type=int, default=0, help="requests/minute before answering 429 (0 = unlimited)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of chat completions failing with 500")
+    ap.add_argument("--batch-expire-after", type=int, default=None,
+                    help="answer this many requests per batch, then expire it")
+    a = ap.parse_args()
+    LATENCY, RPM, ERROR_RATE, BATCH_EXPIRE_AFTER = a.latency, a.rpm, a.error_rate, a.batch_expire_after
+    print(f"OpenAI stub listening on http://127.0.0.1:{a.port}/v1")
+    ThreadingHTTPServer(("127.0.0.1", a.port), Handler).serve_forever()